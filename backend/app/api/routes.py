@@ -1,13 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from typing import List
+import asyncio
+import cProfile
+import time
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+import numpy as np
+from typing import List, Optional, Tuple, Union
 from sqlalchemy import select
-from ..schemas import ScenarioCreate, ScenarioOut, SimulateRequest, RunOut, ResultOut
-from ..database import get_session
-from ..models import Scenario, Run, Result
-from ..services.scenarios import ScenarioService
-from ..services.runs import RunService
-from ..ethics.runner import run_simulation
+from ..schemas import ScenarioCreate, ScenarioOut, ScenarioSummary, EntityPage, EntityPatch, EntityPatchOut, SimulateRequest, SweepRequest, ParetoRequest, RunOut, ResultOut, JobOut, IngestCreate, IngestOut, ProfileOut
+from ..database import SessionLocal, get_session, pool_stats
+from ..models import Scenario, Run, Result, Job
+from ..services.scenarios import ScenarioService, EntityConflict, content_hash, PROJECTABLE_FIELDS
+from ..services.runs import RunService, RunEntry, run_writer, encode_cursor, iter_ranking
+from ..services.decisions import DecisionExpander
+from ..ethics.runner import prepare_scenario, run_prepared
+from ..services.cache import scenario_cache, result_cache, result_key, cache_result
+from ..services.executor import simulation_executor, SimulationBusy, SimulationTimeout
+from ..services.jobs import JobService, job_dispatcher
+from ..services.ingest import IngestService, iter_blocks
+from ..services.metrics import registry, timed, observe_simulation
+from ..services.profiling import ProfileService, PROFILE_SORTS, profiling_allowed, profiled_task, stats_data, merge_stats, stats_text
+from ..ethics.ingest import PROFILES
+from ..ethics.analyzer import analyze_results
+from ..ethics.sweep import expand_grid, run_sweep_task
+from ..ethics.pareto import pareto_task
+from ..ethics.runner import _utility_features
+from ..ethics.frame import DEFAULT_UTILITY_FEATURES
+from ..ethics.ranking import top_k_indices
+import math
+from ..config import settings
 
 router = APIRouter()
 
@@ -15,60 +38,232 @@ router = APIRouter()
 def health():
     return {"status": "ok"}
 
-@router.get("/scenarios", response_model=List[ScenarioOut])
-def list_scenarios(session=Depends(get_session)):
-    return ScenarioService.get_all(session)
+@router.get("/cache/stats")
+def cache_stats():
+    return {"scenarios": scenario_cache.stats(), "results": result_cache.stats()}
+
+@router.get("/executor/stats")
+def executor_stats():
+    return simulation_executor.stats()
+
+@router.get("/db/pool")
+def db_pool():
+    return {**pool_stats(), "run_writer": {"mode": settings.run_write_mode, **run_writer.stats()}}
+
+# Gauges and totals owned by other components are read when /metrics is scraped, never on the request path
+@registry.collector
+def _cache_metrics():
+    caches = {"scenarios": scenario_cache.stats(), "results": result_cache.stats()}
+    return [
+        ("cache_hits_total", "counter", "Cache hits", [({"cache": n}, c["hits"]) for n, c in caches.items()]),
+        ("cache_misses_total", "counter", "Cache misses", [({"cache": n}, c["misses"]) for n, c in caches.items()]),
+        ("cache_entries", "gauge", "Cached entries", [({"cache": n}, c["size"]) for n, c in caches.items()]),
+    ]
+
+@registry.collector
+def _pool_metrics():
+    pool = pool_stats()
+    out = [(f"db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}", [({}, pool[key])])
+           for key in ("size", "checked_in", "checked_out", "overflow") if key in pool]
+    writer = run_writer.stats()
+    return out + [
+        ("run_writer_queued", "gauge", "Runs waiting for the group-commit writer", [({}, writer["queued"])]),
+        ("run_writer_batches_total", "counter", "Batches committed by the group-commit writer", [({}, writer["batches"])]),
+        ("run_writer_written_total", "counter", "Runs written by the group-commit writer", [({}, writer["written"])]),
+    ]
+
+@registry.collector
+def _executor_metrics():
+    stats = simulation_executor.stats()
+    return [
+        ("simulation_executor_active", "gauge", "Simulations in flight", [({"mode": stats["mode"]}, stats["active"])]),
+        ("simulation_executor_max_concurrent", "gauge", "In-flight simulation limit", [({"mode": stats["mode"]}, stats["max_concurrent"])]),
+    ] + [(f"simulation_executor_{key}_total", "counter", f"Simulations {key}", [({"mode": stats["mode"]}, stats[key])])
+         for key in ("completed", "rejected", "timeouts")]
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text exposition format
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+@router.get("/scenarios", response_model=Union[List[ScenarioOut], List[ScenarioSummary]])
+def list_scenarios(view: str = Query("full", pattern="^(full|summary)$"), session=Depends(get_session)):
+    # view=summary: id/name/type/description/entity_count/attributes only, without reading config
+    if view == "summary":
+        return ScenarioService.list_summaries(session)
+    return [ScenarioService.to_out(session, scen) for scen in ScenarioService.get_all(session)]
 
 @router.post("/scenarios", response_model=ScenarioOut)
 def create_scenario(payload: ScenarioCreate, session=Depends(get_session)):
     if ScenarioService.get_by_name(session, payload.name):
         raise HTTPException(status_code=409, detail="Scenario name already exists")
     scen = ScenarioService.create(session, payload.name, payload.type, payload.description, payload.config)
-    return scen
+    return ScenarioService.to_out(session, scen)
 
-@router.get("/scenarios/{scenario_id}", response_model=ScenarioOut)
-def get_scenario(scenario_id: int, session=Depends(get_session)):
+@router.get("/scenarios/{scenario_id}", response_model=Union[ScenarioOut, dict])
+def get_scenario(scenario_id: int, fields: Optional[str] = Query(None, description="Comma-separated projection, e.g. name,type,config.default_params"), session=Depends(get_session)):
     scen = ScenarioService.get_by_id(session, scenario_id)
     if not scen:
         raise HTTPException(status_code=404, detail="Scenario not found")
-    return scen
+    requested = _split_fields(fields)
+    if requested is None:
+        return ScenarioService.to_out(session, scen)
+    unknown = [f for f in requested if f.split(".", 1)[0] not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ScenarioService.project(session, scen, requested)
 
-@router.post("/simulate")
-def simulate(req: SimulateRequest, session=Depends(get_session)):
-    # Resolve scenario
-    if req.scenario_id is not None:
-        scen_obj = ScenarioService.get_by_id(session, req.scenario_id)
-        if not scen_obj:
-            raise HTTPException(status_code=404, detail="Scenario not found")
-        scenario = scen_obj.config | {"type": scen_obj.type}
-        scenario["name"] = scen_obj.name
-    elif req.scenario_inline is not None:
-        scenario = req.scenario_inline
-    else:
-        raise HTTPException(status_code=400, detail="Provide scenario_id or scenario_inline")
+@router.get("/scenarios/{scenario_id}/entities", response_model=EntityPage)
+def list_entities(scenario_id: int, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=5000),
+                  fields: Optional[str] = Query(None, description="Comma-separated entity fields; id is always included"),
+                  ids: Optional[str] = Query(None, description="Comma-separated entity ids; returns those entities instead of a page"),
+                  session=Depends(get_session)):
+    scen = ScenarioService.get_by_id(session, scenario_id)
+    if not scen:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    if ids is not None:
+        total, items = ScenarioService.entities_by_id(session, scen, _split_fields(ids) or [], _split_fields(fields))
+        return {"total": total, "offset": 0, "limit": len(items), "items": items}
+    total, items = ScenarioService.entity_page(session, scen, offset, limit, _split_fields(fields))
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
 
-    # Find previous run for comparison (before creating new run)
-    prev_run = session.scalars(select(Run).where(Run.scenario_id == scen_obj.id).order_by(Run.created_at.desc())).first() if req.scenario_id else None
+@router.patch("/scenarios/{scenario_id}/entities", response_model=EntityPatchOut)
+def patch_entities(scenario_id: int, req: EntityPatch, session=Depends(get_session)):
+    # Entity-level changes; the next simulation of the scenario works from the delta (see ethics/incremental.py)
+    # Row lock (where the database has them): concurrent patches of one scenario apply one after the other
+    scen = session.get(Scenario, scenario_id, with_for_update=True)
+    if not scen:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    prepared = ScenarioService.get_prepared(session, scenario_id)
+    try:
+        delta = ScenarioService.entity_delta(prepared, req.add, req.remove)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except EntityConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    updated = ScenarioService.patch_entities(session, scen, prepared, delta, req.add, req.remove)
+    return {"scenario_id": scenario_id, "entity_count": len(updated.frame), "added": len(req.add),
+            "removed": len(delta.removed)}
 
-    sim_out = run_simulation(scenario, req.frameworks, req.params)
+@router.post("/ingest", response_model=IngestOut)
+def start_ingest(req: IngestCreate, session=Depends(get_session)):
+    # Open a chunked upload; send rows to /ingest/{id}/chunks, then POST /ingest/{id}/complete
+    if ScenarioService.get_by_name(session, req.name):
+        raise HTTPException(status_code=409, detail="Scenario name already exists")
+    try:
+        return IngestService.start(session, req.name, req.type, req.description, req.format, req.profile, req.config)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown profile {req.profile!r}; expected one of {sorted(PROFILES)} or 'none'")
 
-    # Persist run and results
-    if req.scenario_id is None:
-        # For inline scenario, store a transient scenario entry for traceability
-        scen_obj = ScenarioService.create(session, scenario.get("name", "inline"), scenario.get("type", "custom"), scenario.get("description"), scenario)
+def _ingest_block(upload_id: int, block: bytes) -> IngestOut:
+    with SessionLocal() as db:
+        upload = IngestService.add_block(db, upload_id, block)
+        db.commit()
+        return IngestOut.model_validate(upload)
+
+def _open_upload(upload_id: int) -> Tuple[IngestOut, dict]:
+    with SessionLocal() as db:
+        upload = IngestService.get(db, upload_id)
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if upload.status != "open":
+            raise HTTPException(status_code=409, detail="Upload already completed")
+        return IngestOut.model_validate(upload), IngestService.chunk_state(upload)
+
+def _discard_chunk(upload_id: int, state: dict) -> None:
+    with SessionLocal() as db:
+        IngestService.discard_chunk(db, upload_id, state)
+        db.commit()
+
+@router.post("/ingest/{upload_id}/chunks", response_model=IngestOut)
+async def upload_chunk(upload_id: int, request: Request,
+                       header: bool = Query(False, description="This chunk repeats the CSV header line (the first chunk always starts with it)")):
+    # The body is streamed: every ~INGEST_BLOCK_BYTES of whole lines is parsed and staged as it arrives.
+    # Chunks of one upload are appended in the order they are received, and may end mid-line. Blocks
+    # commit as they are staged; a chunk with a row that fails to parse is undone as a whole.
+    out, state = await run_in_threadpool(_open_upload, upload_id)
+    skip_header = header and out.blocks > 0
+    try:
+        async for block in iter_blocks(request.stream(), settings.ingest_block_bytes):
+            if skip_header:
+                block, skip_header = block.partition(b"\n")[2], False
+            out = await run_in_threadpool(_ingest_block, upload_id, block)
+    except (ValueError, UnicodeDecodeError) as exc:
+        await run_in_threadpool(_discard_chunk, upload_id, state)
+        raise HTTPException(status_code=400, detail=f"Could not parse rows after row {out.rows}: {exc}")
+    return out
 
-    run = RunService.create_run(session, scen_obj.id, req.frameworks, req.params)
-    RunService.add_results(session, run.id, sim_out["results"])
+@router.post("/ingest/{upload_id}/complete", response_model=IngestOut)
+def complete_ingest(upload_id: int, session=Depends(get_session)):
+    upload = IngestService.get(session, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    if ScenarioService.get_by_name(session, upload.name):
+        raise HTTPException(status_code=409, detail="Scenario name already exists")
+    if upload.pending:
+        # The last chunk's final line had no newline: it is the last row
+        try:
+            IngestService.add_block(session, upload.id, b"\n")
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise HTTPException(status_code=400, detail=f"Could not parse the last row: {exc}")
+    IngestService.complete(session, upload)
+    return upload
+
+@router.get("/ingest/{upload_id}", response_model=IngestOut)
+def get_ingest(upload_id: int, session=Depends(get_session)):
+    upload = IngestService.get(session, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+DECISIONS_VIEW = "^(full|selected|none)$"
+
+def _decisions_view(res: Result, view: str, expander: DecisionExpander) -> Optional[dict]:
+    # "selected" keeps only the selection and drops bulky payloads such as the utilitarian ranking;
+    # "none" never touches the (possibly deferred) decisions column
+    if view == "none":
+        return None
+    if view == "selected":
+        return {"selected_ids": expander.expand(res, keys=("selected_ids",)).get("selected_ids", [])}
+    return expander.expand(res)
 
+def _run_out(run: Run, expander: DecisionExpander, decisions: str = "full") -> RunOut:
+    return RunOut.model_validate({
+        "id": run.id,
+        "scenario_id": run.scenario_id,
+        "requested_frameworks": run.requested_frameworks,
+        "params": run.params,
+        "created_at": run.created_at,
+        "source_run_id": run.source_run_id,
+        "results": [
+            {
+                "id": res.id,
+                "framework": res.framework,
+                "decisions": _decisions_view(res, decisions, expander),
+                "metrics": res.metrics,
+                "explanation": res.explanation,
+            } for res in run.effective_results
+        ]
+    })
+
+def _simulation_payload(run: dict, sim_out: dict, scenario_type: Optional[str], prev_run: Optional[Run]) -> dict:
+    # `run` is RunOut-shaped: straight from RunService.record for fresh runs, or _run_out for stored ones
     # Comparison mapping
     def fairness_value(m):
         gap = float(m.get("parity_gap", 0.0))
         return 1.0 - gap
 
     comparison = {"deltas": {}, "text": []}
-    if prev_run and prev_run.results:
+    if prev_run and prev_run.effective_results:
         # Build prev map
-        prev_map = {res.framework: res.metrics for res in prev_run.results}
+        prev_map = {res.framework: res.metrics for res in prev_run.effective_results}
         for r in sim_out["results"]:
             fw = r["framework"]
             cur_m = r.get("metrics", {})
@@ -93,8 +288,7 @@ def simulate(req: SimulateRequest, session=Depends(get_session)):
                 comparison["text"].append(f"Rule compliance changed by {delta*100:+.0f}% vs previous run.")
 
     # Scenario-specific labels
-    st = scenario.get("type")
-    if st == "hiring":
+    if scenario_type == "hiring":
         labels = {
             "utilitarian": "Performance",
             "fairness": "Fairness",
@@ -105,7 +299,7 @@ def simulate(req: SimulateRequest, session=Depends(get_session)):
             "fairness": "Higher means more equal selection across gender/department.",
             "rule_based": "Higher means more selections satisfied policy constraints."
         }
-    elif st == "healthcare":
+    elif scenario_type == "healthcare":
         labels = {
             "utilitarian": "Accuracy",
             "fairness": "Bias Mitigation",
@@ -128,73 +322,295 @@ def simulate(req: SimulateRequest, session=Depends(get_session)):
             "rule_based": "Higher means more decisions follow safety laws/constraints."
         }
 
-    # Build response
-    session.refresh(run)
-    payload = {
-        "run": RunOut.model_validate({
-            "id": run.id,
-            "scenario_id": run.scenario_id,
-            "requested_frameworks": run.requested_frameworks,
-            "params": run.params,
-            "created_at": run.created_at,
-            "results": [
-                {
-                    "id": res.id,
-                    "framework": res.framework,
-                    "decisions": res.decisions,
-                    "metrics": res.metrics,
-                    "explanation": res.explanation,
-                } for res in run.results
-            ]
-        }).model_dump(mode="json"),
+    return {
+        "run": RunOut.model_validate(run).model_dump(mode="json"),
         "summary": sim_out.get("summary", {}),
         "labels": labels,
         "descriptions": descriptions,
         "comparison": comparison
     }
-    return JSONResponse(payload)
+
+def _persist(session, entries: List[RunEntry], scenario_type: Optional[str] = None) -> List[dict]:
+    with timed("persist", scenario_type):
+        if settings.run_write_mode == "group_commit":
+            # The writer uses its own connection: make rows this request created (inline scenarios) visible first
+            session.commit()
+            return [future.result() for future in [run_writer.submit(e) for e in entries]]
+        return RunService.record_many(session, entries)
+
+def _check_params(params: dict) -> None:
+    # Framework params arrive as free-form JSON; reject values the frameworks cannot read with a 400
+    # instead of failing inside the executor
+    is_int = lambda v: isinstance(v, int) and not isinstance(v, bool)
+    if "top_k" in params and not (is_int(params["top_k"]) and params["top_k"] >= 1):
+        raise HTTPException(status_code=400, detail="params.top_k must be an integer >= 1")
+    limit = params.get("ranking_limit")
+    if limit is not None and not (is_int(limit) and limit >= 0):
+        raise HTTPException(status_code=400, detail="params.ranking_limit must be an integer >= 0 or null")
+    weights = params.get("weights", {})
+    if not isinstance(weights, dict) or not all(isinstance(w, (int, float)) and not isinstance(w, bool) for w in weights.values()):
+        raise HTTPException(status_code=400, detail="params.weights must map feature names to numbers")
+
+def _execute(prepared, frameworks: List[str], params, task=None):
+    try:
+        return simulation_executor.run(prepared, frameworks, params, task=task)
+    except SimulationBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    except SimulationTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+    except BrokenProcessPool:
+        # A worker died mid-run (e.g. killed for memory); the next request gets a fresh pool
+        raise HTTPException(status_code=503, detail="Simulation worker exited unexpectedly", headers={"Retry-After": "1"})
+
+def _profiling_token(profile: Optional[str] = Query(None, description="Profiling token (or send it as an X-Profile header)"),
+                     x_profile: Optional[str] = Header(None)) -> Optional[str]:
+    return x_profile if x_profile is not None else profile
+
+def _require_profiling(token: Optional[str]) -> None:
+    if not profiling_allowed(token):
+        raise HTTPException(status_code=403, detail="Profiling is not enabled for this token")
+
+@router.post("/simulate")
+def simulate(req: SimulateRequest, token: Optional[str] = Depends(_profiling_token), session=Depends(get_session)):
+    if token is None:
+        return _simulate(req, session)[0]
+    # Opt-in profiling: the whole request under cProfile, stored with its run (id in X-Profile-Id)
+    _require_profiling(token)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    response, run, worker_profile = profiler.runcall(_simulate, req, session, True)
+    duration_ms = (time.perf_counter() - start) * 1000
+    saved = ProfileService.save(session, run["id"], "simulate", duration_ms, merge_stats(stats_data(profiler), worker_profile))
+    response.headers["X-Profile-Id"] = str(saved.id)
+    return response
+
+def _simulate(req: SimulateRequest, session, profile: bool = False):
+    # (response, recorded run, profile of the simulation where it ran when profile=True)
+    _check_params(req.params)
+    # Resolve scenario (stored scenarios come prepared from the in-process cache)
+    if req.scenario_id is not None:
+        prepared = ScenarioService.get_prepared(session, req.scenario_id)
+        if prepared is None:
+            raise HTTPException(status_code=404, detail="Scenario not found")
+        scenario_id = req.scenario_id
+    elif req.scenario_inline is not None:
+        prepared = prepare_scenario(req.scenario_inline)
+    else:
+        raise HTTPException(status_code=400, detail="Provide scenario_id or scenario_inline")
+    scenario = prepared.meta
+    if req.scenario_id is None:
+        prepared.content_hash = content_hash(scenario.get("type", "custom"), req.scenario_inline)
+
+    # Identical (scenario content, frameworks, params) requests can be served from the result cache; a
+    # scenario without a content hash has no key that identifies its content, so it is never cached
+    cache_key = result_key(prepared.content_hash, req.frameworks, req.params) if prepared.content_hash is not None else None
+    cached = result_cache.get(cache_key) if req.use_cache and cache_key is not None else None
+
+    # Find previous run for comparison (before creating new run)
+    prev_run = session.scalars(select(Run).where(Run.scenario_id == scenario_id).order_by(Run.created_at.desc())).first() if req.scenario_id else None
+
+    worker_profile = None
+    if cached is None:
+        # Inline simulations run on this thread and are already inside the request's profile
+        task = partial(profiled_task, run_prepared) if profile and simulation_executor.mode != "inline" else None
+        sim_out = _execute(prepared, req.frameworks, req.params, task=task)
+        worker_profile = sim_out.pop("profile", None)
+        observe_simulation(scenario.get("type"), len(prepared.frame), sim_out)
+    else:
+        sim_out, source_run_id, source_result_ids = cached
+
+    # Persist run and results
+    if req.scenario_id is None:
+        # For inline scenario, store a transient scenario entry for traceability
+        scenario_id = ScenarioService.create(session, scenario.get("name", "inline"), scenario.get("type", "custom"), scenario.get("description"), req.scenario_inline, digest=prepared.content_hash, frame=prepared.frame).id
+
+    if cached is None:
+        run, = _persist(session, [RunEntry(scenario_id, req.frameworks, req.params, sim_out, prepared)], scenario.get("type"))
+        if cache_key is not None:
+            cache_result(cache_key, sim_out, run)
+    else:
+        # Lightweight history entry for a cached result: no Result rows of its own
+        run, = _persist(session, [RunEntry(scenario_id, req.frameworks, req.params, sim_out, source_run_id=source_run_id, result_ids=source_result_ids)], scenario.get("type"))
+
+    # The response comes from the in-memory results; nothing is read back
+    with timed("serialize", scenario.get("type")):
+        return JSONResponse(_simulation_payload(run, sim_out, scenario.get("type"), prev_run)), run, worker_profile
+
+@router.get("/profiles", response_model=List[ProfileOut])
+def list_profiles(run_id: Optional[int] = None, limit: int = Query(50, ge=1, le=500),
+                  token: Optional[str] = Depends(_profiling_token), session=Depends(get_session)):
+    _require_profiling(token)
+    return ProfileService.list(session, run_id, limit)
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: int, format: str = Query("pstats", pattern="^(pstats|text)$"),
+                     sort: str = Query("cumulative", pattern=f"^({'|'.join(PROFILE_SORTS)})$"), limit: int = Query(50, ge=1, le=1000),
+                     token: Optional[str] = Depends(_profiling_token), session=Depends(get_session)):
+    # pstats: the binary file for pstats/snakeviz; text: the top `limit` functions by `sort`
+    _require_profiling(token)
+    profile = ProfileService.get(session, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    data = ProfileService.data(profile)
+    if format == "text":
+        return Response(stats_text(data, sort, limit), media_type="text/plain; charset=utf-8")
+    return Response(data, media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="run-{profile.run_id}-profile-{profile.id}.prof"'})
+
+@router.post("/sweep")
+def sweep(req: SweepRequest, session=Depends(get_session)):
+    # Many params points over one scenario in a single pass; compact metrics per point
+    prepared = ScenarioService.get_prepared(session, req.scenario_id)
+    if prepared is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    try:
+        points = expand_grid(req.params, req.grid, req.points)
+    except (TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="grid values must be lists (weights: feature -> list)")
+    if not points:
+        raise HTTPException(status_code=400, detail="Provide grid or points")
+    for point in points:
+        _check_params(point)
+    if len(points) > settings.max_sweep_points:
+        raise HTTPException(status_code=400, detail=f"Sweep has {len(points)} points; the limit is {settings.max_sweep_points}")
+    persist = sorted(set(req.persist))
+    if len(persist) > settings.max_sweep_persist or any(i < 0 or i >= len(points) for i in persist):
+        raise HTTPException(status_code=400, detail=f"persist takes at most {settings.max_sweep_persist} indices into the {len(points)} points")
+
+    out = _execute(prepared, req.frameworks, {"points": points, "include_selected": req.include_selected, "persist": persist}, task=run_sweep_task)
+
+    for sim_out in out["runs"].values():
+        observe_simulation(prepared.meta.get("type"), len(prepared.frame), sim_out)
+    run_ids = {}
+    stored = _persist(session, [RunEntry(req.scenario_id, req.frameworks, points[i], sim_out, prepared) for i, sim_out in out["runs"].items()], prepared.meta.get("type"))
+    for (i, sim_out), run in zip(out["runs"].items(), stored):
+        if prepared.content_hash is not None:
+            cache_result(result_key(prepared.content_hash, req.frameworks, points[i]), sim_out, run)
+        run_ids[i] = run["id"]
+    for i, point in enumerate(out["points"]):
+        point["index"] = i
+        if i in run_ids:
+            point["run_id"] = run_ids[i]
+    return JSONResponse({"scenario_id": req.scenario_id, "frameworks": req.frameworks, "count": len(points), "points": out["points"]})
+
+@router.post("/pareto")
+def pareto(req: ParetoRequest, session=Depends(get_session)):
+    # Non-dominated (avg_utility, 1 - parity_gap, constraint_satisfaction_rate) points over weight/top_k space
+    prepared = ScenarioService.get_prepared(session, req.scenario_id)
+    if prepared is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    n_features = len(_utility_features(prepared.meta) or DEFAULT_UTILITY_FEATURES)
+    n_weights = math.comb(req.resolution + n_features - 1, n_features - 1)
+    if n_weights > settings.max_pareto_weights:
+        raise HTTPException(status_code=400, detail=f"{n_weights} weight vectors at resolution {req.resolution}; the limit is {settings.max_pareto_weights}")
+    spec = {"top_ks": req.top_k, "resolution": req.resolution, "quota_modes": req.quota_modes, "max_k": req.max_k}
+    out = _execute(prepared, [], spec, task=pareto_task)
+    return JSONResponse({"scenario_id": req.scenario_id, **out})
+
+@router.post("/jobs", response_model=JobOut, status_code=202)
+def submit_job(req: SimulateRequest, session=Depends(get_session)):
+    # Queue a simulation and return at once; poll GET /jobs/{id} for its status and results
+    _check_params(req.params)
+    if req.scenario_id is not None:
+        if not ScenarioService.get_by_id(session, req.scenario_id):
+            raise HTTPException(status_code=404, detail="Scenario not found")
+        scenario_id = req.scenario_id
+    elif req.scenario_inline is not None:
+        inline = req.scenario_inline
+        scenario_id = ScenarioService.create(session, inline.get("name", "inline"), inline.get("type", "custom"), inline.get("description"), inline).id
+    else:
+        raise HTTPException(status_code=400, detail="Provide scenario_id or scenario_inline")
+    job = JobService.submit(session, scenario_id, req.frameworks, req.params)
+    # Commit before waking the dispatcher so it can see the job
+    session.commit()
+    job_dispatcher.notify()
+    return job
+
+@router.get("/jobs/stats")
+def job_stats(session=Depends(get_session)):
+    return JobService.stats(session)
+
+def _job_status(job_id: int) -> Optional[str]:
+    with SessionLocal() as db:
+        return db.scalar(select(Job.status).where(Job.id == job_id))
+
+def _job_payload(job_id: int) -> dict:
+    with SessionLocal() as db:
+        job = JobService.get(db, job_id)
+        payload = {"job": JobOut.model_validate(job).model_dump(mode="json"), "result": None}
+        if job.status == "succeeded" and job.run is not None:
+            # Same shape as POST /simulate, rebuilt from the persisted run
+            run = job.run
+            run_out = _run_out(run, DecisionExpander(db)).model_dump()
+            results = run_out["results"]
+            prev_run = db.scalars(select(Run).where(Run.scenario_id == run.scenario_id, Run.id < run.id).order_by(Run.id.desc())).first()
+            scenario_type = db.scalar(select(Scenario.type).where(Scenario.id == run.scenario_id))
+            payload["result"] = _simulation_payload(run_out, {"results": results, "summary": analyze_results(results)}, scenario_type, prev_run)
+        return payload
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int, wait: float = Query(0.0, ge=0.0, le=30.0, description="Seconds to wait for the job to finish (long polling)")):
+    # Waiting happens on the event loop: a long-polling client holds no threadpool worker between status checks
+    status = await run_in_threadpool(_job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    deadline = time.monotonic() + wait
+    while status in ("queued", "running") and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+        status = await run_in_threadpool(_job_status, job_id)
+    return JSONResponse(await run_in_threadpool(_job_payload, job_id))
 
 @router.get("/runs", response_model=List[RunOut])
-def list_runs(session=Depends(get_session)):
-    runs = RunService.list_runs(session)
-    payload = []
-    for run in runs:
-        payload.append(RunOut.model_validate({
-            "id": run.id,
-            "scenario_id": run.scenario_id,
-            "requested_frameworks": run.requested_frameworks,
-            "params": run.params,
-            "created_at": run.created_at,
-            "results": [
-                {
-                    "id": res.id,
-                    "framework": res.framework,
-                    "decisions": res.decisions,
-                    "metrics": res.metrics,
-                    "explanation": res.explanation,
-                } for res in run.results
-            ]
-        }))
-    return payload
+def list_runs(response: Response,
+              limit: int = Query(50, ge=1, le=500),
+              cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+              scenario_id: Optional[int] = None,
+              framework: Optional[str] = None,
+              decisions: str = Query("full", pattern=DECISIONS_VIEW),
+              session=Depends(get_session)):
+    # Newest first, keyset-paginated on (created_at, id); the next page's cursor is sent as X-Next-Cursor
+    try:
+        runs = RunService.list_runs(session, limit + 1, cursor, scenario_id, framework, with_decisions=decisions != "none")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if len(runs) > limit:
+        runs = runs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(runs[-1])
+    expander = DecisionExpander(session)
+    return [_run_out(run, expander, decisions) for run in runs]
 
 @router.get("/runs/{run_id}", response_model=RunOut)
-def get_run(run_id: int, session=Depends(get_session)):
+def get_run(run_id: int, decisions: str = Query("full", pattern=DECISIONS_VIEW), session=Depends(get_session)):
     run = session.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return RunOut.model_validate({
-        "id": run.id,
-        "scenario_id": run.scenario_id,
-        "requested_frameworks": run.requested_frameworks,
-        "params": run.params,
-        "created_at": run.created_at,
-        "results": [
-            {
-                "id": res.id,
-                "framework": res.framework,
-                "decisions": res.decisions,
-                "metrics": res.metrics,
-                "explanation": res.explanation,
-            } for res in run.results
-        ]
-    })
\ No newline at end of file
+    return _run_out(run, DecisionExpander(session), decisions)
+
+@router.get("/runs/{run_id}/ranking")
+def stream_ranking(run_id: int, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                   limit: Optional[int] = Query(None, ge=1, description="Only the best `limit` entities"),
+                   session=Depends(get_session)):
+    # Full ranking of a run (rank, id, score, group), streamed from its stored score vector
+    run = session.get(Run, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    stored = RunService.load_scores(session, run)
+    if stored is not None:
+        # Scores are in the entity order of the scenario version the run saw, which entity patches may have changed since
+        scores, digest = stored
+        try:
+            ids, groups = DecisionExpander(session).entities(run.scenario_id, digest, np.arange(len(scores)))
+        except LookupError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+    else:
+        # Runs recorded before scores were stored: their utilitarian result may hold the full ranking
+        ranking = next((res.decisions["ranking"] for res in run.effective_results if isinstance(res.decisions.get("ranking"), list)), None)
+        if ranking is None:
+            raise HTTPException(status_code=404, detail="No stored ranking for this run")
+        ids = np.array([r.get("id") for r in ranking], dtype=object)
+        scores = np.array([r.get("score") for r in ranking], dtype=float)
+        groups = np.array([r.get("group") for r in ranking], dtype=object)
+    order = np.argsort(-scores, kind="stable") if limit is None else top_k_indices(scores, limit)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="run-{run_id}-ranking.{format}"'}
+    return StreamingResponse(iter_ranking(order, ids, scores, groups, format), media_type=media_type, headers=headers)
@@ -1,25 +1,76 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import NullPool
-from .config import settings
-
-# Use NullPool for local dev to avoid connection reuse issues on Windows
-# Add SQLite-friendly connect_args when using sqlite
-if settings.database_url.startswith("sqlite"):
-    engine = create_engine(
-        settings.database_url,
-        connect_args={"check_same_thread": False},
-        poolclass=NullPool,
-        future=True,
-    )
-else:
-    engine = create_engine(settings.database_url, poolclass=NullPool, future=True)
+from sqlalchemy.pool import NullPool, QueuePool
+from .config import settings, Settings
+
+POOL_MODES = ("queue", "null")
+
+def build_engine(cfg: Settings) -> Engine:
+    if cfg.db_pool_mode not in POOL_MODES:
+        raise ValueError(f"db_pool_mode must be one of {POOL_MODES}, got {cfg.db_pool_mode!r}")
+    url = cfg.database_url
+    sqlite = url.startswith("sqlite")
+    connect_args: dict = {}
+    kwargs: dict = {"future": True}
+    if sqlite:
+        connect_args = {"check_same_thread": False, "timeout": cfg.sqlite_busy_timeout_ms / 1000}
+    elif cfg.db_statement_timeout_ms > 0:
+        connect_args = {"options": f"-c statement_timeout={cfg.db_statement_timeout_ms}"}
+
+    # In-memory SQLite keeps SQLAlchemy's default single-connection pool: a second connection
+    # would see a different, empty database
+    in_memory = sqlite and (":memory:" in url or url.rstrip("/").endswith(":"))
+    if cfg.db_pool_mode == "null":
+        kwargs["poolclass"] = NullPool
+    elif not in_memory:
+        kwargs.update(poolclass=QueuePool, pool_size=cfg.db_pool_size, max_overflow=cfg.db_max_overflow,
+                      pool_timeout=cfg.db_pool_timeout, pool_pre_ping=cfg.db_pool_pre_ping,
+                      pool_recycle=cfg.db_pool_recycle)
+    eng = create_engine(url, connect_args=connect_args, **kwargs)
+
+    if sqlite:
+        @event.listens_for(eng, "connect")
+        def _sqlite_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            cur.execute(f"PRAGMA journal_mode={cfg.sqlite_journal_mode}")
+            cur.execute(f"PRAGMA synchronous={cfg.sqlite_synchronous}")
+            cur.close()
+    return eng
+
+engine = build_engine(settings)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 class Base(DeclarativeBase):
     pass
 
+def pool_stats(bind: Engine | None = None) -> dict:
+    bind = bind or engine
+    pool = bind.pool
+    stats = {"dialect": bind.dialect.name, "class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return stats
+
+def upgrade_schema(bind=None):
+    # No migration tool is wired up: create missing tables, then add nullable columns and indexes that
+    # were introduced after an existing table was first created
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing and col.nullable:
+                    ddl = col.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl}"))
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
 # Dependency for FastAPI routes
 
 def get_session():
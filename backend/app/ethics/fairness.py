@@ -1,54 +1,104 @@
-from typing import List, Dict, Any, Tuple
-from collections import defaultdict
+from typing import Dict, Any, Tuple, List
+import heapq
 import numpy as np
+from .frame import EntityFrame
+from .ranking import top_k_indices, first_per_group
+from .scoring import common_scores, selection_metrics
 
 # Fairness-aware selection: approximate demographic parity by balancing selection rates across groups
 
-def fairness_decision(entities: List[Dict[str, Any]], common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+QUOTA_MODES = ("round_robin", "proportional")
+
+def round_robin_quotas(sizes: np.ndarray, k: int) -> np.ndarray:
+    # Per-group counts of a round-robin pass over groups: everyone gets `level` picks (capped at the
+    # group size) and the leftover picks go to the earliest groups that still have members
+    k = min(k, int(sizes.sum()))
+    lo, hi = 0, int(sizes.max()) if len(sizes) else 0
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(sizes, mid).sum() <= k:
+            lo = mid
+        else:
+            hi = mid - 1
+    quotas = np.minimum(sizes, lo)
+    extra = np.flatnonzero(sizes > lo)[: k - int(quotas.sum())]
+    quotas[extra] += 1
+    return quotas
+
+def proportional_quotas(sizes: np.ndarray, k: int) -> np.ndarray:
+    # Largest-remainder apportionment of k picks by group population (exact integer arithmetic)
+    n = int(sizes.sum())
+    k = min(k, n)
+    if n == 0:
+        return np.zeros_like(sizes)
+    shares = k * sizes
+    quotas = shares // n
+    leftover = k - int(quotas.sum())
+    quotas[np.argsort(-(shares % n), kind="stable")[:leftover]] += 1
+    return quotas
+
+def _emission_order(quotas: np.ndarray, mode: str) -> List[Tuple[int, int]]:
+    # Interleave picks across groups with a priority queue: round-robin emits round by round in group
+    # order; proportional emits each group in step with its share of the quota
+    heap = [(0.0, int(g), 0) for g in np.flatnonzero(quotas)]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, g, j = heapq.heappop(heap)
+        order.append((g, j))
+        if j + 1 < quotas[g]:
+            key = float(j + 1) if mode == "round_robin" else (j + 1) / quotas[g]
+            heapq.heappush(heap, (key, g, j + 1))
+    return order
+
+def group_quotas(sizes: np.ndarray, k: int, mode: str) -> np.ndarray:
+    return (round_robin_quotas if mode == "round_robin" else proportional_quotas)(sizes, k)
+
+def fairness_metrics(labels: List[Any], sizes: np.ndarray, quotas: np.ndarray, scores: np.ndarray, selected: np.ndarray) -> Dict[str, Any]:
+    rates = quotas / np.maximum(1, sizes)
+    selection_rates = dict(zip(labels, rates.tolist()))
+    parity_gap = float(rates.max() - rates.min()) if len(rates) else 0.0
+    return {
+        "selection_rates": selection_rates,
+        "parity_gap": parity_gap,
+        **selection_metrics(scores, selected),
+    }
+
+def fairness_decision(frame: EntityFrame, common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     params = common.get("params", {})
     protected_attr = common.get("protected_attribute")
     target_selection = max(1, int(params.get("top_k", 1)))
-    weights = params.get("weights", {"experience": 0.5, "test_score": 0.5})
-
-    # Score can be provided; otherwise use normalized weighted sum
-    groups = defaultdict(list)
-    for e in entities:
-        grp = e.get(protected_attr, "unknown")
-        base = e.get("utility")
-        if base is None:
-            exp = e.get("experience_norm", e.get("experience", 0.0))
-            ts = e.get("test_score_norm", e.get("test_score", 0.0))
-            base = weights.get("experience", 0.0) * float(exp) + weights.get("test_score", 0.0) * float(ts)
-        score = float(base)
-        groups[grp].append({"id": e.get("id"), "score": score, "entity": e})
-
-    # Round-robin across groups based on descending score to approximate parity
-    for g in groups:
-        groups[g] = sorted(groups[g], key=lambda x: x["score"], reverse=True)
-
-    pointers = {g:0 for g in groups}
-    selected = []
-    while len(selected) < target_selection and any(pointers[g] < len(groups[g]) for g in groups):
-        for g in groups:
-            if pointers[g] < len(groups[g]) and len(selected) < target_selection:
-                selected.append(groups[g][pointers[g]])
-                pointers[g] += 1
+    mode = params.get("quota_mode", "round_robin")
+    if mode not in QUOTA_MODES:
+        mode = "round_robin"
 
-    decisions = {
-        "selected_ids": [s["id"] for s in selected],
-        "selection_by_group": {g: [x["id"] for x in groups[g][:pointers[g]]] for g in groups}
-    }
+    scores = common_scores(frame, common)
+    codes, labels = frame.groups(protected_attr)
 
-    selection_counts = {g: pointers[g] for g in groups}
-    group_sizes = {g: len(groups[g]) for g in groups}
-    selection_rates = {g: (selection_counts[g] / max(1, group_sizes[g])) for g in groups}
-    rates = list(selection_rates.values())
-    parity_gap = (max(rates) - min(rates)) if rates else 0.0
+    sizes = frame.group_sizes(protected_attr)
+    quotas = group_quotas(sizes, target_selection, mode)
 
-    metrics = {
-        "selection_rates": selection_rates,
-        "parity_gap": parity_gap,
+    ranked = common.get("order")
+    if ranked is not None:
+        # Maintained score order: each group's picks are its first members in it
+        picks: Dict[int, np.ndarray] = first_per_group(ranked, codes, quotas)
+    else:
+        # Members of each group are contiguous in `members`; only the top quota[g] of each are ordered
+        members = np.argsort(codes, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+        picks = {}
+        for g in np.flatnonzero(quotas):
+            block = members[starts[g]:starts[g + 1]]
+            picks[g] = block[top_k_indices(scores[block], quotas[g])]
+
+    selected = np.array([picks[g][j] for g, j in _emission_order(quotas, mode)], dtype=np.intp)
+    empty = np.empty(0, dtype=np.intp)
+    decisions = {
+        "selected_ids": frame.ids[selected].tolist(),
+        "selection_by_group": {labels[g]: frame.ids[picks.get(g, empty)].tolist() for g in range(len(labels))}
     }
 
-    context = {"protected_attr": protected_attr}
+    metrics = fairness_metrics(labels, sizes, quotas, scores, selected)
+
+    context = {"protected_attr": protected_attr, "quota_mode": mode}
     return decisions, metrics, context
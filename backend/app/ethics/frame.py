@@ -0,0 +1,357 @@
+from typing import List, Dict, Any, Tuple, Iterable, Optional, Sequence
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+# Columnar view of a scenario's entities: one NumPy array per field, built once per scenario.
+# Numeric fields are float64 arrays (NaN = missing); everything else is stored as int32 category
+# codes (-1 = missing) plus the list of distinct raw values in first-appearance order.
+
+NUMERIC_KINDS = ("int", "float", "bool")
+DEFAULT_UTILITY_FEATURES = ["experience", "test_score"]
+
+# Legacy aliases honoured by the normalizer / categorical accessors (see the loader scripts)
+NUMERIC_FALLBACKS = {"test_score": "training_hours"}
+CATEGORICAL_FALLBACKS = {
+    "gender": (("Gender",), "unknown"),
+    "department": (("dept", "Department"), None),
+}
+
+
+def _value_kind(v: Any) -> str:
+    if isinstance(v, bool):
+        return "bool"
+    if isinstance(v, int):
+        return "int"
+    if isinstance(v, float):
+        return "float"
+    return "object"
+
+
+def _to_float(v: Any) -> float:
+    try:
+        return float(v) if v is not None else np.nan
+    except Exception:
+        return np.nan
+
+
+class EntityFrame:
+    def __init__(self, ids: np.ndarray, numeric: Dict[str, np.ndarray], kinds: Dict[str, str],
+                 categorical: Dict[str, Tuple[np.ndarray, List[Any]]], field_order: List[str],
+                 objects: Optional[Dict[str, List[Any]]] = None):
+        self.ids = ids
+        self.numeric_columns = numeric
+        self.kinds = kinds
+        self.categorical_columns = categorical
+        # Unhashable values (nested lists/dicts) are kept verbatim but take no part in vectorized logic
+        self.object_columns = objects or {}
+        self.fields = field_order
+        self._derived: Dict[Tuple[str, str], Any] = {}
+        self.score_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Prepared frames are shared by concurrent requests and executor threads; guards score_cache's LRU updates
+        self.score_lock = Lock()
+        # Entity positions sorted by score, per score_cache key; maintained across entity deltas (incremental.py)
+        self.score_orders: Dict[str, np.ndarray] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the raw columns cross process boundaries; derived data is cheap to rebuild on the other side
+        state = self.__dict__.copy()
+        state["_derived"] = {}
+        state["score_cache"] = OrderedDict()
+        state["score_orders"] = {}
+        del state["score_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.score_lock = Lock()
+
+    @classmethod
+    def from_entities(cls, entities: List[Dict[str, Any]]) -> "EntityFrame":
+        n = len(entities)
+        raw: Dict[str, List[Any]] = {}
+        for i, e in enumerate(entities):
+            for k, v in e.items():
+                col = raw.get(k)
+                if col is None:
+                    col = raw[k] = [None] * n
+                col[i] = v
+
+        ids_raw = raw.pop("id", None)
+        ids = np.empty(n, dtype=object)
+        ids[:] = ids_raw if ids_raw is not None else list(range(n))
+
+        numeric: Dict[str, np.ndarray] = {}
+        kinds: Dict[str, str] = {}
+        categorical: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+        objects: Dict[str, List[Any]] = {}
+        field_order = []
+        for k, col in raw.items():
+            col_kinds = {_value_kind(v) for v in col if v is not None}
+            if col_kinds and col_kinds <= set(NUMERIC_KINDS):
+                numeric[k] = np.fromiter((np.nan if v is None else v for v in col), dtype=np.float64, count=n)
+                kinds[k] = "float" if "float" in col_kinds else ("int" if "int" in col_kinds else "bool")
+            else:
+                try:
+                    categorical[k] = _encode(col)
+                except TypeError:
+                    objects[k] = col
+            field_order.append(k)
+        return cls(ids, numeric, kinds, categorical, field_order, objects)
+
+    def to_columns(self) -> List[Dict[str, Any]]:
+        """Storage records, one per field: raw array bytes for numeric/categorical, JSON lists otherwise."""
+        records = [{"name": "id", "kind": "ids", "dtype": None, "data": None, "items": self.ids.tolist()}]
+        for name in self.fields:
+            if name in self.numeric_columns:
+                records.append({"name": name, "kind": "numeric", "dtype": self.kinds[name],
+                                "data": self.numeric_columns[name].astype("<f8").tobytes(), "items": None})
+            elif name in self.categorical_columns:
+                codes, cats = self.categorical_columns[name]
+                records.append({"name": name, "kind": "categorical", "dtype": None,
+                                "data": codes.astype("<i4").tobytes(), "items": cats})
+            else:
+                records.append({"name": name, "kind": "json", "dtype": None, "data": None, "items": self.object_columns[name]})
+        return records
+
+    @classmethod
+    def from_columns(cls, records: Iterable[Dict[str, Any]]) -> "EntityFrame":
+        """Inverse of to_columns(). Arrays are read-only views over the stored bytes (no copy)."""
+        ids = np.empty(0, dtype=object)
+        numeric: Dict[str, np.ndarray] = {}
+        kinds: Dict[str, str] = {}
+        categorical: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+        objects: Dict[str, List[Any]] = {}
+        field_order = []
+        for r in records:
+            name, kind = r["name"], r["kind"]
+            if kind == "ids":
+                ids = np.empty(len(r["items"]), dtype=object)
+                ids[:] = r["items"]
+                continue
+            if kind == "numeric":
+                numeric[name] = np.frombuffer(r["data"], dtype="<f8")
+                kinds[name] = r["dtype"] or "float"
+            elif kind == "categorical":
+                categorical[name] = (np.frombuffer(r["data"], dtype="<i4"), list(r["items"]))
+            else:
+                objects[name] = list(r["items"])
+            field_order.append(name)
+        return cls(ids, numeric, kinds, categorical, field_order, objects)
+
+    def to_entities(self, start: int = 0, stop: Optional[int] = None, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Rebuild entity dicts for rows [start, stop); missing values are omitted."""
+        rows = slice(start, stop)
+        names = ["id"] + [f for f in self.fields if fields is None or f in set(fields)]
+        cols = [self.ids[rows].tolist()]
+        for name in names[1:]:
+            if name in self.numeric_columns:
+                vals = self.numeric_columns[name][rows]
+                cast = {"int": int, "bool": bool}.get(self.kinds[name], float)
+                cols.append([None if v != v else cast(v) for v in vals.tolist()])
+            elif name in self.categorical_columns:
+                codes, cats = self.categorical_columns[name]
+                lut = np.empty(len(cats) + 1, dtype=object)
+                lut[:-1] = cats
+                cols.append(lut[codes[rows]].tolist())
+            else:
+                cols.append(self.object_columns[name][rows])
+        return [{k: v for k, v in zip(names, row) if v is not None} for row in zip(*cols)]
+
+    def subset(self, rows: Any) -> "EntityFrame":
+        """Frame over the given rows (a slice or position array), sharing category lists with this one."""
+        numeric = {k: v[rows] for k, v in self.numeric_columns.items()}
+        categorical = {k: (codes[rows], cats) for k, (codes, cats) in self.categorical_columns.items()}
+        if isinstance(rows, slice):
+            objects = {k: v[rows] for k, v in self.object_columns.items()}
+        else:
+            objects = {k: [v[i] for i in rows.tolist()] for k, v in self.object_columns.items()}
+        return EntityFrame(self.ids[rows], numeric, dict(self.kinds), categorical, list(self.fields), objects)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def has(self, field: str) -> bool:
+        return field in self.numeric_columns or field in self.categorical_columns
+
+    def numeric(self, field: str) -> np.ndarray:
+        """Float view of a field (NaN where missing or non-numeric). `<feat>_norm` resolves to norm(feat)."""
+        if field in self.numeric_columns:
+            return self.numeric_columns[field]
+        key = ("numeric", field)
+        if key in self._derived:
+            return self._derived[key]
+        if field in self.categorical_columns:
+            codes, cats = self.categorical_columns[field]
+            lut = np.array([_to_float(c) for c in cats] + [np.nan], dtype=np.float64)
+            out = lut[codes]
+        elif field.endswith("_norm"):
+            out = self.norm(field[: -len("_norm")])
+        else:
+            out = np.full(len(self), np.nan)
+        self._derived[key] = out
+        return out
+
+    def codes(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        """Category codes (-1 = missing) and the raw category values, in first-appearance order."""
+        key = ("codes", field)
+        if key in self._derived:
+            return self._derived[key]
+        if field in self.categorical_columns:
+            codes, cats = self.categorical_columns[field]
+        elif field in self.numeric_columns:
+            codes, cats = self._codes_from_numeric(field)
+        elif field == "id":
+            codes, cats = _encode(self.ids.tolist())
+        else:
+            codes, cats = np.full(len(self), -1, dtype=np.int32), []
+        fallback = CATEGORICAL_FALLBACKS.get(field)
+        if fallback is not None and (codes < 0).any():
+            codes, cats = self._fill_categorical(codes, cats, *fallback)
+        self._derived[key] = (codes, cats)
+        return codes, cats
+
+    def groups(self, field: str, missing: Any = "unknown") -> Tuple[np.ndarray, List[Any]]:
+        """Like codes(), but entities without a value form their own `missing` group."""
+        key = ("groups", field)
+        if key in self._derived:
+            return self._derived[key]
+        codes, cats = self.codes(field)
+        if (codes < 0).any():
+            labels = self.labels(field)
+            codes, cats = _encode([missing if v is None else v for v in labels])
+        self._derived[key] = (codes, cats)
+        return codes, cats
+
+    def isin(self, field: str, values: Iterable[Any]) -> np.ndarray:
+        """Boolean mask of entities whose value is in `values` (Python equality, None = missing)."""
+        values = list(values)
+        if field in self.numeric_columns:
+            nums = [float(v) for v in values if _value_kind(v) in NUMERIC_KINDS]
+            col = self.numeric_columns[field]
+            mask = np.isin(col, nums)
+            if any(v is None for v in values):
+                mask |= np.isnan(col)
+            return mask
+        codes, cats = self.codes(field)
+        try:
+            wanted = set(values)
+        except TypeError:
+            wanted = values
+        lut = np.array([c in wanted for c in cats] + [None in wanted], dtype=bool)
+        return lut[codes]
+
+    def labels(self, field: str) -> List[Any]:
+        """Per-entity raw values of a field as plain Python objects (None where missing)."""
+        codes, cats = self.codes(field)
+        lut = np.empty(len(cats) + 1, dtype=object)
+        lut[:-1] = cats
+        return lut[codes].tolist()
+
+    def positions(self, ids: Sequence[Any]) -> Optional[np.ndarray]:
+        """Row positions of the given entity ids (first occurrence), or None if any id is unknown."""
+        key = ("positions", "id")
+        index = self._derived.get(key)
+        if index is None:
+            index = {}
+            try:
+                for i, v in enumerate(self.ids.tolist()):
+                    index.setdefault(v, i)
+            except TypeError:
+                index = {}
+            self._derived[key] = index
+        try:
+            out = [index[v] for v in ids]
+        except (KeyError, TypeError):
+            return None
+        return np.array(out, dtype=np.intp)
+
+    def group_sizes(self, field: str) -> np.ndarray:
+        """Member count per groups() label."""
+        key = ("sizes", field)
+        if key not in self._derived:
+            codes, labels = self.groups(field)
+            self._derived[key] = np.bincount(codes, minlength=len(labels))
+        return self._derived[key]
+
+    def norm_source(self, field: str) -> Optional[np.ndarray]:
+        """The values norm() min/max scales (missing as 0, legacy alias applied), or None if it does not scale."""
+        if not self.has(field):
+            return None
+        vals = np.nan_to_num(self.numeric(field), nan=0.0)
+        alt = NUMERIC_FALLBACKS.get(field)
+        if alt is not None and self.has(alt):
+            vals = np.where(vals == 0.0, np.nan_to_num(self.numeric(alt), nan=0.0), vals)
+        return vals
+
+    def norm(self, field: str) -> np.ndarray:
+        """Min/max normalized column in [0, 1]; missing values count as 0 as in the original loaders."""
+        key = ("norm", field)
+        if key in self._derived:
+            return self._derived[key]
+        if self.has(field):
+            out = _min_max_scale(self.norm_source(field))
+        elif NUMERIC_FALLBACKS.get(field) and self.has(NUMERIC_FALLBACKS[field]):
+            out = self.norm(NUMERIC_FALLBACKS[field])
+        elif self.has(f"{field}_norm"):
+            out = np.nan_to_num(self.numeric(f"{field}_norm"), nan=0.0)
+        else:
+            out = np.zeros(len(self))
+        self._derived[key] = out
+        return out
+
+    def feature_matrix(self, features: Iterable[str]) -> np.ndarray:
+        """(n_entities, n_features) matrix of normalized features."""
+        cols = [self.norm(f) for f in features]
+        if not cols:
+            return np.zeros((len(self), 0))
+        return np.column_stack(cols)
+
+    def prepare(self, features: Iterable[str]) -> "EntityFrame":
+        """Warm the normalization cache for the given features."""
+        for f in features:
+            self.norm(f)
+        return self
+
+    def _codes_from_numeric(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        vals = self.numeric_columns[field]
+        present = ~np.isnan(vals)
+        codes = np.full(len(vals), -1, dtype=np.int32)
+        if not present.any():
+            return codes, []
+        uniq, first, inverse = np.unique(vals[present], return_index=True, return_inverse=True)
+        # Re-number categories by first appearance so group iteration order matches the input
+        order = np.argsort(first, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        codes[present] = rank[inverse]
+        cast = {"int": int, "bool": bool}.get(self.kinds.get(field), float)
+        return codes, [cast(v) for v in uniq[order]]
+
+    def _fill_categorical(self, codes: np.ndarray, cats: List[Any], aliases: Tuple[str, ...],
+                          default: Optional[Any]) -> Tuple[np.ndarray, List[Any]]:
+        values = np.empty(len(cats) + 1, dtype=object)
+        values[:-1] = cats
+        col = values[codes]
+        for alias in aliases:
+            if self.has(alias):
+                missing = codes < 0
+                col[missing] = np.asarray(self.labels(alias), dtype=object)[missing]
+                codes = np.where(np.fromiter((v is None for v in col), dtype=bool, count=len(col)), -1, 0)
+        if default is not None:
+            col[codes < 0] = default
+        return _encode(col.tolist())
+
+
+def _encode(col: List[Any]) -> Tuple[np.ndarray, List[Any]]:
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((-1 if v is None else index.setdefault(v, len(index)) for v in col), dtype=np.int32, count=len(col))
+    return codes, list(index)
+
+
+def _min_max_scale(vals: np.ndarray) -> np.ndarray:
+    if len(vals) == 0:
+        return vals.astype(np.float64)
+    mn, mx = vals.min(), vals.max()
+    rng = (mx - mn) or 1.0
+    return (vals - mn) / rng
@@ -0,0 +1,229 @@
+from typing import Any, Optional
+import json
+import numpy as np
+from .frame import EntityFrame, DEFAULT_UTILITY_FEATURES, NUMERIC_KINDS, _encode, _value_kind
+from .ingest import concat_columns, _record_values
+from .rules import eligibility_mask
+from .runner import PreparedScenario, _utility_features
+from .scoring import score_vector
+
+# Entity-level changes to a prepared scenario. apply_delta() builds the next version from the kept rows
+# followed by the added entities and carries the derived state of the previous version forward instead
+# of recomputing it over every entity:
+#  - per-feature extents (a sorted copy of the values norm() scales), so min/max stay exact when the
+#    current extremes are removed; while min/max are unchanged the kept rows' norms are reused as-is
+#  - score orders (score_order), merged by binary search and checked against the recomputed scores;
+#    group sizes; rule eligibility masks
+# Whatever is carried equals what a full pass over the new entities computes; state that cannot be
+# carried (a feature whose min or max moved, and everything depending on it) is rebuilt in full.
+#
+# PATCH /scenarios/{id}/entities feeds this: an id both removed and added is replaced, and added
+# entities go after the kept ones. Each patch is stored as a scenario version (removed positions, the
+# removed entities' ids and groups, the added entities). Decisions and score vectors of earlier runs
+# keep positions into the version they were computed on and are resolved through later versions
+# (DecisionExpander.entities), so they are never rewritten. Other processes replay the recorded deltas
+# onto the column store on load until PENDING_PATCHES gather or a patch changes the field list; only
+# then are the column rows rewritten.
+
+# Most recently used score vectors of a version that get a maintained order in the next one
+ORDERED_SCORES = 4
+# Delta steps kept on a PreparedScenario for workers to replay
+MAX_LINEAGE = 8
+
+class EntityDelta:
+    """Rows removed (positions into the parent version) and the entities appended after the kept rows."""
+
+    def __init__(self, removed: Any, added: EntityFrame):
+        self.removed = np.unique(np.asarray(removed, dtype=np.intp))
+        self.added = added
+
+def apply_delta(prepared: PreparedScenario, delta: EntityDelta, content_hash: Optional[str] = None) -> PreparedScenario:
+    old = prepared.frame
+    keep = np.ones(len(old), dtype=bool)
+    keep[delta.removed] = False
+    kept_rows = np.flatnonzero(keep)
+    kept = _canonical(old.subset(kept_rows)) if len(delta.removed) else old
+    frame = _merge(kept, _canonical(delta.added))
+    _carry(old, frame, delta, keep, kept_rows)
+    frame.prepare(_utility_features(prepared.meta) or DEFAULT_UTILITY_FEATURES)
+
+    out = PreparedScenario(prepared.meta, frame, content_hash)
+    if prepared.content_hash is not None:
+        out.lineage = (prepared.lineage + [(prepared.content_hash, delta)])[-MAX_LINEAGE:]
+    return out
+
+def _merge(kept: EntityFrame, added: EntityFrame) -> EntityFrame:
+    # Column by column with the ingestion merge rules (categories renumbered in first-appearance order);
+    # a field whose values differ in kind between the two is re-encoded as from_entities() would
+    head = {r["name"]: r for r in kept.to_columns()}
+    tail = {r["name"]: r for r in added.to_columns()}
+    rows = [len(kept), len(added)]
+    records = []
+    for name in list(head) + [n for n in tail if n not in head]:
+        pieces = [head.get(name), tail.get(name)]
+        if len({p["kind"] for p in pieces if p is not None}) > 1:
+            values = [v for p, k in zip(pieces, rows) for v in (_record_values(p) if p is not None else [None] * k)]
+            records.append(EntityFrame.from_entities([{name: v} for v in values]).to_columns()[1])
+        else:
+            records.append(concat_columns(name, pieces, rows))
+    return EntityFrame.from_columns(records)
+
+def _canonical(frame: EntityFrame) -> EntityFrame:
+    # What building the frame from these entities as part of a larger set would give (after removals). Emptied categories
+    # go and codes are renumbered by first appearance, columns without any value left are dropped, and
+    # columns whose remaining values are all numbers (or all hashable) change storage accordingly.
+    numeric = {k: v for k, v in frame.numeric_columns.items() if not np.isnan(v).all()}
+    kinds = {k: frame.kinds[k] for k in numeric}
+    categorical, objects = {}, {}
+    for k, (codes, cats) in frame.categorical_columns.items():
+        present = codes >= 0
+        if not present.any():
+            continue
+        first = np.full(len(cats), len(codes), dtype=np.int64)
+        np.minimum.at(first, codes[present], np.flatnonzero(present))
+        alive = np.flatnonzero(first < len(codes))
+        rank = alive[np.argsort(first[alive], kind="stable")]
+        if len(rank) != len(cats) or (rank != np.arange(len(cats))).any():
+            remap = np.full(len(cats) + 1, -1, dtype=np.int32)
+            remap[rank] = np.arange(len(rank), dtype=np.int32)
+            codes, cats = remap[codes], [cats[i] for i in rank.tolist()]
+            if all(_value_kind(c) in NUMERIC_KINDS for c in cats):
+                value_kinds = {_value_kind(c) for c in cats}
+                numeric[k] = np.array([float(c) for c in cats] + [np.nan])[codes]
+                kinds[k] = "float" if "float" in value_kinds else ("int" if "int" in value_kinds else "bool")
+                continue
+        categorical[k] = (codes, cats)
+    for k, values in frame.object_columns.items():
+        if all(v is None for v in values):
+            continue
+        try:
+            categorical[k] = _encode(values)
+        except TypeError:
+            objects[k] = values
+    fields = [f for f in frame.fields if f in numeric or f in categorical or f in objects]
+    return EntityFrame(frame.ids, numeric, kinds, categorical, fields, objects)
+
+def _without(sorted_vals: np.ndarray, remove: np.ndarray) -> np.ndarray:
+    # Multiset removal: equal values delete distinct slots
+    remove = np.sort(remove)
+    at = np.searchsorted(sorted_vals, remove, side="left")
+    at += np.arange(len(remove)) - np.searchsorted(remove, remove, side="left")
+    return np.delete(sorted_vals, at)
+
+def _with(sorted_vals: np.ndarray, add: np.ndarray) -> np.ndarray:
+    add = np.sort(add)
+    return np.insert(sorted_vals, np.searchsorted(sorted_vals, add), add)
+
+def _merge_order(order: np.ndarray, keep: np.ndarray, removed: np.ndarray, scores: np.ndarray, n_keep: int) -> np.ndarray:
+    # Drop removed rows and shift the rest to their new positions, then binary-search the added rows in;
+    # added rows sit after kept rows with an equal score, as their positions are larger
+    kept_order = order[keep[order]]
+    if len(removed):
+        kept_order = kept_order - np.searchsorted(removed, kept_order)
+    if len(scores) == n_keep:
+        return kept_order
+    added = n_keep + np.argsort(-scores[n_keep:], kind="stable")
+    at = np.searchsorted(-scores[kept_order], -scores[added], side="right")
+    return np.insert(kept_order, at, added)
+
+def _is_ordered(order: Optional[np.ndarray], scores: np.ndarray) -> bool:
+    # Descending by score, ties by ascending position: what a stable argsort of -scores returns
+    if order is None:
+        return False
+    s = scores[order]
+    return not ((s[1:] > s[:-1]) | ((s[1:] == s[:-1]) & (order[1:] < order[:-1]))).any()
+
+def _carry(old: EntityFrame, frame: EntityFrame, delta: EntityDelta, keep: np.ndarray, kept_rows: np.ndarray) -> None:
+    n_keep = len(kept_rows)
+    tail = frame.subset(slice(n_keep, None))
+    gone = old.subset(delta.removed)
+
+    # Norms, through the sorted extents of their source values
+    unchanged = set()
+    for kind, f in list(old._derived):
+        if kind != "norm" or not (old.has(f) and frame.has(f)):
+            continue
+        extent = old._derived.get(("extent", f))
+        if extent is None:
+            extent = np.sort(old.norm_source(f))
+        added = tail.norm_source(f)
+        new_extent = _with(_without(extent, gone.norm_source(f)), added)
+        frame._derived[("extent", f)] = new_extent
+        if len(extent) and len(new_extent) and extent[0] == new_extent[0] and extent[-1] == new_extent[-1]:
+            mn = new_extent[0]
+            rng = (new_extent[-1] - mn) or 1.0
+            norm = np.concatenate([old.norm(f)[kept_rows], (added - mn) / rng])
+            frame._derived[("norm", f)] = norm
+            tail._derived[("norm", f)] = norm[n_keep:]
+            unchanged.add(f)
+
+    # Materialized `<feature>_norm` columns (ingestion stores them) follow the maintained norms; columns
+    # that did not hold norm(feature) before are left alone
+    for name in list(frame.numeric_columns):
+        base = name[: -len("_norm")]
+        if name.endswith("_norm") and base in frame.numeric_columns and name in old.numeric_columns \
+                and old.has(base) and np.array_equal(old.numeric_columns[name], old.norm(base)):
+            frame.numeric_columns[name] = frame.norm(base)
+            frame.kinds[name] = "float"
+            tail.numeric_columns[name] = frame.numeric_columns[name][n_keep:]
+
+    # Score orders of the most recently used weights, oldest first so the LRU order carries over. Scores
+    # are recomputed over every row: a matrix-vector product over a slice need not match the same rows
+    # in a full pass bit for bit. Where no feature's min or max moved the previous order is merged with
+    # the added rows, and kept only if it is still sorted under the recomputed scores.
+    with old.score_lock:
+        entries = list(old.score_cache.items())
+    for key, scores in entries[-ORDERED_SCORES:]:
+        features, weights = json.loads(key)
+        new_scores = score_vector(frame, weights, features)
+        order = None
+        if all(f in unchanged for f in features):
+            order = old.score_orders.get(key)
+            if order is None:
+                order = np.argsort(-scores, kind="stable")
+            order = _merge_order(order, keep, delta.removed, new_scores, n_keep)
+        frame.score_orders[key] = order if _is_ordered(order, new_scores) else np.argsort(-new_scores, kind="stable")
+
+    # Group sizes: counts of the kept rows plus the added ones, by group label
+    for kind, f in list(old._derived):
+        if kind != "sizes":
+            continue
+        old_codes, old_labels = old.groups(f)
+        counts = dict(zip(old_labels, old._derived[("sizes", f)].tolist()))
+        for label, c in zip(old_labels, np.bincount(old_codes[delta.removed], minlength=len(old_labels)).tolist()):
+            counts[label] -= c
+        codes, labels = frame.groups(f)
+        for label, c in zip(labels, np.bincount(codes[n_keep:], minlength=len(labels)).tolist()):
+            counts[label] = counts.get(label, 0) + c
+        frame._derived[("sizes", f)] = np.array([counts.get(label, 0) for label in labels], dtype=np.int64)
+
+    # Eligibility: rules only read their own row, unless they test a norm whose min or max moved
+    def row_local(field: str) -> bool:
+        if _storage(old, field) != _storage(frame, field):
+            return False
+        base = field[: -len("_norm")]
+        return not field.endswith("_norm") or base in unchanged or (field in frame.numeric_columns and base not in frame.numeric_columns)
+
+    for kind, plan in list(old._derived):
+        if kind != "eligible":
+            continue
+        fields = {pred[0] for cond in plan[0] + plan[1] for pred in cond}
+        if all(row_local(f) for f in fields):
+            mask = np.concatenate([old._derived[("eligible", plan)][kept_rows], eligibility_mask(tail, plan)])
+            mask.setflags(write=False)
+            frame._derived[("eligible", plan)] = mask
+
+    # Id index: appends only extend it (removals shift every later position)
+    index = old._derived.get(("positions", "id"))
+    if index and not len(delta.removed):
+        index = dict(index)
+        for i, v in enumerate(tail.ids.tolist(), n_keep):
+            index.setdefault(v, i)
+        frame._derived[("positions", "id")] = index
+
+def _storage(frame: EntityFrame, field: str) -> str:
+    if field in frame.numeric_columns:
+        return "numeric"
+    if field in frame.categorical_columns:
+        return "categorical"
+    return "object" if field in frame.object_columns else "absent"
@@ -0,0 +1,294 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import io
+import json
+import numpy as np
+import pandas as pd
+from .frame import EntityFrame, _min_max_scale
+
+# Scenario ingestion: declarative column mappings per scenario type, and vectorized conversion of parsed
+# blocks of rows into column-store records (the EntityFrame.to_columns() format). Blocks are converted
+# independently and concatenated per column at the end, so a dataset never has to be held as entity dicts.
+
+# Profile fields take the first of their "from" source columns present in the data ("coalesce": the first
+# non-missing value across all of them, row by row). "numeric" values go through a CONVERTERS parser
+# ("parse", default pd.to_numeric; unparsable -> missing), "categorical" ones are kept as strings. "fill"
+# replaces missing values; "default" fills a field none of whose source columns exist ("{i}" / "{id}" are
+# replaced by the row number / entity id). Fields in "normalized" also get a <field>_norm column, min-max
+# scaled over the whole dataset with missing values as 0.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "hiring": {
+        "id": ("id", "enrollee_id"),
+        "fields": {
+            "name": {"from": ("name",), "kind": "categorical", "default": "Candidate {i}"},
+            "experience": {"from": ("experience", "years_experience"), "kind": "numeric", "default": 0.0},
+            "test_score": {"from": ("test_score", "training_hours"), "kind": "numeric", "default": 0.0},
+            "gender": {"from": ("gender", "Gender"), "kind": "categorical", "default": "unknown"},
+            "department": {"from": ("department", "Department"), "kind": "categorical"},
+        },
+        "normalized": ("experience", "test_score"),
+        "meta": {
+            "protected_attribute": "gender",
+            "constraints": {"require_if": [], "disqualify_if": []},
+            "scenario_name": "Hiring",
+            "entity_type": "candidate",
+            "attributes": ["gender", "department", "experience", "test_score"],
+            "metrics": {"utility_features": ["experience", "test_score"], "fairness_protected": "gender"},
+            "rules": [],
+            "default_params": {"top_k": 10, "weights": {"experience": 0.5, "test_score": 0.5}},
+            "description": "Simulation using full hiring.csv dataset",
+        },
+    },
+    # Kaggle HR analytics exports (scripts/build_hiring_scenario.py)
+    "hiring_kaggle": {
+        "id": ("enrollee_id", "id"),
+        "fields": {
+            "name": {"from": ("name",), "kind": "categorical", "default": "Candidate {id}"},
+            "experience": {"from": ("experience", "Experience", "years_experience"), "kind": "numeric", "coalesce": True,
+                           "parse": "open_range", "fill": 0.0, "default": 0.0},
+            "test_score": {"from": ("training_hours", "Training_hours", "test_score", "score"), "kind": "numeric", "coalesce": True,
+                           "fill": 0.0, "default": 0.0},
+            "gender": {"from": ("gender", "Gender", "sex", "Sex"), "kind": "categorical", "coalesce": True, "fill": "unknown", "default": "unknown"},
+            "department": {"from": ("department", "Department", "dept", "Dept"), "kind": "categorical", "coalesce": True},
+            "education": {"from": ("education_level", "education", "Education"), "kind": "categorical", "coalesce": True},
+        },
+        "normalized": (),
+        "meta": {
+            "protected_attribute": "gender",
+            "constraints": {"require_if": [], "disqualify_if": []},
+            "scenario_name": "Hiring",
+            "entity_type": "candidate",
+            "attributes": ["department", "education", "experience", "gender", "test_score"],
+            "metrics": {"utility_features": ["experience", "test_score"], "fairness_protected": "gender"},
+            "rules": [],
+            "default_params": {"top_k": 10, "weights": {"experience": 0.5, "test_score": 0.5}},
+            "description": "Simulation using full Kaggle HR dataset",
+        },
+    },
+    "healthcare": {
+        "id": ("patient_id",),
+        "fields": {
+            "age": {"from": ("age",), "kind": "numeric", "default": 0.0},
+            "severity": {"from": ("severity",), "kind": "numeric", "default": 0.0},
+            "priority": {"from": ("priority",), "kind": "numeric", "default": 0.0},
+            "treatment_cost": {"from": ("treatment_cost",), "kind": "numeric", "default": 0.0},
+            "income_group": {"from": ("income_group",), "kind": "categorical", "default": "unknown"},
+        },
+        "normalized": ("severity", "priority"),
+        "meta": {
+            "protected_attribute": "income_group",
+            "constraints": {"require_if": [], "disqualify_if": []},
+            "scenario_name": "Healthcare",
+            "entity_type": "patient",
+            "attributes": ["age", "severity", "priority", "income_group"],
+            "metrics": {"utility_features": ["severity", "priority"], "fairness_protected": "income_group"},
+            "rules": [{"field": "priority_norm", "min": 0.5}],
+            "default_params": {"top_k": 20, "weights": {"severity": 0.6, "priority": 0.4}},
+            "description": "Resource allocation with fairness by income group",
+        },
+    },
+    "self_driving": {
+        "id": ("scenario_id",),
+        "fields": {
+            "passenger_age": {"from": ("passenger_age",), "kind": "numeric", "default": 0.0},
+            "pedestrian_age": {"from": ("pedestrian_age",), "kind": "numeric", "default": 0.0},
+            "risk_level": {"from": ("risk_level",), "kind": "numeric", "default": 0.0},
+            "group": {"from": ("group",), "kind": "categorical", "default": "unknown"},
+        },
+        "normalized": ("risk_level",),
+        "meta": {
+            "protected_attribute": "group",
+            "constraints": {"require_if": [], "disqualify_if": []},
+            "scenario_name": "Self-Driving Car",
+            "entity_type": "event",
+            "attributes": ["passenger_age", "pedestrian_age", "risk_level", "group"],
+            "metrics": {"utility_features": ["risk_level"], "fairness_protected": "group"},
+            "rules": [{"field": "group", "one_of_not": ["child"]}],
+            "default_params": {"top_k": 10, "weights": {"risk_level": -1.0}},
+            "description": "Accident dilemmas balancing harm minimization and ethics",
+        },
+    },
+}
+
+INGEST_FORMATS = ("csv", "ndjson")
+
+def read_block(data: bytes, fmt: str, header: Optional[str] = None) -> pd.DataFrame:
+    # CSV cells stay strings so every block types its columns the same way; conversion happens per field
+    if fmt == "ndjson":
+        return pd.read_json(io.BytesIO(data), lines=True, dtype=False, convert_dates=False)
+    buf = io.BytesIO((header.encode() + b"\n" + data) if header is not None else data)
+    return pd.read_csv(buf, dtype=str, keep_default_na=True)
+
+def block_columns(df: pd.DataFrame, profile: Optional[Dict[str, Any]], start: int) -> List[Dict[str, Any]]:
+    """Column records for one block of rows; `start` is the row number of its first row."""
+    df = df.reset_index(drop=True)
+    n = len(df)
+    if profile is None:
+        ids = _values(df["id"]) if "id" in df.columns else np.arange(start, start + n).tolist()
+        records = [{"name": "id", "kind": "ids", "dtype": None, "data": None, "items": ids}]
+        return records + [_infer_column(name, df[name]) for name in df.columns if name != "id"]
+
+    id_col = next((c for c in profile["id"] if c in df.columns), None)
+    ids = df[id_col].astype(str) if id_col is not None else pd.Series(pd.RangeIndex(start, start + n).astype(str))
+    records = [{"name": "id", "kind": "ids", "dtype": None, "data": None, "items": ids.tolist()}]
+    for name, spec in profile["fields"].items():
+        col = _field_source(df, spec, ids, start)
+        if spec["kind"] == "numeric":
+            values = CONVERTERS[spec.get("parse", "number")](col)
+            if "fill" in spec:
+                values = values.fillna(spec["fill"])
+            records.append(_numeric(name, values.to_numpy(dtype=np.float64), "float"))
+        else:
+            col = col.where(col.isna(), col.astype(str))
+            if "fill" in spec:
+                col = col.fillna(spec["fill"])
+            records.append(_categorical(name, col))
+    return records
+
+def assemble_columns(names: Sequence[str], pieces_of: Callable[[str], Sequence[Optional[Dict[str, Any]]]],
+                     rows: Sequence[int], profile: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Final column records, one column at a time: `pieces_of(name)` gives that column's per-block records."""
+    normalized = set(profile["normalized"]) if profile else set()
+    if not rows:
+        yield {"name": "id", "kind": "ids", "dtype": None, "data": None, "items": []}
+        return
+    for name in names:
+        record = concat_columns(name, pieces_of(name), rows)
+        yield record
+        if name in normalized and record["kind"] == "numeric":
+            yield normalized_column(record)
+
+def convert_csv(path: str, profile: Optional[Dict[str, Any]], block_rows: int = 100_000) -> List[Dict[str, Any]]:
+    """Column records for a whole CSV file, read and converted block by block."""
+    blocks: List[Dict[str, Dict[str, Any]]] = []
+    rows: List[int] = []
+    # Only the source columns a profile can use are parsed at all (plus the first, so rows are still
+    # counted when none of them is present)
+    usecols = None
+    if profile is not None:
+        first = next(iter(pd.read_csv(path, nrows=0).columns), None)
+        usecols = {first, *profile["id"], *(c for spec in profile["fields"].values() for c in spec["from"])}.__contains__
+    for df in pd.read_csv(path, dtype=str, keep_default_na=True, chunksize=block_rows, usecols=usecols):
+        blocks.append({r["name"]: r for r in block_columns(df, profile, sum(rows))})
+        rows.append(len(df))
+    names = list(dict.fromkeys(["id", *(name for block in blocks for name in block)]))
+    return list(assemble_columns(names, lambda name: [block.get(name) for block in blocks], rows, profile))
+
+def scenario_from_columns(records: List[Dict[str, Any]], type: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Scenario JSON (entities inline) in the shape POST /api/scenarios accepts as config."""
+    return {"type": type, **meta, "entities": EntityFrame.from_columns(records).to_entities()}
+
+def concat_columns(name: str, pieces: Sequence[Optional[Dict[str, Any]]], rows: Sequence[int]) -> Dict[str, Any]:
+    """One column record from its per-block records (None where a block lacked the column)."""
+    kinds = {p["kind"] for p in pieces if p is not None}
+    if kinds == {"ids"}:
+        return {"name": name, "kind": "ids", "dtype": None, "data": None, "items": [i for p in pieces for i in p["items"]]}
+    if kinds == {"numeric"}:
+        dtypes = {p["dtype"] for p in pieces if p is not None}
+        # Same rule as EntityFrame.from_entities: any float makes the column float, else any int makes it int
+        dtype = "float" if "float" in dtypes else ("int" if "int" in dtypes else dtypes.pop())
+        data = np.concatenate([np.frombuffer(p["data"], dtype="<f8") if p is not None else np.full(k, np.nan)
+                               for p, k in zip(pieces, rows)]) if pieces else np.zeros(0)
+        return _numeric(name, data, dtype)
+    if kinds == {"categorical"}:
+        # Block-local category codes are renumbered into one list in first-appearance order
+        index: Dict[Any, int] = {}
+        codes = []
+        for p, k in zip(pieces, rows):
+            if p is None:
+                codes.append(np.full(k, -1, dtype=np.int32))
+                continue
+            if not index:
+                # The first block's categories are already distinct and in order: its codes stay as they are
+                index = dict(zip(p["items"], range(len(p["items"]))))
+                codes.append(np.frombuffer(p["data"], dtype="<i4"))
+                continue
+            remap = np.array([index.setdefault(c, len(index)) for c in p["items"]] + [-1], dtype=np.int32)
+            codes.append(remap[np.frombuffer(p["data"], dtype="<i4")])
+        return {"name": name, "kind": "categorical", "dtype": None,
+                "data": np.concatenate(codes).astype("<i4").tobytes() if codes else b"", "items": list(index)}
+    # Mixed kinds across blocks (e.g. NDJSON values that change type): fall back to raw values
+    values = [v for p, k in zip(pieces, rows) for v in (_record_values(p) if p is not None else [None] * k)]
+    try:
+        return _categorical(name, pd.Series(values, dtype=object))
+    except TypeError:
+        return {"name": name, "kind": "json", "dtype": None, "data": None, "items": values}
+
+def normalized_column(record: Dict[str, Any]) -> Dict[str, Any]:
+    vals = np.nan_to_num(np.frombuffer(record["data"], dtype="<f8"), nan=0.0)
+    return _numeric(f"{record['name']}_norm", _min_max_scale(vals), "float")
+
+def _field_source(df: pd.DataFrame, spec: Dict[str, Any], ids: pd.Series, start: int) -> pd.Series:
+    # First present source column, or with "coalesce" the first non-missing value across all of them
+    present = [c for c in spec["from"] if c in df.columns]
+    if present:
+        col = df[present[0]]
+        for other in present[1:] if spec.get("coalesce") else ():
+            col = col.fillna(df[other])
+        return col
+    default = spec.get("default")
+    if isinstance(default, str) and ("{i}" in default or "{id}" in default):
+        token = "{id}" if "{id}" in default else "{i}"
+        head, tail = default.split(token, 1)
+        values = ids if token == "{id}" else pd.Series(pd.RangeIndex(start, start + len(df)).astype(str))
+        return head + values + tail
+    return pd.Series([default] * len(df), dtype=object)
+
+def _parse_number(col: pd.Series) -> pd.Series:
+    return pd.to_numeric(col, errors="coerce")
+
+def _parse_open_range(col: pd.Series) -> pd.Series:
+    # Kaggle-style experience buckets: ">20" -> 21 (one above the bound), "<1" -> 0.5, else the number.
+    # Only values that do not parse as plain numbers go through the string operations.
+    out = pd.to_numeric(col, errors="coerce").astype(np.float64)
+    rest = col[out.isna() & col.notna()].astype(str).str.strip()
+    if len(rest):
+        above = rest[rest.str.startswith(">")]
+        out[above.index] = pd.to_numeric(above.str[1:], errors="coerce").add(1.0).fillna(21.0)
+        out[rest.index[rest.str.startswith("<")]] = 0.5
+    return out
+
+# Named value parsers for numeric profile fields ("parse")
+CONVERTERS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    "number": _parse_number,
+    "open_range": _parse_open_range,
+}
+
+def _numeric(name: str, values: np.ndarray, dtype: str) -> Dict[str, Any]:
+    return {"name": name, "kind": "numeric", "dtype": dtype, "data": np.ascontiguousarray(values, dtype="<f8").tobytes(), "items": None}
+
+def _categorical(name: str, col: pd.Series) -> Dict[str, Any]:
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    return {"name": name, "kind": "categorical", "dtype": None, "data": codes.astype("<i4").tobytes(), "items": _values(pd.Series(uniques, dtype=object))}
+
+def _infer_column(name: str, col: pd.Series) -> Dict[str, Any]:
+    # Profile-less ingestion: a column is numeric when every present value parses as a number
+    if col.dtype == bool:
+        return _numeric(name, col.to_numpy(dtype=np.float64), "bool")
+    parsed = pd.to_numeric(col, errors="coerce")
+    if col.notna().any() and parsed.notna().sum() == col.notna().sum():
+        if col.dtype.kind in "iu":
+            kind = "int"
+        elif col.dtype.kind == "f":
+            kind = "float"
+        else:
+            kind = "int" if col.dropna().astype(str).str.fullmatch(r"[+-]?\d+").all() else "float"
+        return _numeric(name, parsed.to_numpy(dtype=np.float64), kind)
+    try:
+        return _categorical(name, col.astype(object))
+    except TypeError:
+        return {"name": name, "kind": "json", "dtype": None, "data": None, "items": _values(col)}
+
+def _values(col: pd.Series) -> List[Any]:
+    # JSON-safe Python values with missing entries as None
+    return json.loads(col.astype(object).where(col.notna(), None).to_json(orient="values")) if len(col) else []
+
+def _record_values(record: Dict[str, Any]) -> List[Any]:
+    if record["kind"] == "numeric":
+        vals = np.frombuffer(record["data"], dtype="<f8")
+        cast = {"int": int, "bool": bool}.get(record["dtype"], float)
+        return [None if v != v else cast(v) for v in vals.tolist()]
+    if record["kind"] == "categorical":
+        table = np.empty(len(record["items"]) + 1, dtype=object)
+        table[:-1] = record["items"]
+        return table[np.frombuffer(record["data"], dtype="<i4")].tolist()
+    return list(record["items"])
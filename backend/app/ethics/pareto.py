@@ -0,0 +1,132 @@
+from typing import Dict, Any, List, Optional, Sequence
+import itertools
+import numpy as np
+from .frame import DEFAULT_UTILITY_FEATURES
+from .fairness import QUOTA_MODES, group_quotas
+from .ranking import first_matching, first_per_group
+from .rules import compile_rules, eligibility_mask
+from .runner import PreparedScenario, _utility_features
+from .sweep import SWEEP_BLOCK_CELLS
+
+# Pareto frontier over (avg_utility, 1 - parity_gap, constraint_satisfaction_rate) across weight/top_k space.
+#
+# An operating point is one framework's selection under a weight vector and top_k (and quota_mode for
+# fairness), and all three objectives are measured on that selection: the mean score of the selected
+# entities, one minus the spread of their per-group selection rates, and the share of the k picks that
+# satisfy the scenario rules. Every weight vector is ranked once; each framework's selections for all
+# top_k values are prefixes of what it reads off that ranking, so they come from running sums.
+
+def simplex_weights(n_features: int, resolution: int) -> np.ndarray:
+    # All weight vectors with entries in {0, 1/r, ..., 1} summing to 1: (n_vectors, n_features)
+    r = max(1, int(resolution))
+    rows = [c for c in itertools.product(range(r + 1), repeat=max(0, n_features - 1)) if sum(c) <= r]
+    return np.array([[*c, r - sum(c)] for c in rows], dtype=float).reshape(-1, n_features) / r
+
+def default_top_ks(n: int, max_k: Optional[int] = None, count: int = 25) -> List[int]:
+    hi = max(1, min(n, max_k or n))
+    return sorted({int(k) for k in np.round(np.geomspace(1, hi, num=min(count, hi)))})
+
+def non_dominated(values: np.ndarray) -> np.ndarray:
+    # Indices of rows not dominated by any other row (all objectives maximized). Rows are visited best
+    # first on the first objective, so each only needs checking against the front kept so far.
+    order = np.lexsort(tuple(-values[:, j] for j in reversed(range(values.shape[1]))))
+    front: List[int] = []
+    for i in order:
+        if front:
+            kept = values[front]
+            if np.any(np.all(kept >= values[i], axis=1) & np.any(kept > values[i], axis=1)):
+                continue
+            if np.any(np.all(kept == values[i], axis=1)):
+                continue
+        front.append(int(i))
+    return np.array(front, dtype=np.intp)
+
+def _prefix_sums(sel: np.ndarray, scores: np.ndarray, eligible: np.ndarray, ms: np.ndarray):
+    # Score sums and eligible counts of the first m entries of a best-first selection, for each m in ms
+    ms = np.minimum(ms, len(sel))
+    total = np.concatenate([[0.0], np.cumsum(scores[sel])])[ms]
+    elig = np.concatenate([[0], np.cumsum(eligible[sel])])[ms]
+    return total, elig
+
+def _parity(counts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    # Max minus min per-group selection rate, per row of counts
+    rates = counts / np.maximum(1, sizes)
+    return rates.max(axis=1) - rates.min(axis=1) if rates.shape[1] else np.zeros(len(rates))
+
+def pareto_frontier(prepared: PreparedScenario, top_ks: Optional[Sequence[int]] = None, resolution: int = 10,
+                    quota_modes: Sequence[str] = ("round_robin",), max_k: Optional[int] = None) -> Dict[str, Any]:
+    frame, meta = prepared.frame, prepared.meta
+    n = len(frame)
+    features = _utility_features(meta) or DEFAULT_UTILITY_FEATURES
+    ks = sorted({max(1, int(k)) for k in top_ks}) if top_ks else default_top_ks(n, max_k)
+    modes = [m for m in dict.fromkeys(quota_modes) if m in QUOTA_MODES] or ["round_robin"]
+    W = simplex_weights(len(features), resolution)
+
+    # Weight-independent state: eligibility, groups and the fairness quotas of every (top_k, quota_mode)
+    eligible = eligibility_mask(frame, compile_rules(meta.get("constraints", {}), meta.get("rules", [])))
+    codes, labels = frame.groups(meta.get("protected_attribute") or "gender")
+    sizes = np.bincount(codes, minlength=len(labels))
+    quotas = {(k, mode): group_quotas(sizes, k, mode) for k in ks for mode in modes}
+    group_q = np.array(list(quotas.values()), dtype=np.intp).reshape(len(quotas), len(labels)).T
+    group_kmax = group_q.max(axis=1) if len(quotas) else np.zeros(len(labels), dtype=np.intp)
+    kmax = min(max(ks), n)
+
+    # One (top_k, quota_mode) setting per row for each framework: fairness selects quota[g] from each group
+    settings = [("utilitarian", {"top_k": k}) for k in ks] + [("rule_based", {"top_k": k}) for k in ks]
+    settings += [("fairness", {"top_k": k, "quota_mode": mode}) for k, mode in quotas]
+    k_arr = np.array(ks, dtype=float)
+    fair_k = np.array([k for k, _ in quotas], dtype=float)
+    fair_count = group_q.sum(axis=0)
+    fair_gap = _parity(group_q.T, sizes)
+
+    X = frame.feature_matrix(features)
+    utility = frame.numeric("utility")
+    has_utility = ~np.isnan(utility)
+    objectives = []
+    block = max(1, SWEEP_BLOCK_CELLS // max(1, n))
+    for b0 in range(0, len(W), block):
+        S = X @ W[b0:b0 + block].T
+        S[has_utility] = utility[has_utility, None]
+        for j in range(S.shape[1]):
+            scores = S[:, j]
+            # One stable ranking per weight vector; every framework's selection is read off it
+            order = np.argsort(-scores, kind="stable")
+            # Utilitarian: the first k; rule-based: the first k eligible
+            for sel in (order[:kmax], first_matching(order, eligible, kmax)):
+                ms = np.minimum(ks, len(sel))
+                total, elig = _prefix_sums(sel, scores, eligible, ms)
+                counts = np.stack([np.concatenate([[0], np.cumsum(codes[sel] == g)])[ms] for g in range(len(labels))], axis=1) \
+                    if len(labels) else np.zeros((len(ks), 0))
+                objectives.append(np.column_stack([total / np.maximum(1, ms), 1.0 - _parity(counts, sizes), elig / k_arr]))
+            # Fairness: the first quota[g] of each group
+            picks = first_per_group(order, codes, group_kmax)
+            total, elig = np.zeros(len(quotas)), np.zeros(len(quotas))
+            for g, q_g in enumerate(group_q):
+                t, e = _prefix_sums(picks.get(g, order[:0]), scores, eligible, q_g)
+                total += t
+                elig += e
+            objectives.append(np.column_stack([total / np.maximum(1, fair_count), 1.0 - fair_gap, elig / fair_k]))
+
+    values = np.concatenate(objectives) if objectives else np.empty((0, 3))
+    # Identical objective vectors are common (equal selections); the frontier filter only needs the first
+    _, first = np.unique(values, axis=0, return_index=True)
+    front = np.sort(first)[non_dominated(values[np.sort(first)])]
+    frontier = []
+    for i in front:
+        w, r = divmod(int(i), len(settings))
+        framework, params = settings[r]
+        frontier.append({
+            "framework": framework,
+            "params": {"weights": dict(zip(features, W[w].tolist())), **params},
+            "objectives": dict(zip(("avg_utility", "fairness", "constraint_satisfaction_rate"), values[i].tolist())),
+        })
+    frontier.sort(key=lambda c: -c["objectives"]["avg_utility"])
+    return {
+        "features": list(features),
+        "evaluated": len(values),
+        "frontier": frontier,
+    }
+
+def pareto_task(prepared: PreparedScenario, _frameworks: List[str], spec: Dict[str, Any]) -> Dict[str, Any]:
+    # Executor entry point
+    return pareto_frontier(prepared, **spec)
@@ -0,0 +1,55 @@
+import numpy as np
+
+# Partial top-k selection over score vectors. Ties are broken by entity position, so the result is
+# identical to the first k items of a stable descending sort (what sorted(..., reverse=True) gave).
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    n = len(scores)
+    k = min(max(int(k), 0), n)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k == n:
+        return np.argsort(-scores, kind="stable")
+    # k-th largest value; everything above it is in, ties at the boundary go to the earliest entities
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    tied = np.flatnonzero(scores == kth)[: k - len(above)]
+    winners = np.concatenate([above, tied])
+    return winners[np.lexsort((winners, -scores[winners]))]
+
+# With a maintained descending order (score_order) the same selections are prefix scans: the order is
+# read in growing chunks until enough entities qualify, so a top-k touches about k/rate entries.
+
+def _chunks(order: np.ndarray, k: int):
+    start, step = 0, max(1024, 4 * int(k))
+    while start < len(order):
+        yield order[start:start + step]
+        start += step
+        step *= 4
+
+def first_matching(order: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """The first k entries of `order` whose mask is set."""
+    k = max(int(k), 0)
+    found, count = [], 0
+    if k:
+        for chunk in _chunks(order, k):
+            hit = chunk[mask[chunk]][: k - count]
+            found.append(hit)
+            count += len(hit)
+            if count == k:
+                break
+    return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+def first_per_group(order: np.ndarray, codes: np.ndarray, quotas: np.ndarray) -> dict:
+    """Group code -> its first quotas[g] entries of `order`, for every group with a quota."""
+    need = np.asarray(quotas, dtype=np.int64).copy()
+    found = {int(g): [] for g in np.flatnonzero(need)}
+    for chunk in _chunks(order, need.sum()):
+        if not need.any():
+            break
+        chunk_codes = codes[chunk]
+        for g in np.flatnonzero(need):
+            hit = chunk[chunk_codes == g][: need[g]]
+            found[int(g)].append(hit)
+            need[g] -= len(hit)
+    return {g: np.concatenate(parts).astype(np.intp) for g, parts in found.items()}
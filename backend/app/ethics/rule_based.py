@@ -1,59 +1,52 @@
-from typing import List, Dict, Any, Tuple
+from typing import Dict, Any, Tuple
+import numpy as np
+from .frame import EntityFrame
+from .rules import compile_rules, eligibility_mask
+from .ranking import top_k_indices, first_matching
+from .scoring import common_scores, selection_metrics
 
 # Rule-based: Enforce hard constraints; if multiple candidates satisfy, use tie-breaker by score
 
-def rule_based_decision(entities: List[Dict[str, Any]], common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+def rule_metrics(k: int, n_eligible: int, n: int, scores: np.ndarray, selected: np.ndarray) -> Dict[str, Any]:
+    # Metrics: constraint satisfaction rate
+    return {
+        "constraint_satisfaction_rate": (len(selected) / max(1, k)),
+        "eligibility_rate": (n_eligible / max(1, n)),
+        **selection_metrics(scores, selected),
+    }
+
+def rule_based_decision(frame: EntityFrame, common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     constraints = common.get("constraints", {})
     params = common.get("params", {})
     disqualify_rules = constraints.get("disqualify_if", [])  # e.g., [{"field": "has_criminal_record", "equals": True}]
     require_rules = constraints.get("require_if", [])        # e.g., [{"field": "degree", "one_of": ["Masters","PhD"]}]
+    rules = common.get("rules", [])                           # scenario-level, e.g., [{"field": "priority_norm", "min": 0.5}]
+
+    eligible = eligibility_mask(frame, compile_rules(constraints, rules))
+
+    # Tie-break by the shared score vector
+    scores = common_scores(frame, common)
 
-    def satisfies_require(e):
-        for r in require_rules:
-            field = r.get("field")
-            if "equals" in r and e.get(field) != r.get("equals"):
-                return False
-            if "one_of" in r and e.get(field) not in set(r.get("one_of", [])):
-                return False
-        return True
-
-    def violates_disqualify(e):
-        for r in disqualify_rules:
-            field = r.get("field")
-            if "equals" in r and e.get(field) == r.get("equals"):
-                return True
-            if "one_of" in r and e.get(field) in set(r.get("one_of", [])):
-                return True
-        return False
-
-    eligible = [e for e in entities if satisfies_require(e) and not violates_disqualify(e)]
-
-    # Tie-break: by provided 'utility' or weighted numeric attributes
-    weights = params.get("weights", {})
-    def score(e):
-        if "utility" in e:
-            return float(e["utility"])
-        s = 0.0
-        for k, w in weights.items():
-            if k in e and isinstance(e[k], (int, float)):
-                s += w * float(e[k])
-        return s
-
-    eligible_sorted = sorted(eligible, key=score, reverse=True)
     k = int(params.get("top_k", 1))
-    selected = eligible_sorted[:k]
+    n_eligible = int(np.count_nonzero(eligible))
+    ranked = common.get("order")
+    if ranked is not None:
+        # Maintained score order: the first k eligible entries of it
+        selected = first_matching(ranked, eligible, k)
+    else:
+        eligible_idx = np.flatnonzero(eligible)
+        selected = eligible_idx[top_k_indices(scores[eligible_idx], k)]
 
     decisions = {
-        "selected_ids": [e.get("id") for e in selected],
-        "eligible_count": len(eligible),
-        "disqualified_count": len(entities) - len(eligible)
+        "selected_ids": frame.ids[selected].tolist(),
+        "eligible_count": n_eligible,
+        "disqualified_count": len(frame) - n_eligible
     }
 
-    # Metrics: constraint satisfaction rate
-    metrics = {
-        "constraint_satisfaction_rate": (len(selected) / max(1, k)),
-        "eligibility_rate": (len(eligible) / max(1, len(entities)))
-    }
+    metrics = rule_metrics(k, n_eligible, len(frame), scores, selected)
 
-    context = {"applied_rules": {"require_if": require_rules, "disqualify_if": disqualify_rules}}
-    return decisions, metrics, context
\ No newline at end of file
+    applied = {"require_if": require_rules, "disqualify_if": disqualify_rules}
+    if rules:
+        applied["rules"] = rules
+    context = {"applied_rules": applied}
+    return decisions, metrics, context
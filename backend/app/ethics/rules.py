@@ -0,0 +1,88 @@
+from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+import json
+import numpy as np
+from .frame import EntityFrame
+
+# Rule lists compiled once into a predicate plan and evaluated as boolean masks over frame columns.
+#
+# A rule is {"field": ..., <op>: ...} with ops: equals, one_of, one_of_not, min, max and
+# range ([lo, hi], either end may be null). All ops inside one rule must hold for the rule to match.
+# require_if and the scenario-level `rules` list must all match; any matching disqualify_if rule
+# excludes the entity.
+
+Predicate = Tuple[str, str, Any]          # (field, op, operand)
+Condition = Tuple[Predicate, ...]         # all predicates of one rule
+RulePlan = Tuple[Tuple[Condition, ...], Tuple[Condition, ...]]  # (required, disqualifying)
+
+def _compile_rule(rule: Dict[str, Any]) -> Condition:
+    field = rule.get("field")
+    if not field:
+        return ()
+    preds: List[Predicate] = []
+    if "equals" in rule:
+        preds.append((field, "one_of", (rule["equals"],)))
+    if "one_of" in rule:
+        preds.append((field, "one_of", tuple(rule.get("one_of") or ())))
+    if "one_of_not" in rule:
+        preds.append((field, "one_of_not", tuple(rule.get("one_of_not") or ())))
+    bounds = [("min", rule.get("min")), ("max", rule.get("max"))]
+    rng = rule.get("range")
+    if isinstance(rng, (list, tuple)) and len(rng) == 2:
+        bounds += [("min", rng[0]), ("max", rng[1])]
+    for op, v in bounds:
+        if v is None:
+            continue
+        try:
+            preds.append((field, op, float(v)))
+        except (TypeError, ValueError):
+            continue
+    return tuple(preds)
+
+@lru_cache(maxsize=256)
+def _compile(rules_key: str) -> RulePlan:
+    spec = json.loads(rules_key)
+    required = tuple(c for c in map(_compile_rule, spec["require"]) if c)
+    disqualifying = tuple(c for c in map(_compile_rule, spec["disqualify"]) if c)
+    return required, disqualifying
+
+def compile_rules(constraints: Dict[str, Any], rules: List[Dict[str, Any]] | None = None) -> RulePlan:
+    # The canonical JSON of the rule set is the cache key, so repeat runs skip compilation
+    spec = {
+        "require": list(constraints.get("require_if", [])) + list(rules or []),
+        "disqualify": list(constraints.get("disqualify_if", [])),
+    }
+    return _compile(json.dumps(spec, sort_keys=True, default=str))
+
+plan_cache_info = _compile.cache_info
+
+def _predicate_mask(frame: EntityFrame, pred: Predicate) -> np.ndarray:
+    field, op, operand = pred
+    if op == "one_of":
+        return frame.isin(field, operand)
+    if op == "one_of_not":
+        return ~frame.isin(field, operand)
+    vals = frame.numeric(field)
+    with np.errstate(invalid="ignore"):
+        return vals >= operand if op == "min" else vals <= operand
+
+def _condition_mask(frame: EntityFrame, cond: Condition) -> np.ndarray:
+    mask = np.ones(len(frame), dtype=bool)
+    for pred in cond:
+        mask &= _predicate_mask(frame, pred)
+    return mask
+
+def eligibility_mask(frame: EntityFrame, plan: RulePlan) -> np.ndarray:
+    # Cached per frame and plan (read-only); entity deltas carry it forward for the unchanged rows
+    key = ("eligible", plan)
+    if key in frame._derived:
+        return frame._derived[key]
+    required, disqualifying = plan
+    eligible = np.ones(len(frame), dtype=bool)
+    for cond in required:
+        eligible &= _condition_mask(frame, cond)
+    for cond in disqualifying:
+        eligible &= ~_condition_mask(frame, cond)
+    eligible.setflags(write=False)
+    frame._derived[key] = eligible
+    return eligible
@@ -1,5 +1,7 @@
+import time
 from typing import Dict, Any, List, Tuple
-from statistics import mean
+from .frame import EntityFrame, DEFAULT_UTILITY_FEATURES
+from .scoring import score_vector, score_order
 from .utilitarian import utilitarian_decision
 from .fairness import fairness_decision
 from .rule_based import rule_based_decision
@@ -12,77 +14,73 @@ FRAMEWORK_DISPATCH = {
     "rule_based": rule_based_decision,
 }
 
-def _min_max(values: List[float]) -> Tuple[float, float]:
-    if not values:
-        return 0.0, 1.0
-    return min(values), max(values) if max(values) != min(values) else (min(values), min(values) + 1.0)
+def _utility_features(scenario: Dict[str, Any]) -> List[str]:
+    try:
+        return list(scenario.get("metrics", {}).get("utility_features", []))
+    except Exception:
+        return []
 
-def _normalize_entities(entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    # Ensure numeric fields and normalize to [0,1]
-    exps = []
-    tests = []
-    for e in entities:
-        exp = e.get("experience")
-        ts = e.get("test_score") or e.get("training_hours")
-        try:
-            exps.append(float(exp) if exp is not None else 0.0)
-        except Exception:
-            exps.append(0.0)
-        try:
-            tests.append(float(ts) if ts is not None else 0.0)
-        except Exception:
-            tests.append(0.0)
-    mn_exp, mx_exp = (min(exps), max(exps)) if exps else (0.0, 1.0)
-    mn_ts, mx_ts = (min(tests), max(tests)) if tests else (0.0, 1.0)
-    rng_exp = (mx_exp - mn_exp) or 1.0
-    rng_ts = (mx_ts - mn_ts) or 1.0
+class PreparedScenario:
+    """Scenario metadata plus its columnar, normalized entities; reusable across runs."""
 
-    normed = []
-    for i, e in enumerate(entities):
-        exp = exps[i] if i < len(exps) else 0.0
-        ts = tests[i] if i < len(tests) else 0.0
-        e2 = dict(e)
-        e2["experience_norm"] = (exp - mn_exp) / rng_exp
-        e2["test_score_norm"] = (ts - mn_ts) / rng_ts
-        # Ensure categorical fields exist (fallbacks)
-        if "gender" not in e2:
-            e2["gender"] = e2.get("Gender") or "unknown"
-        if "department" not in e2:
-            e2["department"] = e2.get("dept") or e2.get("Department") or None
-        normed.append(e2)
-    return normed
+    def __init__(self, meta: Dict[str, Any], frame: EntityFrame, content_hash: str | None = None):
+        self.meta = meta
+        self.frame = frame
+        self.content_hash = content_hash
+        # (parent content hash, EntityDelta) steps that produced this version from earlier ones, oldest
+        # first; process workers replay them onto a version they already hold (see executor.py)
+        self.lineage: List[Tuple[str, Any]] = []
+
+def prepare_scenario(scenario: Dict[str, Any], frame: EntityFrame | None = None) -> PreparedScenario:
+    # Columnar entities with every declared utility feature normalized up front
+    meta = {k: v for k, v in scenario.items() if k != "entities"}
+    if frame is None:
+        frame = EntityFrame.from_entities(scenario.get("entities", []))
+    frame.prepare(_utility_features(meta) or DEFAULT_UTILITY_FEATURES)
+    return PreparedScenario(meta, frame)
 
 def run_simulation(scenario: Dict[str, Any], frameworks: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    return run_prepared(prepare_scenario(scenario), frameworks, params)
+
+def run_prepared(prepared: PreparedScenario, frameworks: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
     results = []
 
     # Normalize inputs
+    scenario = prepared.meta
     scenario_type = scenario.get("type")
-    entities_raw = scenario.get("entities", [])
     constraints = scenario.get("constraints", {})
     protected_attribute = scenario.get("protected_attribute") or "gender"
 
-    entities = _normalize_entities(entities_raw)
-
-    utility_features = []
-    try:
-        utility_features = list(scenario.get("metrics", {}).get("utility_features", []))
-    except Exception:
-        utility_features = []
+    frame = prepared.frame
+    utility_features = _utility_features(scenario)
+    # Seconds per stage; per-framework stages are keyed by framework
+    timings: Dict[str, Any] = {"framework": {}, "explanation": {}}
+    t0 = time.perf_counter()
 
     common = {
         "scenario_type": scenario_type,
         "constraints": constraints,
+        "rules": scenario.get("rules", []),
         "protected_attribute": protected_attribute,
         "utility_features": utility_features,
         "params": params,
+        # Shared scoring stage: every framework (plugins included) ranks by this vector
+        "scores": score_vector(frame, params.get("weights", {}), utility_features),
+        # Descending order of those scores when the frame maintains one (None otherwise)
+        "order": score_order(frame, params.get("weights", {}), utility_features),
     }
+    timings["score"] = time.perf_counter() - t0
 
     for fw in frameworks:
         decision_func = FRAMEWORK_DISPATCH.get(fw)
         if decision_func is None:
             continue
-        decisions, metrics, context = decision_func(entities, common)
+        t0 = time.perf_counter()
+        decisions, metrics, context = decision_func(frame, common)
+        t1 = time.perf_counter()
         explanation = generate_explanation(fw, decisions, metrics, context)
+        timings["framework"][fw] = t1 - t0
+        timings["explanation"][fw] = time.perf_counter() - t1
         results.append({
             "framework": fw,
             "decisions": decisions,
@@ -90,5 +88,9 @@ def run_simulation(scenario: Dict[str, Any], frameworks: List[str], params: Dict
             "explanation": explanation
         })
 
+    t0 = time.perf_counter()
     summary = analyze_results(results)
-    return {"results": results, "summary": summary}
+    timings["summary"] = time.perf_counter() - t0
+    # The score vector travels with the output so runs can store it for ranking exports, and the timings
+    # so the API process can record them (this may run in a worker process)
+    return {"results": results, "summary": summary, "scores": common["scores"], "timings": timings}
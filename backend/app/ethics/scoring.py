@@ -0,0 +1,62 @@
+from typing import Dict, Any, List, Sequence
+import json
+import numpy as np
+from .frame import EntityFrame, DEFAULT_UTILITY_FEATURES
+
+# Shared scoring stage: one score vector per (scenario, weights, utility_features), computed once per
+# run and handed to every framework through common["scores"]. This is the single definition of
+# "score" used for ranking, tie-breaks and the avg/total utility metrics.
+
+SCORE_CACHE_SIZE = 16
+
+def utility_weights(weights: Dict[str, Any], features: Sequence[str]) -> np.ndarray:
+    # Weighted sum across declared utility features; fallback to equal weights
+    ws = np.array([float(weights.get(feat, 0.0)) if feat in weights else np.nan for feat in features])
+    if np.isnan(ws).all():
+        # no matching weights provided; use equal weights
+        return np.ones(len(ws)) / max(1, len(ws))
+    # replace NaN with zero and normalize if sum>0, else equal
+    ws = np.nan_to_num(ws, nan=0.0)
+    s = ws.sum()
+    return (ws / s) if s > 0 else (np.ones(len(ws)) / max(1, len(ws)))
+
+def score_key(weights: Dict[str, Any], features: Sequence[str] | None = None) -> str:
+    features = list(features or DEFAULT_UTILITY_FEATURES)
+    return json.dumps([features, {f: weights[f] for f in features if f in weights}], sort_keys=True, default=str)
+
+def score_vector(frame: EntityFrame, weights: Dict[str, Any], features: Sequence[str] | None = None) -> np.ndarray:
+    features = list(features or DEFAULT_UTILITY_FEATURES)
+    key = score_key(weights, features)
+    cache = frame.score_cache
+    with frame.score_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    # Weighted sum of the normalized features as one matrix-vector product. Explicit 'utility' wins.
+    scores = frame.feature_matrix(features) @ utility_weights(weights, features)
+    utility = frame.numeric("utility")
+    scores = np.where(np.isnan(utility), scores, utility)
+    scores.setflags(write=False)
+    with frame.score_lock:
+        cache[key] = scores
+        while len(cache) > SCORE_CACHE_SIZE:
+            cache.popitem(last=False)
+    return scores
+
+def score_order(frame: EntityFrame, weights: Dict[str, Any], features: Sequence[str] | None = None) -> np.ndarray | None:
+    # Positions by descending score (ties by position) when the frame keeps one for these weights: frames
+    # produced by entity deltas carry them forward instead of re-sorting (see incremental.py)
+    return frame.score_orders.get(score_key(weights, features))
+
+def common_scores(frame: EntityFrame, common: Dict[str, Any]) -> np.ndarray:
+    # Frameworks called outside run_simulation compute the shared vector themselves
+    scores = common.get("scores")
+    if scores is None:
+        weights = common.get("params", {}).get("weights", {})
+        scores = score_vector(frame, weights, common.get("utility_features"))
+    return scores
+
+def selection_metrics(scores: np.ndarray, selected: np.ndarray) -> Dict[str, float]:
+    chosen = scores[selected]
+    total = float(chosen.sum()) if len(chosen) else 0.0
+    return {"total_utility": total, "avg_utility": (total / len(chosen)) if len(chosen) else 0.0}
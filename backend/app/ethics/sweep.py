@@ -0,0 +1,113 @@
+from typing import Dict, Any, List, Optional
+import itertools
+import json
+import numpy as np
+from .frame import DEFAULT_UTILITY_FEATURES
+from .ranking import top_k_indices
+from .scoring import utility_weights, selection_metrics
+from .fairness import QUOTA_MODES, group_quotas, fairness_metrics, _emission_order
+from .rules import compile_rules, eligibility_mask
+from .rule_based import rule_metrics
+from .runner import PreparedScenario, FRAMEWORK_DISPATCH, _utility_features, run_prepared
+
+# Parameter sweeps: many (weights, top_k, ...) points over one prepared scenario in a single pass.
+# Distinct weight settings become the columns of a weight matrix, so one feature-matrix product yields
+# every score vector; each framework ranks once per score vector at the largest k requested for it and
+# smaller k values read prefixes of that ranking. Selections and metrics equal what /simulate computes
+# for the same params (up to floating-point rounding in the matrix product).
+
+# Upper bound on score-matrix cells held at once (n_entities x weight columns)
+SWEEP_BLOCK_CELLS = 4_000_000
+
+def expand_grid(base: Dict[str, Any], grid: Optional[Dict[str, Any]] = None, points: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    # Explicit points first, then the cartesian product of the grid; each is layered over `base`.
+    # Grid keys are params names, except "weights", which maps feature -> list of values.
+    out = [{**base, **p, "weights": {**base.get("weights", {}), **p.get("weights", {})}} for p in points or []]
+    if grid:
+        axes = [(("weights", f), list(vals)) for f, vals in grid.get("weights", {}).items()]
+        axes += [((key, None), list(vals)) for key, vals in grid.items() if key != "weights"]
+        for combo in itertools.product(*(vals for _, vals in axes)):
+            params = {**base, "weights": dict(base.get("weights", {}))}
+            for (key, feat), value in zip((a for a, _ in axes), combo):
+                if feat is None:
+                    params[key] = value
+                else:
+                    params["weights"][feat] = value
+            out.append(params)
+    return out
+
+def _weight_key(weights: Dict[str, Any], features: List[str]) -> str:
+    return json.dumps({f: weights[f] for f in features if f in weights}, sort_keys=True, default=str)
+
+def run_sweep(prepared: PreparedScenario, frameworks: List[str], points: List[Dict[str, Any]],
+              include_selected: bool = False) -> List[Dict[str, Any]]:
+    frame, meta = prepared.frame, prepared.meta
+    n = len(frame)
+    frameworks = [fw for fw in frameworks if fw in FRAMEWORK_DISPATCH]
+    features = _utility_features(meta) or DEFAULT_UTILITY_FEATURES
+    out: List[Dict[str, Any]] = [{"params": p, "metrics": {}, **({"selected_ids": {}} if include_selected else {})} for p in points]
+
+    # Weight-independent state, built once for the whole sweep
+    X = frame.feature_matrix(features)
+    utility = frame.numeric("utility")
+    has_utility = ~np.isnan(utility)
+    if "rule_based" in frameworks:
+        eligible_idx = np.flatnonzero(eligibility_mask(frame, compile_rules(meta.get("constraints", {}), meta.get("rules", []))))
+    if "fairness" in frameworks:
+        codes, labels = frame.groups(meta.get("protected_attribute") or "gender")
+        sizes = np.bincount(codes, minlength=len(labels))
+        members = np.argsort(codes, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+        modes = [p.get("quota_mode", "round_robin") if p.get("quota_mode", "round_robin") in QUOTA_MODES else "round_robin" for p in points]
+        quotas = [group_quotas(sizes, max(1, int(p.get("top_k", 1))), m) for p, m in zip(points, modes)]
+
+    groups: Dict[str, List[int]] = {}
+    for i, p in enumerate(points):
+        groups.setdefault(_weight_key(p.get("weights", {}), features), []).append(i)
+    keys = list(groups)
+    W = np.column_stack([utility_weights(points[groups[k][0]].get("weights", {}), features) for k in keys]) if keys else np.zeros((len(features), 0))
+
+    block = max(1, SWEEP_BLOCK_CELLS // max(1, n))
+    for b0 in range(0, len(keys), block):
+        S = X @ W[:, b0:b0 + block]
+        S[has_utility] = utility[has_utility, None]
+        for j, key in enumerate(keys[b0:b0 + block]):
+            scores = np.ascontiguousarray(S[:, j])
+            idxs = groups[key]
+            if "utilitarian" in frameworks:
+                ks = [max(1, int(points[i].get("top_k", 1))) for i in idxs]
+                order = top_k_indices(scores, max(ks))
+                for i, k in zip(idxs, ks):
+                    _record(out[i], "utilitarian", selection_metrics(scores, order[:k]), frame, order[:k], include_selected)
+            if "rule_based" in frameworks:
+                ks = [int(points[i].get("top_k", 1)) for i in idxs]
+                order = eligible_idx[top_k_indices(scores[eligible_idx], max(ks))]
+                for i, k in zip(idxs, ks):
+                    selected = order[:max(k, 0)]
+                    _record(out[i], "rule_based", rule_metrics(k, len(eligible_idx), n, scores, selected), frame, selected, include_selected)
+            if "fairness" in frameworks:
+                qmax = np.max([quotas[i] for i in idxs], axis=0)
+                ranked = {g: members[starts[g]:starts[g + 1]][top_k_indices(scores[members[starts[g]:starts[g + 1]]], qmax[g])]
+                          for g in np.flatnonzero(qmax)}
+                for i in idxs:
+                    q = quotas[i]
+                    selected = np.array([ranked[g][jj] for g, jj in _emission_order(q, modes[i])], dtype=np.intp)
+                    _record(out[i], "fairness", fairness_metrics(labels, sizes, q, scores, selected), frame, selected, include_selected)
+    # Report frameworks in the order they were requested, like run_prepared does
+    for point in out:
+        point["metrics"] = {fw: point["metrics"][fw] for fw in frameworks}
+        if include_selected:
+            point["selected_ids"] = {fw: point["selected_ids"][fw] for fw in frameworks}
+    return out
+
+def _record(point: Dict[str, Any], fw: str, metrics: Dict[str, Any], frame, selected: np.ndarray, include_selected: bool):
+    point["metrics"][fw] = metrics
+    if include_selected:
+        point["selected_ids"][fw] = frame.ids[selected].tolist()
+
+def run_sweep_task(prepared: PreparedScenario, frameworks: List[str], spec: Dict[str, Any]) -> Dict[str, Any]:
+    # Executor entry point: the sweep plus full simulations for the points that will be persisted as runs
+    points = spec["points"]
+    swept = run_sweep(prepared, frameworks, points, spec.get("include_selected", False))
+    runs = {i: run_prepared(prepared, frameworks, points[i]) for i in spec.get("persist", [])}
+    return {"points": swept, "runs": runs}
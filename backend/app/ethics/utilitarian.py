@@ -1,53 +1,42 @@
-from typing import List, Dict, Any, Tuple
+from typing import Dict, Any, Tuple
 import numpy as np
+from .frame import EntityFrame
+from .scoring import common_scores, selection_metrics
+from .ranking import top_k_indices
 
 # Simple utilitarian logic: select option(s) maximizing aggregate utility
 # Each entity is expected to have a 'utility' score or attributes with weights in params
 
-def utilitarian_decision(entities: List[Dict[str, Any]], common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+# Entries of decisions["ranking"] unless params.ranking_limit says otherwise (null = every entity). The
+# full ranking is always available from GET /api/runs/{id}/ranking.
+DEFAULT_RANKING_LIMIT = 100
+
+def utilitarian_decision(frame: EntityFrame, common: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     params = common.get("params", {})
     weights = params.get("weights", {})
-    util_feats = common.get("utility_features", []) or ["experience","test_score"]
-
-    # Precompute normalized features list per entity
-    scores = []
-    for e in entities:
-        if "utility" in e:
-            u = float(e["utility"]) 
-        else:
-            # Weighted sum across declared utility features; fallback to equal weights
-            vals = []
-            ws = []
-            for feat in util_feats:
-                norm_key = f"{feat}_norm"
-                val = e.get(norm_key, e.get(feat, 0.0))
-                vals.append(float(val))
-                w = float(weights.get(feat, 0.0)) if feat in weights else np.nan
-                ws.append(w)
-            if all(np.isnan(ws)):
-                # no matching weights provided; use equal weights
-                wnorm = np.ones(len(vals)) / max(1, len(vals))
-            else:
-                # replace NaN with zero and normalize if sum>0, else equal
-                ws = np.nan_to_num(ws, nan=0.0)
-                s = ws.sum()
-                wnorm = (ws / s) if s > 0 else (np.ones(len(vals)) / max(1, len(vals)))
-            u = float(np.dot(wnorm, np.asarray(vals)))
-        scores.append({"id": e.get("id"), "score": u, "group": e.get(common.get("protected_attribute"))})
+    scores = common_scores(frame, common)
 
     k = max(1, int(params.get("top_k", 1)))
-    sorted_scores = sorted(scores, key=lambda x: x["score"], reverse=True)
-    selected = sorted_scores[:k]
+    limit = params.get("ranking_limit", DEFAULT_RANKING_LIMIT)
+    ranked = common.get("order")
+    if ranked is not None:
+        # Maintained score order: the selections are its prefixes
+        winners = ranked[:k]
+        order = ranked if limit is None else ranked[:max(0, int(limit))]
+    else:
+        winners = top_k_indices(scores, k)
+        order = np.argsort(-scores, kind="stable") if limit is None else top_k_indices(scores, max(0, int(limit)))
+    ids = frame.ids[order].tolist()
+    groups = np.asarray(frame.labels(common.get("protected_attribute")), dtype=object)[order].tolist()
+    sorted_scores = [{"id": i, "score": s, "group": g} for i, s, g in zip(ids, scores[order].tolist(), groups)]
 
     decisions = {
-        "selected_ids": [s["id"] for s in selected],
-        "ranking": sorted_scores
+        "selected_ids": frame.ids[winners].tolist(),
+        "ranking": sorted_scores,
+        "ranking_total": len(frame)
     }
 
-    metrics = {
-        "total_utility": sum(s["score"] for s in selected),
-        "avg_utility": (sum(s["score"] for s in selected) / max(1, len(selected))) if selected else 0.0,
-    }
+    metrics = selection_metrics(scores, winners)
 
     context = {"weights": weights}
     return decisions, metrics, context
@@ -1,9 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .database import engine, Base
+from .database import upgrade_schema
 from .api.routes import router
 from .services.scenarios import ScenarioService
+from .services.executor import simulation_executor
+from .services.jobs import job_dispatcher
+from .services.metrics import MetricsMiddleware
 from .ethics.data_generator import hiring_demo_scenario
 from sqlalchemy.orm import Session
 
@@ -16,18 +19,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 def on_startup():
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+    # Create tables (and add columns introduced since the database was created)
+    upgrade_schema()
 
-    # Seed a demo scenario if not present
+    # Move entities of scenarios stored before the column store out of their config, then seed a demo
+    # scenario if not present
     from .database import SessionLocal
     with SessionLocal() as session:  # type: Session
+        ScenarioService.migrate_legacy(session)
+        session.commit()
         if not ScenarioService.get_by_name(session, "Hiring Bias Demo"):
             scen = hiring_demo_scenario()
             ScenarioService.create(session, name="Hiring Bias Demo", type=scen.get("type"), description="Synthetic hiring scenario with protected groups", config=scen)
             session.commit()
 
+    # Background job dispatch (jobs left running by a previous process are requeued once their lease lapses)
+    job_dispatcher.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    job_dispatcher.stop()
+    simulation_executor.shutdown()
+
 app.include_router(router, prefix="/api")
\ No newline at end of file
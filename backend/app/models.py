@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, JSON, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
 from .database import Base
@@ -10,31 +10,163 @@ class Scenario(Base):
     name: Mapped[str] = mapped_column(String(200), nullable=False, unique=True)
     type: Mapped[str] = mapped_column(String(50), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
-    config: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # Scenario metadata only; entities live column-by-column in scenario_columns
+    config: Mapped[dict] = mapped_column(JSON, nullable=False, deferred=True)
+    entity_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # sha256 of the canonical config JSON; cheap version token for in-process caches
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     runs: Mapped[list["Run"]] = relationship("Run", back_populates="scenario")
+    columns: Mapped[list["ScenarioColumn"]] = relationship("ScenarioColumn", back_populates="scenario", cascade="all, delete-orphan", order_by="ScenarioColumn.position")
+
+class ScenarioColumn(Base):
+    __tablename__ = "scenario_columns"
+    __table_args__ = (UniqueConstraint("scenario_id", "name"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    scenario_id: Mapped[int] = mapped_column(ForeignKey("scenarios.id"), nullable=False, index=True)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)    # ids | numeric | categorical | json
+    dtype: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    data: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)  # little-endian f8 values / i4 codes
+    items: Mapped[list | None] = mapped_column(JSON, nullable=True)          # ids, categories or raw values
+
+    scenario: Mapped[Scenario] = relationship("Scenario", back_populates="columns")
+
+class ScenarioVersion(Base):
+    __tablename__ = "scenario_versions"
+    __table_args__ = (UniqueConstraint("scenario_id", "parent_hash"),)
+
+    # One entity patch (PATCH /scenarios/{id}/entities), turning version parent_hash into content_hash.
+    # Positions recorded against the parent (compact decisions, run score vectors) map onto the next
+    # version by skipping `removed`; the removed entities' ids and groups resolve the positions that go.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    scenario_id: Mapped[int] = mapped_column(ForeignKey("scenarios.id"), nullable=False)
+    parent_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    removed: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # sorted little-endian i4 positions into the parent
+    removed_ids: Mapped[list] = mapped_column(JSON, nullable=False)
+    removed_groups: Mapped[list] = mapped_column(JSON, nullable=False)  # protected-attribute labels of the removed entities
+    # Entities the patch appended, kept until the column store is rewritten to include them; NULL after
+    added: Mapped[list | None] = mapped_column(JSON(none_as_null=True), nullable=True)
 
 class Run(Base):
     __tablename__ = "runs"
+    # Keyset pagination walks (created_at, id) newest first, optionally within one scenario
+    __table_args__ = (
+        Index("ix_runs_created_at_id", "created_at", "id"),
+        Index("ix_runs_scenario_created_at", "scenario_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     scenario_id: Mapped[int] = mapped_column(ForeignKey("scenarios.id"), nullable=False)
     requested_frameworks: Mapped[list[str]] = mapped_column(JSON, nullable=False)
     params: Mapped[dict] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set on lightweight runs served from the result cache: results live on the source run
+    source_run_id: Mapped[int | None] = mapped_column(ForeignKey("runs.id"), nullable=True)
 
     scenario: Mapped[Scenario] = relationship("Scenario", back_populates="runs")
     results: Mapped[list["Result"]] = relationship("Result", back_populates="run", cascade="all, delete-orphan")
+    source_run: Mapped["Run | None"] = relationship("Run", remote_side="Run.id")
+
+    @property
+    def effective_results(self) -> list["Result"]:
+        return self.source_run.results if self.source_run_id is not None and self.source_run is not None else self.results
 
 class Result(Base):
     __tablename__ = "results"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), nullable=False)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), nullable=False, index=True)
     framework: Mapped[str] = mapped_column(String(50), nullable=False)
+    # May hold {"$ids"|"$ranking": [start, stop]} markers into `indices` (see services/decisions.py)
     decisions: Mapped[dict] = mapped_column(JSON, nullable=False)
     metrics: Mapped[dict] = mapped_column(JSON, nullable=False)
     explanation: Mapped[str] = mapped_column(Text, nullable=False)
+    # Little-endian i4 entity positions referenced by the decisions markers; NULL for plain-JSON rows
+    indices: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Scenario version the positions refer to (entity patches since then are followed via scenario_versions)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     run: Mapped[Run] = relationship("Run", back_populates="results")
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_id", "status", "id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    scenario_id: Mapped[int] = mapped_column(ForeignKey("scenarios.id"), nullable=False)
+    frameworks: Mapped[list[str]] = mapped_column(JSON, nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")  # queued | running | succeeded | failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Claim held by a dispatcher while running; an expired lease means the worker died and the job is requeued
+    worker: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    run_id: Mapped[int | None] = mapped_column(ForeignKey("runs.id"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    run: Mapped["Run | None"] = relationship("Run")
+
+class RunScores(Base):
+    __tablename__ = "run_scores"
+
+    # Shared score vector of a run, in scenario entity order (f4 or f8 per SCORE_STORAGE_DTYPE); backs
+    # ranking exports and the expansion of compact rankings
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), primary_key=True)
+    # Scenario content the scores were computed against
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    dtype: Mapped[str] = mapped_column(String(8), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+class RunProfile(Base):
+    __tablename__ = "run_profiles"
+
+    # cProfile statistics of one profiled request (X-Profile), zlib-compressed pstats (marshal) data
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), nullable=False, index=True)
+    endpoint: Mapped[str] = mapped_column(String(50), nullable=False)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+class IngestUpload(Base):
+    __tablename__ = "ingest_uploads"
+
+    # A scenario being uploaded in chunks (POST /api/ingest); becomes a Scenario on completion
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    type: Mapped[str] = mapped_column(String(50), nullable=False)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    format: Mapped[str] = mapped_column(String(10), nullable=False)  # csv | ndjson
+    profile: Mapped[str | None] = mapped_column(String(50), nullable=True)  # column mapping (ethics/ingest.py); NULL = as-is
+    config: Mapped[dict] = mapped_column(JSON, nullable=False)  # scenario metadata (profile defaults + overrides)
+    header: Mapped[str | None] = mapped_column(Text, nullable=True)  # CSV header line from the first chunk
+    pending: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)  # unterminated last line of the latest chunk
+    rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    blocks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="open")  # open | completed
+    scenario_id: Mapped[int | None] = mapped_column(ForeignKey("scenarios.id"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+class IngestColumn(Base):
+    __tablename__ = "ingest_columns"
+    __table_args__ = (Index("ix_ingest_columns_upload_name_block", "upload_id", "name", "block"),)
+
+    # One column of one parsed block, in ScenarioColumn's record format; concatenated per column on completion
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    upload_id: Mapped[int] = mapped_column(ForeignKey("ingest_uploads.id"), nullable=False)
+    block: Mapped[int] = mapped_column(Integer, nullable=False)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    dtype: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    data: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    items: Mapped[list | None] = mapped_column(JSON, nullable=True)
@@ -21,16 +21,83 @@ class ScenarioOut(BaseModel):
         "from_attributes": True
     }
 
+class ScenarioSummary(BaseModel):
+    id: int
+    name: str
+    type: str
+    description: Optional[str]
+    entity_count: Optional[int]
+    attributes: List[str]
+    created_at: datetime
+
+class EntityPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    items: List[Dict[str, Any]]
+
+class EntityPatch(BaseModel):
+    add: List[Dict[str, Any]] = Field(default_factory=list, description="Entities to append; each needs an id not already in the scenario")
+    remove: List[Any] = Field(default_factory=list, description="Ids of entities to remove (an id both removed and added is replaced)")
+
+class EntityPatchOut(BaseModel):
+    scenario_id: int
+    entity_count: int
+    added: int
+    removed: int
+
+class IngestCreate(BaseModel):
+    name: str
+    type: str
+    description: Optional[str] = None
+    format: str = Field("csv", pattern="^(csv|ndjson)$")
+    profile: Optional[str] = Field(None, description='Column mapping; defaults to the profile for `type` if there is one, "none" keeps columns as-is')
+    config: Dict[str, Any] = Field(default_factory=dict, description="Scenario metadata, layered over the profile's defaults")
+
+class IngestOut(BaseModel):
+    id: int
+    name: str
+    type: str
+    format: str
+    profile: Optional[str]
+    status: str
+    rows: int
+    blocks: int
+    scenario_id: Optional[int]
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
 class SimulateRequest(BaseModel):
     scenario_id: Optional[int] = Field(None, description="Existing scenario id")
     scenario_inline: Optional[Dict[str, Any]] = Field(None, description="Inline scenario if not using stored")
     frameworks: List[str] = Field(default_factory=lambda: ["utilitarian", "fairness", "rule_based"])
     params: Dict[str, Any] = Field(default_factory=dict)
+    use_cache: bool = Field(False, description="Serve identical earlier requests from the result cache and record a lightweight run")
+
+class SweepRequest(BaseModel):
+    scenario_id: int = Field(..., description="Existing scenario id")
+    frameworks: List[str] = Field(default_factory=lambda: ["utilitarian", "fairness", "rule_based"])
+    params: Dict[str, Any] = Field(default_factory=dict, description="Base params every point starts from")
+    grid: Optional[Dict[str, Any]] = Field(None, description='Cartesian grid, e.g. {"weights": {"experience": [0, 0.5, 1]}, "top_k": [5, 10]}')
+    points: Optional[List[Dict[str, Any]]] = Field(None, description="Explicit params sets, evaluated before the grid")
+    include_selected: bool = Field(False, description="Return selected ids per framework for every point")
+    persist: List[int] = Field(default_factory=list, description="Indices of points to also store as runs")
+
+class ParetoRequest(BaseModel):
+    scenario_id: int = Field(..., description="Existing scenario id")
+    resolution: int = Field(10, ge=1, le=100, description="Weight lattice steps per feature (weights in multiples of 1/resolution)")
+    top_k: Optional[List[int]] = Field(None, description="top_k values to explore; default ~25 values spread geometrically up to max_k")
+    max_k: Optional[int] = Field(None, ge=1, description="Largest top_k for the default spread (default: entity count)")
+    quota_modes: List[str] = Field(default_factory=lambda: ["round_robin"])
 
 class ResultOut(BaseModel):
     id: int
     framework: str
-    decisions: Dict[str, Any]
+    # None when the caller asked for runs without decisions
+    decisions: Optional[Dict[str, Any]]
     metrics: Dict[str, Any]
     explanation: str
 
@@ -44,8 +111,33 @@ class RunOut(BaseModel):
     requested_frameworks: List[str]
     params: Dict[str, Any] | None
     created_at: datetime
+    source_run_id: Optional[int] = None
     results: List[ResultOut]
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+class JobOut(BaseModel):
+    id: int
+    scenario_id: int
+    frameworks: List[str]
+    params: Dict[str, Any] | None
+    status: str
+    attempts: int
+    error: Optional[str]
+    run_id: Optional[int]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class ProfileOut(BaseModel):
+    id: int
+    run_id: int
+    endpoint: str
+    duration_ms: float
+    size_bytes: int
+    created_at: datetime
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from threading import Lock
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import hashlib
+import json
+from ..config import settings
+
+# Small thread-safe LRU (optionally with a TTL) used for in-process caches
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: Dict[Hashable, float] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                if self.ttl is not None and self._expires[key] <= time.monotonic():
+                    self._drop(key)
+                    self.expirations += 1
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, replaces: Optional[Callable[[Hashable], bool]] = None) -> None:
+        # `replaces` drops entries superseded by this one (e.g. older versions of the same scenario)
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            if replaces is not None:
+                for stale in [k for k in self._data if k != key and replaces(k)]:
+                    self._drop(stale)
+                    self.evictions += 1
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                self._drop(k)
+            self.evictions += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        del self._data[key]
+        self._expires.pop(key, None)
+
+# Prepared (normalized, columnar) scenarios keyed by (scenario_id, content_hash)
+scenario_cache = LRUCache(settings.scenario_cache_size)
+
+# Memoized run_simulation outputs keyed by result_key(); values are (sim_out, source run id, its result ids)
+result_cache = LRUCache(settings.result_cache_size, ttl=settings.result_cache_ttl_seconds)
+
+def result_key(scenario_hash: str, frameworks: List[str], params: Dict[str, Any]) -> str:
+    # The simulation is a pure function of these inputs, so their canonical hash identifies the output
+    canonical = json.dumps([scenario_hash, list(frameworks), params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def cache_result(key: str, sim_out: Dict[str, Any], run: Dict[str, Any]) -> None:
+    # `run` is the recorded run (RunService.record), whose decisions match what was stored. Replays only
+    # need results and summary; the score vector already lives with the source run
+    cached = {k: v for k, v in sim_out.items() if k not in ("scores", "timings")}
+    cached["results"] = [{**r, "decisions": stored["decisions"]} for r, stored in zip(sim_out["results"], run["results"])]
+    result_cache.put(key, (cached, run["id"], [r["id"] for r in run["results"]]))
@@ -0,0 +1,158 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..ethics.runner import PreparedScenario
+from ..models import Run, Result, RunScores, ScenarioVersion
+from .scenarios import ScenarioService
+
+# Compact storage for Result.decisions. Entity-id lists (selected_ids, the per-group lists of
+# selection_by_group) and the utilitarian ranking are stored as int32 positions into the scenario's id
+# column, concatenated in Result.indices; the JSON keeps a {"$ids": [start, stop]} or
+# {"$ranking": [start, stop]} marker in their place. Ranking scores come back from the run's stored
+# score vector and groups from the scenario, so no id, group name or score repeats per row. Positions
+# refer to the scenario version in Result.content_hash; entity patches since then are followed through
+# scenario_versions (DecisionExpander.entities), so stored rows are never rewritten.
+
+ID_LIST_KEYS = ("selected_ids",)
+GROUPED_ID_KEYS = ("selection_by_group",)
+RANKING_KEY = "ranking"
+
+def score_values(scores: np.ndarray) -> List[float]:
+    # float32 scores render as their shortest round-trip decimal (0.7, not 0.699999988079071)
+    if scores.dtype == np.float32:
+        return [float(s) for s in scores.astype(str)]
+    return scores.tolist()
+
+def _group_labels(prepared: PreparedScenario) -> np.ndarray:
+    return np.asarray(prepared.frame.labels(prepared.meta.get("protected_attribute") or "gender"), dtype=object)
+
+def compact_decisions(decisions: Dict[str, Any], prepared: PreparedScenario, scores: Optional[np.ndarray]) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    # Anything that does not map cleanly onto the scenario (unknown ids, plugin-specific shapes) stays JSON
+    frame = prepared.frame
+    blocks: List[np.ndarray] = []
+    offset = 0
+
+    def marker(kind: str, idx: np.ndarray) -> Dict[str, List[int]]:
+        nonlocal offset
+        blocks.append(idx)
+        offset += len(idx)
+        return {kind: [offset - len(idx), offset]}
+
+    def id_list(value: Any) -> Any:
+        if isinstance(value, list) and value:
+            idx = frame.positions(value)
+            if idx is not None:
+                return marker("$ids", idx)
+        return value
+
+    out = dict(decisions)
+    for key in ID_LIST_KEYS:
+        if key in out:
+            out[key] = id_list(out[key])
+    for key in GROUPED_ID_KEYS:
+        if isinstance(out.get(key), dict):
+            out[key] = {g: id_list(v) for g, v in out[key].items()}
+    ranking = out.get(RANKING_KEY)
+    if scores is not None and isinstance(ranking, list) and ranking \
+            and all(isinstance(e, dict) and e.keys() == {"id", "score", "group"} for e in ranking):
+        idx = frame.positions([e["id"] for e in ranking])
+        if idx is not None and np.array_equal(scores[idx], [e["score"] for e in ranking]) \
+                and _group_labels(prepared)[idx].tolist() == [e["group"] for e in ranking]:
+            out[RANKING_KEY] = marker("$ranking", idx)
+    if not blocks:
+        return decisions, None
+    return out, np.concatenate(blocks).astype("<i4").tobytes()
+
+def as_stored(decisions: Dict[str, Any], compact: Dict[str, Any], dtype: str) -> Dict[str, Any]:
+    # What DecisionExpander will rebuild from the stored row: ranking scores at the storage precision
+    ranking = decisions.get(RANKING_KEY)
+    if np.dtype(dtype) == np.float32 and isinstance(compact.get(RANKING_KEY), dict):
+        stored = score_values(np.array([e["score"] for e in ranking], dtype=dtype))
+        return {**decisions, RANKING_KEY: [{**e, "score": s} for e, s in zip(ranking, stored)]}
+    return decisions
+
+class DecisionExpander:
+    # Per request: rebuilds compact decisions, loading each scenario and run score vector at most once
+    # and only when a marker actually needs it
+    def __init__(self, db: Session, prepared: Optional[Dict[int, PreparedScenario]] = None):
+        self.db = db
+        self._prepared: Dict[int, PreparedScenario] = dict(prepared or {})
+        self._scores: Dict[int, np.ndarray] = {}
+        self._groups: Dict[int, np.ndarray] = {}
+        self._versions: Dict[Tuple[int, str], Optional[ScenarioVersion]] = {}
+
+    def expand(self, res: Result, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        decisions = res.decisions
+        if keys is not None:
+            keys = set(keys)
+            decisions = {k: v for k, v in decisions.items() if k in keys}
+        if res.indices is None:
+            return decisions
+        idx = np.frombuffer(res.indices, dtype="<i4")
+        run = res.run
+        out = dict(decisions)
+        for key in ID_LIST_KEYS:
+            if key in out:
+                out[key] = self._ids(out[key], idx, res)
+        for key in GROUPED_ID_KEYS:
+            if isinstance(out.get(key), dict):
+                out[key] = {g: self._ids(v, idx, res) for g, v in out[key].items()}
+        marker = out.get(RANKING_KEY)
+        if isinstance(marker, dict) and "$ranking" in marker:
+            a, b = marker["$ranking"]
+            pos = idx[a:b]
+            ids, groups = self.entities(run.scenario_id, res.content_hash, pos)
+            out[RANKING_KEY] = [{"id": i, "score": s, "group": g} for i, s, g in
+                                zip(ids.tolist(), score_values(self._run_scores(run)[pos]), groups.tolist())]
+        return out
+
+    def _ids(self, value: Any, idx: np.ndarray, res: Result) -> Any:
+        if isinstance(value, dict) and "$ids" in value:
+            a, b = value["$ids"]
+            return self.entities(res.run.scenario_id, res.content_hash, idx[a:b])[0].tolist()
+        return value
+
+    def entities(self, scenario_id: int, digest: Optional[str], pos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Ids and groups at positions of scenario version `digest` (None: the current one). Each patch
+        # since then either removed a position (its id and group were kept on the patch) or shifted it
+        # down by the removals before it; what is left indexes the current version.
+        prepared = self._scenario(scenario_id)
+        if scenario_id not in self._groups:
+            self._groups[scenario_id] = _group_labels(prepared)
+        ids, groups = np.empty(len(pos), dtype=object), np.empty(len(pos), dtype=object)
+        live, cur = np.arange(len(pos)), np.asarray(pos, dtype=np.intp)
+        while digest is not None and digest != prepared.content_hash:
+            version = self._version(scenario_id, digest)
+            if version is None:
+                raise LookupError(f"Scenario {scenario_id} has no entity patch from version {digest}")
+            removed = np.frombuffer(version.removed, dtype="<i4")
+            at = np.searchsorted(removed, cur)
+            gone = at < len(removed)
+            gone[gone] = removed[at[gone]] == cur[gone]
+            if gone.any():
+                ids[live[gone]] = [version.removed_ids[i] for i in at[gone].tolist()]
+                groups[live[gone]] = [version.removed_groups[i] for i in at[gone].tolist()]
+            live, cur = live[~gone], cur[~gone] - at[~gone]
+            digest = version.content_hash
+        ids[live] = prepared.frame.ids[cur]
+        groups[live] = self._groups[scenario_id][cur]
+        return ids, groups
+
+    def _version(self, scenario_id: int, parent: str) -> Optional[ScenarioVersion]:
+        key = (scenario_id, parent)
+        if key not in self._versions:
+            self._versions[key] = self.db.scalars(select(ScenarioVersion).where(
+                ScenarioVersion.scenario_id == scenario_id, ScenarioVersion.parent_hash == parent)).first()
+        return self._versions[key]
+
+    def _scenario(self, scenario_id: int) -> PreparedScenario:
+        if scenario_id not in self._prepared:
+            self._prepared[scenario_id] = ScenarioService.get_prepared(self.db, scenario_id)
+        return self._prepared[scenario_id]
+
+    def _run_scores(self, run: Run) -> np.ndarray:
+        if run.id not in self._scores:
+            row = self.db.get(RunScores, run.source_run_id or run.id)
+            self._scores[run.id] = np.frombuffer(row.data, dtype=row.dtype)
+        return self._scores[run.id]
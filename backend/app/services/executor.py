@@ -0,0 +1,193 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.thread import BrokenThreadPool
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+from ..config import settings
+from ..ethics.runner import PreparedScenario, run_prepared
+from ..ethics.incremental import apply_delta
+from .cache import LRUCache
+
+# Runs simulations off the request thread. Process workers receive the scenario as its columnar
+# EntityFrame (numpy buffers pickle compactly; derived caches are dropped in transit) and keep their
+# own small cache of prepared scenarios keyed by content hash, so repeat runs reuse normalization.
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+class SimulationBusy(Exception):
+    pass
+
+class SimulationTimeout(Exception):
+    pass
+
+_worker_scenarios = LRUCache(4)
+
+def _from_lineage(prepared: PreparedScenario) -> Optional[PreparedScenario]:
+    # A version produced by entity patches: replay the deltas onto the newest ancestor this worker holds,
+    # which keeps its score orders and norms instead of rebuilding them from the shipped columns
+    for i in range(len(prepared.lineage) - 1, -1, -1):
+        base = _worker_scenarios.get(prepared.lineage[i][0])
+        if base is None:
+            continue
+        steps = prepared.lineage[i:]
+        for j, (_, delta) in enumerate(steps):
+            base = apply_delta(base, delta, steps[j + 1][0] if j + 1 < len(steps) else prepared.content_hash)
+        return base
+    return None
+
+def _run_in_worker(task: Callable, prepared: PreparedScenario, frameworks: List[str], params: Any) -> Dict[str, Any]:
+    if prepared.content_hash is not None:
+        known = _worker_scenarios.get(prepared.content_hash)
+        if known is None:
+            known = _from_lineage(prepared) or prepared
+            _worker_scenarios.put(prepared.content_hash, known)
+        prepared = known
+    return task(prepared, frameworks, params)
+
+class SimulationExecutor:
+    def __init__(self, mode: str, workers: int, max_concurrent: int, timeout: Optional[float]):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"simulation_executor must be one of {EXECUTOR_MODES}, got {mode!r}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_concurrent = max(1, max_concurrent)
+        # Inline simulations run on the caller's thread before there is anything to wait on: no timeout applies
+        self.timeout = None if mode == "inline" else timeout
+        self._slots = BoundedSemaphore(self.max_concurrent)
+        self._pool: Optional[Executor] = None
+        # Pool each running process-mode future was submitted to, for abandon()
+        self._owners: Dict[Future, Executor] = {}
+        # Pools taken out of service by abandon(), with their abandoned futures; terminated once nothing
+        # else runs on them
+        self._retired: Dict[Executor, set] = {}
+        self._lock = Lock()
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    # spawn: the same start method on every platform, and no fork of a threaded server
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="simulation")
+            return self._pool
+
+    def _release(self, future=None):
+        with self._lock:
+            pool = self._owners.pop(future, None)
+            self.active -= 1
+            self.completed += 1
+            idle = self._drained(pool)
+        self._slots.release()
+        if idle is not None:
+            _terminate(idle)
+
+    def _drained(self, pool: Optional[Executor]) -> Optional[Executor]:
+        # A retired pool whose remaining futures were all abandoned: take it off the books for termination
+        abandoned = self._retired.get(pool)
+        if abandoned is None or any(p is pool and f not in abandoned for f, p in self._owners.items()):
+            return None
+        del self._retired[pool]
+        return pool
+
+    def submit(self, prepared: PreparedScenario, frameworks: List[str], params: Any, block: bool = False,
+               task: Optional[Callable] = None) -> Future:
+        # Takes a concurrency slot (waiting for one when block=True) and starts the simulation; the slot
+        # is held until the work itself stops, even if the caller gives up waiting (see abandon()). `task`
+        # is any module-level function taking (prepared, frameworks, params); run_prepared by default.
+        task = task or run_prepared
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise SimulationBusy(f"{self.max_concurrent} simulations already running")
+        with self._lock:
+            self.active += 1
+        if self.mode == "inline":
+            future: Future = Future()
+            try:
+                future.set_result(task(prepared, frameworks, params))
+            except Exception as exc:
+                future.set_exception(exc)
+            future.add_done_callback(self._release)
+            return future
+        try:
+            pool = self._get_pool()
+            if self.mode == "process":
+                future = pool.submit(_run_in_worker, task, prepared, frameworks, params)
+                with self._lock:
+                    self._owners[future] = pool
+            else:
+                future = pool.submit(task, prepared, frameworks, params)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def abandon(self, future: Future) -> None:
+        # The caller stopped waiting. Queued work is cancelled. A process simulation that already started
+        # is stopped by retiring its pool: new work goes to a fresh pool, simulations already running on
+        # the old one finish normally, and then its workers are terminated, which frees the abandoned
+        # slots. Threads cannot be stopped: a running thread simulation keeps its slot until it returns.
+        if future.cancel() or self.mode != "process":
+            return
+        with self._lock:
+            pool = self._owners.get(future)
+            if pool is None:
+                return
+            if pool is self._pool:
+                self._pool = None
+            self._retired.setdefault(pool, set()).add(future)
+            idle = self._drained(pool)
+        if idle is not None:
+            _terminate(idle)
+
+    def result(self, future: Future, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            self.abandon(future)
+            with self._lock:
+                self.timeouts += 1
+            raise SimulationTimeout(f"Simulation exceeded {timeout:g}s")
+        except (BrokenProcessPool, BrokenThreadPool):
+            # A worker died (e.g. killed for memory): start a fresh pool on the next request. The failed
+            # future may belong to a pool abandon() already replaced; the current one is kept unless broken.
+            with self._lock:
+                pool = self._pool
+                if pool is not None and getattr(pool, "_broken", False):
+                    self._pool = None
+                else:
+                    pool = None
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def run(self, prepared: PreparedScenario, frameworks: List[str], params: Any, task: Optional[Callable] = None) -> Dict[str, Any]:
+        return self.result(self.submit(prepared, frameworks, params, task=task), self.timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "workers": self.workers, "max_concurrent": self.max_concurrent,
+                    "active": self.active, "completed": self.completed, "rejected": self.rejected, "timeouts": self.timeouts}
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def _terminate(pool: Executor) -> None:
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    for process in processes:
+        process.terminate()
+    # The pool's manager thread notices the dead workers and fails their futures with BrokenProcessPool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+simulation_executor = SimulationExecutor(settings.simulation_executor, settings.simulation_workers,
+                                         settings.max_concurrent_simulations, settings.simulation_timeout_seconds or None)
@@ -0,0 +1,115 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+import hashlib
+import json
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from ..models import IngestUpload, IngestColumn, Scenario, ScenarioColumn
+from ..ethics.ingest import PROFILES, read_block, block_columns, assemble_columns
+
+# Chunked scenario uploads. Each block of rows is parsed and converted to column records as it arrives
+# and staged in ingest_columns; completion concatenates the staged blocks one column at a time into the
+# scenario column store, so neither the raw file nor entity dicts are ever held in memory.
+
+async def iter_blocks(stream: AsyncIterator[bytes], block_bytes: int) -> AsyncIterator[bytes]:
+    # Re-chunks a byte stream into blocks that end on a line boundary
+    buf = bytearray()
+    async for chunk in stream:
+        buf += chunk
+        while len(buf) >= block_bytes:
+            cut = (buf.rfind(b"\n", 0, block_bytes) + 1) or (buf.find(b"\n", block_bytes) + 1)
+            if not cut:
+                break
+            yield bytes(buf[:cut])
+            del buf[:cut]
+    if buf.strip():
+        yield bytes(buf)
+
+class IngestService:
+    @staticmethod
+    def start(db: Session, name: str, type: str, description: Optional[str], format: str,
+              profile: Optional[str], config: Dict[str, Any]) -> IngestUpload:
+        # Raises KeyError for an unknown profile
+        if profile is None:
+            profile = type if type in PROFILES else "none"
+        if profile != "none" and profile not in PROFILES:
+            raise KeyError(profile)
+        meta = {"type": type, **(PROFILES[profile]["meta"] if profile != "none" else {}), **config}
+        upload = IngestUpload(name=name, type=type, description=description or meta.get("description"), format=format,
+                              profile=None if profile == "none" else profile, config=meta, rows=0, blocks=0, status="open")
+        db.add(upload)
+        db.flush()
+        return upload
+
+    @staticmethod
+    def get(db: Session, upload_id: int) -> IngestUpload | None:
+        return db.get(IngestUpload, upload_id)
+
+    @staticmethod
+    def add_block(db: Session, upload_id: int, data: bytes) -> IngestUpload:
+        # Row lock (where supported) keeps block numbering consistent if chunks arrive concurrently. A line
+        # cut off at the end of a chunk is kept on the upload and completed by the next block.
+        upload = db.get(IngestUpload, upload_id, with_for_update=True)
+        data = (upload.pending or b"") + data
+        cut = data.rfind(b"\n") + 1
+        data, upload.pending = data[:cut], data[cut:] or None
+        if upload.format == "csv" and upload.header is None and data:
+            head, _, data = data.partition(b"\n")
+            upload.header = head.decode("utf-8-sig").rstrip("\r")
+        if data.strip():
+            df = read_block(data, upload.format, upload.header if upload.format == "csv" else None)
+            records = block_columns(df, PROFILES.get(upload.profile), upload.rows)
+            db.add_all(IngestColumn(upload_id=upload.id, block=upload.blocks, rows=len(df), position=i, **rec)
+                       for i, rec in enumerate(records))
+            upload.rows += len(df)
+            upload.blocks += 1
+        db.flush()
+        return upload
+
+    @staticmethod
+    def chunk_state(upload: IngestUpload) -> Dict[str, Any]:
+        return {"rows": upload.rows, "blocks": upload.blocks, "header": upload.header, "pending": upload.pending}
+
+    @staticmethod
+    def discard_chunk(db: Session, upload_id: int, state: Dict[str, Any]) -> None:
+        # Undo a chunk that failed to parse: drop the blocks it staged and restore the upload as it was
+        # before it (chunk_state), so a chunk is applied in full or not at all
+        upload = db.get(IngestUpload, upload_id, with_for_update=True)
+        db.execute(delete(IngestColumn).where(IngestColumn.upload_id == upload_id, IngestColumn.block >= state["blocks"]))
+        for key, value in state.items():
+            setattr(upload, key, value)
+        db.flush()
+
+    @staticmethod
+    def complete(db: Session, upload: IngestUpload) -> Scenario:
+        rows = [0] * upload.blocks
+        for block, n in db.execute(select(IngestColumn.block, IngestColumn.rows)
+                                   .where(IngestColumn.upload_id == upload.id, IngestColumn.name == "id")):
+            rows[block] = n
+        names = list(dict.fromkeys(["id", *db.scalars(select(IngestColumn.name).where(IngestColumn.upload_id == upload.id)
+                                                      .order_by(IngestColumn.block, IngestColumn.position))]))
+
+        def pieces_of(name: str) -> List[Optional[Dict[str, Any]]]:
+            pieces: List[Optional[Dict[str, Any]]] = [None] * upload.blocks
+            for rec in db.execute(select(IngestColumn.block, IngestColumn.kind, IngestColumn.dtype, IngestColumn.data, IngestColumn.items)
+                                  .where(IngestColumn.upload_id == upload.id, IngestColumn.name == name)).mappings():
+                pieces[rec["block"]] = dict(rec)
+            return pieces
+
+        scen = Scenario(name=upload.name, type=upload.type, description=upload.description, config=upload.config,
+                        entity_count=upload.rows)
+        db.add(scen)
+        db.flush()
+        digest = hashlib.sha256(json.dumps({"type": upload.type, "config": upload.config}, sort_keys=True, default=str).encode())
+        for position, rec in enumerate(assemble_columns(names, pieces_of, rows, PROFILES.get(upload.profile))):
+            col = ScenarioColumn(scenario_id=scen.id, position=position, **rec)
+            db.add(col)
+            db.flush()
+            # Written: drop it from the session so only one column is in memory at a time
+            db.expunge(col)
+            digest.update(rec["name"].encode())
+            digest.update(rec["data"] if rec["data"] is not None else json.dumps(rec["items"], default=str).encode())
+        scen.content_hash = digest.hexdigest()
+        db.execute(delete(IngestColumn).where(IngestColumn.upload_id == upload.id))
+        upload.status, upload.scenario_id = "completed", scen.id
+        db.flush()
+        return scen
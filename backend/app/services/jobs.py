@@ -0,0 +1,197 @@
+from concurrent.futures import wait as wait_futures
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Job
+from ..ethics.runner import PreparedScenario
+from .runs import RunService
+from .scenarios import ScenarioService
+from .cache import result_key, cache_result
+from .executor import simulation_executor, SimulationTimeout
+from .metrics import observe_simulation
+
+logger = logging.getLogger(__name__)
+
+# Background simulation jobs. The jobs table is the queue: dispatchers claim the oldest queued job with a
+# conditional UPDATE and hold a lease they renew while the simulation runs. A job whose lease lapses (its
+# process died or was restarted) goes back to the queue, so work survives restarts.
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+class JobService:
+    @staticmethod
+    def submit(db: Session, scenario_id: int, frameworks: List[str], params: dict) -> Job:
+        job = Job(scenario_id=scenario_id, frameworks=frameworks, params=params, status="queued", attempts=0)
+        db.add(job)
+        db.flush()
+        return job
+
+    @staticmethod
+    def get(db: Session, job_id: int) -> Job | None:
+        return db.get(Job, job_id)
+
+    @staticmethod
+    def claim(db: Session, worker: str) -> Job | None:
+        now = datetime.utcnow()
+        for job_id in db.scalars(select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(5)).all():
+            claimed = db.execute(
+                update(Job).where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", worker=worker, attempts=Job.attempts + 1, started_at=now,
+                        lease_expires_at=now + timedelta(seconds=settings.job_lease_seconds))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed:
+                db.commit()
+                return db.get(Job, job_id)
+        return None
+
+    @staticmethod
+    def renew(db: Session, job_id: int, worker: str) -> bool:
+        lease = datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds)
+        return bool(db.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker, Job.status == "running")
+            .values(lease_expires_at=lease).execution_options(synchronize_session=False)
+        ).rowcount)
+
+    @staticmethod
+    def complete(db: Session, job_id: int, worker: str, sim_out: Dict[str, Any], prepared: PreparedScenario) -> bool:
+        # Persisted as a normal Run; skipped if the lease was lost and the job handed to someone else
+        job = db.get(Job, job_id)
+        if job is None or job.status != "running" or job.worker != worker:
+            return False
+        run = RunService.record(db, job.scenario_id, job.frameworks, job.params or {}, sim_out, prepared)
+        job.status, job.run_id, job.finished_at, job.lease_expires_at = "succeeded", run["id"], datetime.utcnow(), None
+        db.flush()
+        if prepared.content_hash is not None:
+            cache_result(result_key(prepared.content_hash, job.frameworks, job.params or {}), sim_out, run)
+        return True
+
+    @staticmethod
+    def fail(db: Session, job_id: int, worker: str, error: str) -> bool:
+        # Like complete(): only the worker still holding the job may mark it failed
+        return bool(db.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker, Job.status == "running")
+            .values(status="failed", error=error, finished_at=datetime.utcnow(), lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount)
+
+    @staticmethod
+    def requeue_expired(db: Session) -> int:
+        now = datetime.utcnow()
+        expired = db.scalars(select(Job).where(Job.status == "running", Job.lease_expires_at < now)).all()
+        for job in expired:
+            if job.attempts >= settings.job_max_attempts:
+                job.status, job.error, job.finished_at = "failed", f"Worker lost after {job.attempts} attempts", now
+            else:
+                job.status, job.worker, job.started_at = "queued", None, None
+            job.lease_expires_at = None
+        db.flush()
+        return len(expired)
+
+    @staticmethod
+    def stats(db: Session, window: int = 100) -> Dict[str, Any]:
+        counts = dict(db.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+        oldest = db.scalar(select(func.min(Job.created_at)).where(Job.status == "queued"))
+        recent = db.execute(select(Job.created_at, Job.started_at, Job.finished_at)
+                            .where(Job.status == "succeeded").order_by(Job.id.desc()).limit(window)).all()
+        waits = [(s - c).total_seconds() for c, s, _ in recent if s]
+        runs = [(f - s).total_seconds() for _, s, f in recent if s and f]
+        return {
+            "counts": {status: counts.get(status, 0) for status in JOB_STATUSES},
+            "queue_depth": counts.get("queued", 0),
+            "oldest_queued_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+            "avg_wait_seconds": sum(waits) / len(waits) if waits else 0.0,
+            "avg_run_seconds": sum(runs) / len(runs) if runs else 0.0,
+            "window": len(recent),
+        }
+
+class JobDispatcher:
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-dispatcher-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception:
+                logger.exception("Job dispatcher iteration failed")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_once(self) -> bool:
+        # Claims and runs at most one job; False when the queue was empty
+        with SessionLocal() as db:
+            JobService.requeue_expired(db)
+            db.commit()
+            job = JobService.claim(db, self.name)
+            if job is None:
+                return False
+            job_id, frameworks, params = job.id, list(job.frameworks), dict(job.params or {})
+            prepared = ScenarioService.get_prepared(db, job.scenario_id)
+            db.commit()
+        try:
+            if prepared is None:
+                raise LookupError("Scenario not found")
+            sim_out = self._simulate(job_id, prepared, frameworks, params)
+            observe_simulation(prepared.meta.get("type"), len(prepared.frame), sim_out)
+        except Exception as exc:
+            with SessionLocal() as db:
+                JobService.fail(db, job_id, self.name, f"{type(exc).__name__}: {exc}")
+                db.commit()
+            return True
+        with SessionLocal() as db:
+            JobService.complete(db, job_id, self.name, sim_out, prepared)
+            db.commit()
+        return True
+
+    def _simulate(self, job_id: int, prepared, frameworks: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        # Jobs wait for a free executor slot instead of being rejected, and heartbeat their lease meanwhile
+        future = simulation_executor.submit(prepared, frameworks, params, block=True)
+        deadline = time.monotonic() + settings.job_timeout_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            done, _ = wait_futures([future], timeout=max(0.0, min(settings.job_lease_seconds / 3, remaining)))
+            if done:
+                return simulation_executor.result(future, None)
+            if remaining <= 0:
+                simulation_executor.abandon(future)
+                raise SimulationTimeout(f"Job exceeded {settings.job_timeout_seconds:g}s")
+            with SessionLocal() as db:
+                JobService.renew(db, job_id, self.name)
+                db.commit()
+
+job_dispatcher = JobDispatcher(settings.job_workers, settings.job_poll_seconds)
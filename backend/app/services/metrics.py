@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from threading import Lock
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from ..config import settings
+
+# In-process metrics in Prometheus text format (GET /api/metrics). Recording is a dict update under a lock;
+# everything is rendered only when scraped, and gauges such as cache or pool usage are read from their
+# owners at scrape time instead of being tracked continuously.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = Tuple[Dict[str, str], float]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(dict(zip(self.labelnames, key)))} {_number(v)}" for key, v in sorted(values.items())]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last = +Inf)..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, row in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {_number(cumulative)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        # Scrape-time readers: () -> [(name, type, help, samples)]
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], List[Tuple[str, str, str, List[Sample]]]]) -> Callable:
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            for name, type, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+                lines += [f"{name}{_labels(labels)} {_number(v)}" for labels, v in samples]
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                                     ("method", "route", "status"))
+STAGE_SECONDS = registry.histogram("simulation_stage_seconds", "Time per simulation stage (scenario_load, normalize, score, "
+                                   "framework, explanation, summary, persist, serialize, entity_delta)", ("stage", "scenario_type", "framework"))
+SIMULATIONS = registry.counter("simulations_total", "Simulations computed (cache replays excluded)", ("scenario_type",))
+ENTITIES = registry.counter("simulation_entities_total", "Entities processed by computed simulations", ("scenario_type",))
+
+def observe_stage(stage: str, seconds: float, scenario_type: Optional[str] = None, framework: str = "") -> None:
+    if settings.metrics_enabled:
+        STAGE_SECONDS.observe(seconds, stage=stage, scenario_type=scenario_type or "custom", framework=framework)
+
+@contextmanager
+def timed(stage: str, scenario_type: Optional[str] = None, framework: str = "") -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, scenario_type, framework)
+
+def observe_simulation(scenario_type: Optional[str], entities: int, sim_out: Dict[str, Any]) -> None:
+    # Stage timings measured inside run_prepared (possibly in a worker process) travel back in sim_out
+    if not settings.metrics_enabled:
+        return
+    scenario_type = scenario_type or "custom"
+    SIMULATIONS.inc(scenario_type=scenario_type)
+    ENTITIES.inc(entities, scenario_type=scenario_type)
+    for stage, value in sim_out.get("timings", {}).items():
+        if isinstance(value, dict):
+            for fw, seconds in value.items():
+                observe_stage(stage, seconds, scenario_type, fw)
+        else:
+            observe_stage(stage, value, scenario_type)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no per-request task or body buffering); routes are labelled by their path
+    # template so ids do not multiply series
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                    route=getattr(route, "path", "unmatched"), status=status["code"])
@@ -0,0 +1,81 @@
+import cProfile
+import hmac
+import io
+import marshal
+import pstats
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import RunProfile
+
+# Opt-in per-request profiling. A request carrying the configured token runs under cProfile; simulation work
+# handed to a worker thread or process is profiled where it runs (profiled_task) and merged in, so the stored
+# profile covers both. Requests without the token never reach this module.
+
+PROFILE_SORTS = ("cumulative", "tottime", "calls")
+
+def profiling_allowed(token: Optional[str]) -> bool:
+    if not settings.profiling_token or token is None:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.profiling_token.encode("utf-8"))
+
+def stats_data(profiler: cProfile.Profile) -> bytes:
+    # The pstats file format (what Profile.dump_stats writes)
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+def profiled_task(task: Callable, prepared, frameworks: List[str], params: Any) -> Dict[str, Any]:
+    # Executor task wrapper, bound with functools.partial: the task's output plus its profile under "profile"
+    profiler = cProfile.Profile()
+    out = profiler.runcall(task, prepared, frameworks, params)
+    return {**out, "profile": stats_data(profiler)}
+
+def _stats(data: bytes) -> pstats.Stats:
+    stats = pstats.Stats()
+    stats.stats = marshal.loads(data)
+    stats.get_top_level_stats()
+    return stats
+
+def merge_stats(*datas: Optional[bytes]) -> bytes:
+    stats = pstats.Stats()
+    for data in datas:
+        if data:
+            stats.add(_stats(data))
+    return marshal.dumps(stats.stats)
+
+def stats_text(data: bytes, sort: str = "cumulative", limit: int = 50) -> str:
+    buf = io.StringIO()
+    stats = _stats(data)
+    stats.stream = buf
+    stats.sort_stats(sort).print_stats(limit)
+    return buf.getvalue()
+
+class ProfileService:
+    @staticmethod
+    def save(db: Session, run_id: int, endpoint: str, duration_ms: float, data: bytes) -> RunProfile:
+        profile = RunProfile(run_id=run_id, endpoint=endpoint, duration_ms=duration_ms, data=zlib.compress(data))
+        db.add(profile)
+        db.flush()
+        cutoff = db.scalar(select(RunProfile.id).order_by(RunProfile.id.desc()).offset(max(1, settings.max_stored_profiles)).limit(1))
+        if cutoff is not None:
+            db.execute(delete(RunProfile).where(RunProfile.id <= cutoff))
+        return profile
+
+    @staticmethod
+    def list(db: Session, run_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        # Metadata only; the stored statistics are not read
+        stmt = select(RunProfile.id, RunProfile.run_id, RunProfile.endpoint, RunProfile.duration_ms,
+                      func.length(RunProfile.data).label("size_bytes"), RunProfile.created_at)
+        if run_id is not None:
+            stmt = stmt.where(RunProfile.run_id == run_id)
+        return [dict(row._mapping) for row in db.execute(stmt.order_by(RunProfile.id.desc()).limit(limit))]
+
+    @staticmethod
+    def get(db: Session, profile_id: int) -> RunProfile | None:
+        return db.get(RunProfile, profile_id)
+
+    @staticmethod
+    def data(profile: RunProfile) -> bytes:
+        return zlib.decompress(profile.data)
@@ -1,30 +1,218 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from ..models import Run, Result
-from typing import List, Dict
+from sqlalchemy.orm import Session, selectinload, defer
+from sqlalchemy import select, insert, and_, or_, func
+from ..models import Run, Result, RunScores, Scenario
+from ..config import settings
+from ..database import SessionLocal
+from ..ethics.runner import PreparedScenario
+from .decisions import compact_decisions, as_stored, score_values
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import Future
+from datetime import datetime
+import base64
+import csv
+import io
+import json
+import queue
+import threading
+import time
+import numpy as np
+
+def encode_cursor(run: Run) -> str:
+    # Opaque keyset cursor: position of the last run of a page in (created_at desc, id desc) order
+    raw = f"{run.created_at.isoformat()}|{run.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    # Raises ValueError on anything that did not come from encode_cursor
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, run_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(run_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+def iter_ranking(order: np.ndarray, ids: np.ndarray, scores: np.ndarray, groups: np.ndarray, fmt: str,
+                 chunk_size: int = 10000) -> Iterator[str]:
+    # Ranked rows as NDJSON lines or CSV, rendered a chunk at a time so memory stays flat
+    if fmt == "csv":
+        yield "rank,id,score,group\r\n"
+    for start in range(0, len(order), chunk_size):
+        idx = order[start:start + chunk_size]
+        rows = zip(range(start + 1, start + 1 + len(idx)), ids[idx].tolist(), score_values(scores[idx]), groups[idx].tolist())
+        if fmt == "csv":
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows)
+            yield buf.getvalue()
+        else:
+            yield "".join(json.dumps({"rank": r, "id": i, "score": s, "group": g}, default=str) + "\n" for r, i, s, g in rows)
+
+class RunEntry:
+    """One run to persist: a computed simulation (sim_out + prepared) or a replay of source_run_id."""
+
+    def __init__(self, scenario_id: int, frameworks: List[str], params: dict, sim_out: Dict[str, Any],
+                 prepared: Optional[PreparedScenario] = None, source_run_id: Optional[int] = None,
+                 result_ids: Optional[List[int]] = None):
+        self.scenario_id = scenario_id
+        self.frameworks = frameworks
+        self.params = params
+        self.sim_out = sim_out
+        self.prepared = prepared
+        self.source_run_id = source_run_id
+        # Replays: ids of the source run's Result rows, in sim_out["results"] order
+        self.result_ids = result_ids
 
 class RunService:
     @staticmethod
-    def create_run(db: Session, scenario_id: int, frameworks: List[str], params: dict) -> Run:
-        run = Run(scenario_id=scenario_id, requested_frameworks=frameworks, params=params)
-        db.add(run)
-        db.flush()
-        return run
+    def record(db: Session, scenario_id: int, frameworks: List[str], params: dict, sim_out: Dict[str, Any], prepared: PreparedScenario) -> Dict[str, Any]:
+        return RunService.record_many(db, [RunEntry(scenario_id, frameworks, params, sim_out, prepared)])[0]
+
+    @staticmethod
+    def record_many(db: Session, entries: List[RunEntry]) -> List[Dict[str, Any]]:
+        # Runs, score vectors and results go in as one multi-row INSERT ... RETURNING each, with no ORM
+        # objects or refreshes; the returned RunOut-shaped dicts are built from the in-memory sim_out
+        if not entries:
+            return []
+        now = datetime.utcnow()
+        run_ids = db.scalars(insert(Run).returning(Run.id, sort_by_parameter_order=True), [
+            {"scenario_id": e.scenario_id, "requested_frameworks": e.frameworks, "params": e.params,
+             "created_at": now, "source_run_id": e.source_run_id} for e in entries
+        ]).all()
+
+        dtype = "<f4" if settings.score_storage_dtype == "float32" else "<f8"
+        # Decisions are stored as positions only while the scenario still holds the entities they were
+        # computed on (an entity patch may have landed while the simulation ran)
+        current = dict(db.execute(select(Scenario.id, Scenario.content_hash)
+                                  .where(Scenario.id.in_({e.scenario_id for e in entries}))).all())
+        score_rows, result_rows, response_decisions = [], [], []
+        for run_id, e in zip(run_ids, entries):
+            if e.source_run_id is not None:
+                continue
+            scores = e.sim_out.get("scores")
+            if scores is not None:
+                score_rows.append({"run_id": run_id, "content_hash": e.prepared.content_hash, "dtype": dtype,
+                                   "data": np.asarray(scores, dtype=dtype).tobytes()})
+            same_entities = current.get(e.scenario_id) == e.prepared.content_hash
+            for r in e.sim_out["results"]:
+                decisions, indices = compact_decisions(r["decisions"], e.prepared, scores) if same_entities else (r["decisions"], None)
+                response_decisions.append(as_stored(r["decisions"], decisions, dtype))
+                result_rows.append({"run_id": run_id, "framework": r["framework"], "decisions": decisions, "indices": indices,
+                                    "content_hash": e.prepared.content_hash if indices is not None else None,
+                                    "metrics": r["metrics"], "explanation": r["explanation"]})
+        if score_rows:
+            db.execute(insert(RunScores), score_rows)
+        result_ids = db.scalars(insert(Result).returning(Result.id, sort_by_parameter_order=True), result_rows).all() if result_rows else []
+        stored = iter(zip(result_ids, response_decisions))
+
+        out = []
+        for run_id, e in zip(run_ids, entries):
+            if e.source_run_id is not None:
+                results = [(rid, r["decisions"]) for rid, r in zip(e.result_ids, e.sim_out["results"])]
+            else:
+                results = [next(stored) for _ in e.sim_out["results"]]
+            out.append({
+                "id": run_id,
+                "scenario_id": e.scenario_id,
+                "requested_frameworks": e.frameworks,
+                "params": e.params,
+                "created_at": now,
+                "source_run_id": e.source_run_id,
+                "results": [{"id": rid, "framework": r["framework"], "decisions": decisions, "metrics": r["metrics"],
+                             "explanation": r["explanation"]} for (rid, decisions), r in zip(results, e.sim_out["results"])],
+            })
+        return out
 
     @staticmethod
-    def add_results(db: Session, run_id: int, results: List[Dict]):
-        for r in results:
-            db.add(Result(run_id=run_id,
-                          framework=r["framework"],
-                          decisions=r["decisions"],
-                          metrics=r["metrics"],
-                          explanation=r["explanation"]))
-        db.flush()
+    def load_scores(db: Session, run: Run) -> Optional[Tuple[np.ndarray, Optional[str]]]:
+        # Replays share the scores of the run they point at
+        row = db.get(RunScores, run.source_run_id or run.id)
+        if row is None:
+            return None
+        return np.frombuffer(row.data, dtype=row.dtype), row.content_hash
 
     @staticmethod
     def get_run(db: Session, run_id: int) -> Run | None:
         return db.get(Run, run_id)
 
     @staticmethod
-    def list_runs(db: Session) -> List[Run]:
-        return list(db.scalars(select(Run).order_by(Run.created_at.desc())))
\ No newline at end of file
+    def list_runs(db: Session, limit: Optional[int] = None, cursor: Optional[str] = None, scenario_id: Optional[int] = None,
+                  framework: Optional[str] = None, with_decisions: bool = True) -> List[Run]:
+        stmt = select(Run).order_by(Run.created_at.desc(), Run.id.desc())
+        if cursor is not None:
+            created_at, run_id = decode_cursor(cursor)
+            stmt = stmt.where(or_(Run.created_at < created_at, and_(Run.created_at == created_at, Run.id < run_id)))
+        if scenario_id is not None:
+            stmt = stmt.where(Run.scenario_id == scenario_id)
+        if framework is not None:
+            # Replays carry no Result rows: match on the results of the run they point at
+            owner = func.coalesce(Run.source_run_id, Run.id)
+            stmt = stmt.where(select(Result.id).where(Result.run_id == owner, Result.framework == framework).exists())
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        # Results (own and replayed) come in two batched IN queries instead of one query per run
+        results = selectinload(Run.results)
+        source_results = selectinload(Run.source_run).selectinload(Run.results)
+        if not with_decisions:
+            skip = (defer(Result.decisions), defer(Result.indices))
+            results, source_results = results.options(*skip), source_results.options(*skip)
+        return list(db.scalars(stmt.options(results, source_results)))
+
+class RunWriter:
+    # Group commit: requests hand their RunEntry to one writer thread, which records whatever has queued
+    # up (up to batch_size, waiting at most flush_ms for more) in a single transaction. Each request still
+    # waits for the commit holding its runs (responses carry their ids), but under load many requests
+    # share one commit instead of paying for their own.
+    def __init__(self, batch_size: int, flush_ms: float):
+        self.batch_size = max(1, batch_size)
+        self.flush_ms = flush_ms
+        self._queue: "queue.Queue[Tuple[RunEntry, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.written = 0
+
+    def submit(self, entry: RunEntry) -> Future:
+        # Resolves to the RunOut-shaped dict once the batch holding the entry is committed
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((entry, future))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self._queue.qsize(), "batches": self.batches, "written": self.written}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="run-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[RunEntry, Future]]):
+        try:
+            with SessionLocal() as db:
+                out = RunService.record_many(db, [e for e, _ in batch])
+                db.commit()
+        except Exception as exc:
+            if len(batch) > 1:
+                # Retry one by one so a single bad entry does not fail the whole batch
+                for item in batch:
+                    self._write([item])
+            else:
+                batch[0][1].set_exception(exc)
+            return
+        self.batches += 1
+        self.written += len(batch)
+        for (_, future), run in zip(batch, out):
+            future.set_result(run)
+
+run_writer = RunWriter(settings.run_write_batch_size, settings.run_write_flush_ms)
@@ -1,12 +1,45 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import Optional
-from ..models import Scenario
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import select, delete, update, or_
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import numpy as np
+from ..models import Scenario, ScenarioColumn, ScenarioVersion, Run, Result
+from ..ethics.frame import EntityFrame
+from ..ethics.runner import PreparedScenario, prepare_scenario
+from ..ethics.incremental import EntityDelta, apply_delta
+from .cache import scenario_cache
+from .metrics import timed
+
+# Top-level fields accepted by ScenarioService.project(); config sub-keys are addressed as "config.<key>"
+PROJECTABLE_FIELDS = ("id", "name", "type", "description", "created_at", "entity_count", "attributes", "config")
+# Entity patches replayed on top of the column store before it is rewritten to include them
+PENDING_PATCHES = 8
+
+def content_hash(type: str, config: dict) -> str:
+    canonical = json.dumps({"type": type, "config": config}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def patch_hash(parent: str, add: List[Dict[str, Any]], remove: List[Any]) -> str:
+    # Versions produced by entity patches chain on the hash of the version they were applied to
+    canonical = json.dumps({"parent": parent, "add": add, "remove": remove}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class EntityConflict(Exception):
+    pass
 
 class ScenarioService:
     @staticmethod
     def get_all(db: Session):
-        return list(db.scalars(select(Scenario).order_by(Scenario.created_at.desc())))
+        return list(db.scalars(select(Scenario).options(undefer(Scenario.config)).order_by(Scenario.created_at.desc())))
+
+    @staticmethod
+    def list_summaries(db: Session) -> List[Dict[str, Any]]:
+        # Never touches the config column: attributes come from the column store's field names
+        rows = db.execute(select(Scenario.id, Scenario.name, Scenario.type, Scenario.description, Scenario.entity_count,
+                                 Scenario.created_at).order_by(Scenario.created_at.desc())).mappings().all()
+        attributes = ScenarioService._attributes(db, [r["id"] for r in rows])
+        return [dict(r, attributes=attributes.get(r["id"], [])) for r in rows]
 
     @staticmethod
     def get_by_id(db: Session, scenario_id: int) -> Optional[Scenario]:
@@ -18,8 +51,237 @@ class ScenarioService:
         return db.scalars(stmt).first()
 
     @staticmethod
-    def create(db: Session, name: str, type: str, description: str | None, config: dict) -> Scenario:
-        scen = Scenario(name=name, type=type, description=description, config=config)
+    def create(db: Session, name: str, type: str, description: str | None, config: dict,
+               digest: str | None = None, frame: EntityFrame | None = None) -> Scenario:
+        # Entities are split off into columnar storage; only metadata stays in config
+        meta = {k: v for k, v in config.items() if k != "entities"}
+        if frame is None:
+            frame = EntityFrame.from_entities(config.get("entities", []))
+        scen = Scenario(name=name, type=type, description=description, config=meta, content_hash=digest or content_hash(type, config))
         db.add(scen)
         db.flush()  # populate id
-        return scen
\ No newline at end of file
+        ScenarioService.store_frame(db, scen, frame)
+        return scen
+
+    @staticmethod
+    def store_frame(db: Session, scen: Scenario, frame: EntityFrame) -> None:
+        db.add_all(ScenarioColumn(scenario_id=scen.id, position=i, **rec) for i, rec in enumerate(frame.to_columns()))
+        scen.entity_count = len(frame)
+        db.flush()
+
+    @staticmethod
+    def rewrite_frame(db: Session, scen: Scenario, frame: EntityFrame) -> None:
+        # Existing column rows are updated in place by name; only columns that appeared or went are
+        # inserted or deleted
+        stored = dict(db.execute(select(ScenarioColumn.name, ScenarioColumn.id).where(ScenarioColumn.scenario_id == scen.id)).all())
+        records = frame.to_columns()
+        changed = [{"id": stored[rec["name"]], "position": i, **rec} for i, rec in enumerate(records) if rec["name"] in stored]
+        if changed:
+            db.execute(update(ScenarioColumn), changed)
+        db.add_all(ScenarioColumn(scenario_id=scen.id, position=i, **rec) for i, rec in enumerate(records) if rec["name"] not in stored)
+        gone = set(stored) - {rec["name"] for rec in records}
+        if gone:
+            db.execute(delete(ScenarioColumn).where(ScenarioColumn.id.in_([stored[name] for name in gone])))
+        scen.entity_count = len(frame)
+        db.flush()
+
+    @staticmethod
+    def load_frame(db: Session, scenario_id: int, fields: Optional[List[str]] = None) -> Optional[EntityFrame]:
+        # Only the requested columns are read (ids always); None if the scenario has no stored columns
+        stmt = select(ScenarioColumn.name, ScenarioColumn.kind, ScenarioColumn.dtype, ScenarioColumn.data, ScenarioColumn.items) \
+            .where(ScenarioColumn.scenario_id == scenario_id).order_by(ScenarioColumn.position)
+        if fields is not None:
+            stmt = stmt.where(ScenarioColumn.name.in_(["id", *fields]))
+        rows = db.execute(stmt).mappings().all()
+        return EntityFrame.from_columns(rows) if rows else None
+
+    @staticmethod
+    def get_frame(db: Session, scen: Scenario) -> EntityFrame:
+        if scen.entity_count is not None and ScenarioService._pending(db, scen.id, exists=True):
+            # Entity patches not in the column store yet: the prepared version has them applied
+            return ScenarioService.get_prepared(db, scen.id).frame
+        return ScenarioService._stored_frame(db, scen)
+
+    @staticmethod
+    def _stored_frame(db: Session, scen: Scenario) -> EntityFrame:
+        if scen.entity_count is None:
+            # Legacy row not migrated yet (migrate_legacy runs at startup): read the embedded entities
+            return EntityFrame.from_entities(scen.config.get("entities", []))
+        return ScenarioService.load_frame(db, scen.id) or EntityFrame.from_entities([])
+
+    @staticmethod
+    def _pending(db: Session, scenario_id: int, exists: bool = False) -> List[ScenarioVersion]:
+        # Patches whose added entities are not in the column store yet, oldest first
+        stmt = select(ScenarioVersion).where(ScenarioVersion.scenario_id == scenario_id, ScenarioVersion.added.is_not(None)) \
+            .order_by(ScenarioVersion.id)
+        return list(db.scalars(stmt.limit(1) if exists else stmt))
+
+    @staticmethod
+    def to_out(db: Session, scen: Scenario) -> Dict[str, Any]:
+        # Full representation with entities rebuilt from the column store (legacy rows still embed them)
+        config = scen.config
+        if scen.entity_count is not None:
+            config = config | {"entities": ScenarioService.get_frame(db, scen).to_entities()}
+        return {
+            "id": scen.id,
+            "name": scen.name,
+            "type": scen.type,
+            "description": scen.description,
+            "config": config,
+            "created_at": scen.created_at,
+        }
+
+    @staticmethod
+    def project(db: Session, scen: Scenario, fields: List[str]) -> Dict[str, Any]:
+        # Only what was asked for is loaded: entities are rebuilt for "config" or "config.entities" only
+        out: Dict[str, Any] = {}
+        for f in fields:
+            if f == "config":
+                out["config"] = ScenarioService.to_out(db, scen)["config"]
+            elif f.startswith("config."):
+                key = f[len("config."):]
+                config = out.setdefault("config", {})
+                if key == "entities" and scen.entity_count is not None:
+                    config["entities"] = ScenarioService.get_frame(db, scen).to_entities()
+                elif key in scen.config:
+                    config[key] = scen.config[key]
+            elif f == "attributes":
+                out["attributes"] = ScenarioService._attributes(db, [scen.id]).get(scen.id, [])
+            else:
+                out[f] = getattr(scen, f)
+        return out
+
+    @staticmethod
+    def entity_page(db: Session, scen: Scenario, offset: int, limit: int, fields: Optional[List[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        if scen.entity_count is None:
+            # Legacy row: entities are still embedded in config
+            entities = scen.config.get("entities", [])
+            page = entities[offset:offset + limit]
+            if fields is not None:
+                keep = {"id", *fields}
+                page = [{k: v for k, v in e.items() if k in keep} for e in page]
+            return len(entities), page
+        if ScenarioService._pending(db, scen.id, exists=True):
+            return scen.entity_count, ScenarioService.get_frame(db, scen).to_entities(offset, offset + limit, fields)
+        frame = ScenarioService.load_frame(db, scen.id, fields) or EntityFrame.from_entities([])
+        return scen.entity_count, frame.to_entities(offset, offset + limit)
+
+    @staticmethod
+    def entities_by_id(db: Session, scen: Scenario, ids: List[str], fields: Optional[List[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        # Ids arrive as query-string text, so they are matched as strings; entities come in scenario order
+        if scen.entity_count is None or ScenarioService._pending(db, scen.id, exists=True):
+            frame = ScenarioService.get_frame(db, scen)
+        else:
+            frame = ScenarioService.load_frame(db, scen.id, fields) or EntityFrame.from_entities([])
+        wanted = set(ids)
+        rows = np.array([i for i, v in enumerate(frame.ids.tolist()) if str(v) in wanted], dtype=np.intp)
+        return len(frame), frame.subset(rows).to_entities(fields=fields)
+
+    @staticmethod
+    def get_prepared(db: Session, scenario_id: int) -> Optional[PreparedScenario]:
+        # Version check reads only the hash column; entities are loaded and normalized on a miss only
+        digest = db.scalar(select(Scenario.content_hash).where(Scenario.id == scenario_id))
+        prepared = scenario_cache.get((scenario_id, digest))
+        if prepared is not None:
+            return prepared
+        scen = db.get(Scenario, scenario_id)
+        if scen is None:
+            return None
+        pending = ScenarioService._pending(db, scenario_id) if scen.entity_count is not None else []
+        with timed("scenario_load", scen.type):
+            frame = ScenarioService._stored_frame(db, scen)
+        with timed("normalize", scen.type):
+            prepared = prepare_scenario(scen.config | {"type": scen.type, "name": scen.name}, frame=frame)
+        # A row without a hash yet (migrate_legacy backfills them) gets no worker caching or compact decisions
+        prepared.content_hash = pending[0].parent_hash if pending else scen.content_hash
+        for version in pending:
+            # The same deltas, in the same order, that produced the current version in the patching process
+            with timed("entity_delta", scen.type):
+                delta = EntityDelta(np.frombuffer(version.removed, dtype="<i4"), EntityFrame.from_entities(version.added))
+                prepared = apply_delta(prepared, delta, version.content_hash)
+        scenario_cache.put((scenario_id, scen.content_hash), prepared, replaces=lambda k: k[0] == scenario_id)
+        return prepared
+
+    @staticmethod
+    def entity_delta(prepared: PreparedScenario, add: List[Dict[str, Any]], remove: List[Any]) -> EntityDelta:
+        # Removed ids must exist (LookupError); added entities need ids that stay unique (EntityConflict), so
+        # an id both removed and added replaces that entity
+        frame = prepared.frame
+        removed = frame.positions(remove)
+        if removed is None:
+            unknown = [i for i in remove if frame.positions([i]) is None]
+            raise LookupError(f"Unknown entity ids: {unknown}")
+        ids = [e.get("id") for e in add]
+        if any(i is None for i in ids):
+            raise ValueError("Every added entity needs an id")
+        try:
+            if len(set(ids)) != len(ids):
+                raise EntityConflict("Added entities repeat an id")
+        except TypeError:
+            raise ValueError("Entity ids must be scalars")
+        gone = set(removed.tolist())
+        taken = [i for i in ids if (pos := frame.positions([i])) is not None and int(pos[0]) not in gone]
+        if taken:
+            raise EntityConflict(f"Entity ids already exist: {taken}")
+        return EntityDelta(removed, EntityFrame.from_entities(add))
+
+    @staticmethod
+    def patch_entities(db: Session, scen: Scenario, prepared: PreparedScenario, delta: EntityDelta,
+                       add: List[Dict[str, Any]], remove: List[Any]) -> PreparedScenario:
+        # The next version is derived from the cached one (see ethics/incremental.py) and replaces it in the
+        # cache. The patch itself is recorded as a ScenarioVersion: positions stored against the previous
+        # version stay readable through it, and until PENDING_PATCHES have gathered its added entities are
+        # replayed onto the column store on load instead of rewriting every column. A patch that changes
+        # the field list (what the column store lists as attributes) is written through at once.
+        digest = patch_hash(prepared.content_hash, add, remove)
+        with timed("entity_delta", scen.type):
+            updated = apply_delta(prepared, delta, digest)
+        pending = ScenarioService._pending(db, scen.id)
+        write = prepared.content_hash is None or len(pending) + 1 >= PENDING_PATCHES \
+            or updated.frame.fields != prepared.frame.fields
+        if prepared.content_hash is not None:
+            gone = prepared.frame.subset(delta.removed)
+            db.add(ScenarioVersion(scenario_id=scen.id, parent_hash=prepared.content_hash, content_hash=digest,
+                                   removed=delta.removed.astype("<i4").tobytes(), removed_ids=gone.ids.tolist(),
+                                   removed_groups=gone.labels(prepared.meta.get("protected_attribute") or "gender"),
+                                   added=None if write else add))
+        if write:
+            for version in pending:
+                version.added = None
+            ScenarioService.rewrite_frame(db, scen, updated.frame)
+        scen.entity_count = len(updated.frame)
+        scen.content_hash = digest
+        db.flush()
+        scenario_cache.put((scen.id, digest), updated, replaces=lambda k: k[0] == scen.id)
+        return updated
+
+    @staticmethod
+    def _attributes(db: Session, scenario_ids: List[int]) -> Dict[int, List[str]]:
+        rows = db.execute(select(ScenarioColumn.scenario_id, ScenarioColumn.name)
+                          .where(ScenarioColumn.scenario_id.in_(scenario_ids), ScenarioColumn.kind != "ids")
+                          .order_by(ScenarioColumn.scenario_id, ScenarioColumn.position)).all()
+        out: Dict[int, List[str]] = {}
+        for sid, name in rows:
+            out.setdefault(sid, []).append(name)
+        return out
+
+    @staticmethod
+    def migrate_legacy(db: Session) -> int:
+        # Rows from before content hashes get theirs, and scenarios stored before the column store embed
+        # their entities in config: both are fixed once, at startup, so read paths never write. Returns how
+        # many rows were migrated.
+        legacy = db.scalars(select(Scenario).where(or_(Scenario.entity_count.is_(None), Scenario.content_hash.is_(None)))).all()
+        for scen in legacy:
+            config = scen.config
+            if scen.content_hash is None:
+                scen.content_hash = content_hash(scen.type, config)
+            if scen.entity_count is not None:
+                continue
+            scen.config = {k: v for k, v in config.items() if k != "entities"}
+            ScenarioService.store_frame(db, scen, EntityFrame.from_entities(config.get("entities", [])))
+        # Compact results from before they recorded their scenario version refer to the current one (entity
+        # patches used to expand them)
+        db.execute(update(Result).where(Result.indices.is_not(None), Result.content_hash.is_(None)).values(
+            content_hash=select(Scenario.content_hash).join(Run, Run.scenario_id == Scenario.id)
+            .where(Run.id == Result.run_id).scalar_subquery()).execution_options(synchronize_session=False))
+        return len(legacy)
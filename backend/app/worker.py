@@ -0,0 +1,30 @@
+import logging
+import signal
+import threading
+from .config import settings
+from .database import SessionLocal, upgrade_schema
+from .services.executor import simulation_executor
+from .services.jobs import JobDispatcher
+from .services.scenarios import ScenarioService
+
+# Standalone job worker: `python -m app.worker`. Runs queued simulation jobs from the shared database,
+# e.g. alongside API processes started with JOB_WORKERS=0.
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    upgrade_schema()
+    with SessionLocal() as db:
+        ScenarioService.migrate_legacy(db)
+        db.commit()
+    dispatcher = JobDispatcher(max(1, settings.job_workers), settings.job_poll_seconds)
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    dispatcher.start()
+    logging.getLogger(__name__).info("Job worker %s started with %d dispatcher(s)", dispatcher.name, dispatcher.workers)
+    stop.wait()
+    dispatcher.stop()
+    simulation_executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_datasets import DATASETS  # noqa: E402
+from app.ethics.ingest import PROFILES, block_columns, assemble_columns, scenario_from_columns  # noqa: E402
+from app.ethics.runner import FRAMEWORK_DISPATCH, prepare_scenario, run_prepared, run_simulation  # noqa: E402
+
+"""
+Usage:
+  python scripts/benchmark.py                                   # 1k, 100k and 1M entities per scenario type
+  python scripts/benchmark.py --sizes 1000,100000 --types hiring --out bench.json
+  python scripts/benchmark.py --baseline scripts/benchmark_baseline.json --threshold 0.25
+
+Scenarios are drawn from the scripts/generate_datasets.py distributions and converted with the ingestion
+profiles, so they look like the loaders' output at any size. Per scenario it records the median of --repeat
+timings (after one untimed warmup) of run_simulation (entity dicts in, so including the columnar
+conversion), run_prepared on a prepared frame, and each framework's decision function on its own, plus the
+peak memory traced during one run_simulation call. run_prepared and the frameworks get a freshly prepared
+frame per repetition, so scoring and rule eligibility are measured rather than served from the frame's
+caches. Each case also times a fixed control workload; with --baseline, timings are scaled by the
+ratio of the two runs' control times (so a machine that is busier or slower overall does not read as a
+regression) and the exit status is 1 if any figure is more than --threshold above the baseline. Timings
+under --min-seconds on both sides are noise and not compared.
+"""
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def build_scenario(type: str, n: int, seed: int = 42) -> Dict[str, Any]:
+    profile = PROFILES[type]
+    df = DATASETS[type](n, np.random.default_rng(seed))
+    block = {r["name"]: r for r in block_columns(df, profile, 0)}
+    records = list(assemble_columns(list(block), lambda name: [block[name]], [n], profile))
+    return scenario_from_columns(records, type, profile["meta"])
+
+
+def median_of(fn: Callable[[Any], Any], repeat: int, setup: Callable[[], Any] = lambda: None) -> float:
+    # One warmup call, then the median of `repeat` timed calls; setup() runs untimed before each
+    fn(setup())
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def control_workload(_=None) -> None:
+    # Fixed numpy and pure-Python work, roughly the engine's mix; its timing tracks how fast the machine
+    # is running at the moment
+    x = np.random.default_rng(0).random(1_000_000)
+    np.argsort(-x, kind="stable")
+    (x * 0.3 + x * 0.7).sum()
+    json.dumps([{"id": i, "score": float(v)} for i, v in enumerate(x[:100_000].tolist())])
+
+
+def peak_memory_mb(fn: Callable[[], Any]) -> float:
+    # Allocations made by fn itself (Python objects and numpy buffers); its inputs are not counted
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(type: str, n: int, repeat: int, seed: int = 42) -> Dict[str, Any]:
+    scenario = build_scenario(type, n, seed)
+    params = scenario["default_params"]
+    frameworks = list(FRAMEWORK_DISPATCH)
+    fresh = lambda: prepare_scenario(scenario)  # noqa: E731
+    # Per framework: the decision function alone, as timed inside run_prepared (warmup run first)
+    per_framework = {fw: statistics.median([run_prepared(fresh(), [fw], params)["timings"]["framework"][fw]
+                                            for _ in range(repeat + 1)][1:])
+                     for fw in frameworks}
+    return {
+        "type": type,
+        "entities": n,
+        "control_s": median_of(control_workload, repeat),
+        "run_simulation_s": median_of(lambda _: run_simulation(scenario, frameworks, params), repeat),
+        "run_prepared_s": median_of(lambda prepared: run_prepared(prepared, frameworks, params), repeat, fresh),
+        "frameworks_s": per_framework,
+        "peak_memory_mb": peak_memory_mb(lambda: run_simulation(scenario, frameworks, params)),
+    }
+
+
+def run_suite(types: List[str], sizes: List[int], repeat: int, seed: int = 42, log=print) -> Dict[str, Any]:
+    cases = {}
+    for type in types:
+        for n in sizes:
+            case = bench_case(type, n, repeat, seed)
+            cases[f"{type}/{n}"] = case
+            log(f"{type:>12} {n:>9}  run_simulation {case['run_simulation_s']:8.4f}s  run_prepared {case['run_prepared_s']:8.4f}s  "
+                f"peak {case['peak_memory_mb']:8.1f} MB  " + "  ".join(f"{fw} {s:.4f}s" for fw, s in case["frameworks_s"].items()))
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "repeat": repeat,
+        "seed": seed,
+        "cases": cases,
+    }
+
+
+def _figures(case: Dict[str, Any]) -> Dict[str, Tuple[float, bool]]:
+    # name -> (value, is_time)
+    out = {"run_simulation_s": (case["run_simulation_s"], True), "run_prepared_s": (case["run_prepared_s"], True),
+           "peak_memory_mb": (case["peak_memory_mb"], False)}
+    out.update({f"frameworks_s.{fw}": (s, True) for fw, s in case["frameworks_s"].items()})
+    return out
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_seconds: float = 0.1) -> List[str]:
+    """Regressions of `current` against `baseline`: figures more than `threshold` (a fraction) above it.
+
+    Timings are scaled by the baseline's control time over the current one when both cases have it.
+    Timings where both runs are under `min_seconds` are too noisy to judge and skipped; cases or figures
+    missing from either side are ignored."""
+    regressions = []
+    for key, case in current["cases"].items():
+        base = baseline.get("cases", {}).get(key)
+        if base is None:
+            continue
+        base_figures = _figures(base)
+        speed = base["control_s"] / case["control_s"] if case.get("control_s") and base.get("control_s") else 1.0
+        for name, (value, is_time) in _figures(case).items():
+            if name not in base_figures:
+                continue
+            ref = base_figures[name][0]
+            if is_time:
+                value *= speed
+            if is_time and max(value, ref) < min_seconds:
+                continue
+            if value > ref * (1 + threshold):
+                unit = "s" if is_time else " MB"
+                regressions.append(f"{key} {name}: {value:.4f}{unit} vs baseline {ref:.4f}{unit} (+{(value / ref - 1) * 100 if ref else float('inf'):.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ethics engine across scenario types and sizes")
+    parser.add_argument("--types", default=",".join(DATASETS), help="Comma-separated scenario types")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="Comma-separated entity counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per figure (the median is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown / memory growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.1, help="Timings below this in both runs are not compared")
+    args = parser.parse_args(argv)
+
+    types = [t for t in args.types.split(",") if t]
+    unknown = [t for t in types if t not in DATASETS]
+    if unknown:
+        parser.error(f"unknown scenario types: {', '.join(unknown)} (choose from {', '.join(DATASETS)})")
+    results = run_suite(types, [int(n) for n in args.sizes.split(",") if n], max(1, args.repeat), args.seed)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.min_seconds)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print("BENCHMARK_FAILED" if regressions else "BENCHMARK_PASSED")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import argparse
+from typing import Any, Dict, Optional
+import httpx
+
+# Shared command line for the loader scripts: convert a CSV with one of the ingestion profiles in
+# app/ethics/ingest.py, write the scenario JSON next to it, and register it by streaming the CSV to the
+# chunked ingestion API (POST /api/ingest), which applies the same profile server-side.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.ethics.ingest import PROFILES, convert_csv, scenario_from_columns  # noqa: E402
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def build_scenario(csv_path: str, profile: str, type: Optional[str] = None, block_rows: int = 100_000) -> Dict[str, Any]:
+    records = convert_csv(csv_path, PROFILES[profile], block_rows)
+    return scenario_from_columns(records, type or profile, PROFILES[profile]["meta"])
+
+
+def write_json(scenario: Dict[str, Any], out_path: str) -> None:
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(scenario, f, ensure_ascii=False)
+
+
+def _file_chunks(path: str):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def register_csv(api_base: str, csv_path: str, name: str, type: str, profile: str) -> bool:
+    # False if a scenario with this name already exists
+    with httpx.Client(timeout=300) as client:
+        r = client.post(f"{api_base}/ingest", json={"name": name, "type": type, "format": "csv", "profile": profile})
+        if r.status_code == 409:
+            return False
+        r.raise_for_status()
+        upload_id = r.json()["id"]
+        client.post(f"{api_base}/ingest/{upload_id}/chunks", content=_file_chunks(csv_path)).raise_for_status()
+        client.post(f"{api_base}/ingest/{upload_id}/complete").raise_for_status()
+    return True
+
+
+def main(profile: str, name: str, type: str, json_name: str, default_csv: str, done_message: str,
+         failed_message: Optional[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=f"Load a {type} CSV as the '{name}' scenario")
+    parser.add_argument("--csv", default=os.path.join("D:/AI Ethics Stimulator/data", default_csv))
+    parser.add_argument("--api", default="http://localhost:8000/api")
+    parser.add_argument("--block-rows", type=int, default=100_000, help="Rows converted per block")
+    parser.add_argument("--no-register", action="store_true", help="Only write the scenario JSON")
+    args = parser.parse_args()
+
+    scenario = build_scenario(args.csv, profile, type, args.block_rows)
+    # Write JSON for traceability
+    write_json(scenario, os.path.join(os.path.dirname(args.csv), json_name))
+    if args.no_register:
+        return
+    try:
+        register_csv(args.api, args.csv, name, type, profile)
+    except Exception as e:
+        if failed_message is None:
+            raise
+        print(f"{failed_message}: {e}")
+        return
+    print(done_message)
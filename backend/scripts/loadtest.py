@@ -0,0 +1,257 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import httpx
+
+from ingest_cli import register_csv
+from generate_datasets import DATASETS
+from app.ethics.ingest import PROFILES  # importable once ingest_cli has put the backend on sys.path
+
+"""
+Usage:
+  python scripts/loadtest.py --api http://localhost:8000/api --concurrency 16 --duration 30 --out sqlite.json
+  python scripts/loadtest.py --serve --env DATABASE_URL=postgresql+psycopg2://... --env SIMULATION_WORKERS=4 --label pg-4w --out pg.json
+  python scripts/loadtest.py --compare sqlite.json pg.json
+
+Drives /api/simulate, /api/scenarios and /api/runs from --concurrency concurrent clients for --duration
+seconds (after --warmup seconds whose requests are not counted), picking each request from --mix. Load-test
+scenarios ("Load test <type> <size>") are generated from the scripts/generate_datasets.py distributions and
+registered through the chunked ingestion API once; later runs reuse them. --serve starts a local uvicorn
+with the given --env settings and stops it afterwards. Reports record the server's database dialect, pool,
+run writer and executor settings next to throughput, p50/p95/p99 latency and error rates, so runs against
+different configurations can be put side by side with --compare.
+"""
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_KINDS = ("simulate", "scenarios", "runs")
+FRAMEWORKS = ["utilitarian", "fairness", "rule_based"]
+DEFAULT_MIX = "simulate=6,scenarios=2,runs=2"
+
+Sample = Tuple[str, Any, float, float]  # kind, status code (or exception name), latency seconds, start time
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, text.split(",")):
+        kind, _, weight = part.partition("=")
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"unknown request kind '{kind}' (choose from {', '.join(REQUEST_KINDS)})")
+        mix[kind] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise ValueError("the request mix needs at least one positive weight")
+    return mix
+
+
+def ensure_scenarios(api: str, types: List[str], sizes: List[int], seed: int = 42) -> List[Dict[str, Any]]:
+    # One stored scenario per (type, size), created on first use
+    def summaries():
+        return {s["name"]: s for s in httpx.get(f"{api}/scenarios", params={"view": "summary"}, timeout=60).json()}
+
+    existing = summaries()
+    for type in types:
+        for n in sizes:
+            name = f"Load test {type} {n}"
+            if name in existing:
+                continue
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f"{type}_{n}.csv")
+                DATASETS[type](n, np.random.default_rng(seed)).to_csv(path, index=False)
+                register_csv(api, path, name, type, type)
+    existing = summaries()
+    return [{"id": existing[f"Load test {type} {n}"]["id"], "type": type, "entities": n,
+             "params": PROFILES[type]["meta"]["default_params"]} for type in types for n in sizes]
+
+
+def build_request(kind: str, rng: random.Random, scenarios: List[Dict[str, Any]], use_cache: bool) -> Dict[str, Any]:
+    scenario = rng.choice(scenarios)
+    if kind == "simulate":
+        # top_k varies so use_cache runs still mix hits and misses
+        params = {**scenario["params"], "top_k": rng.choice((5, 10, 20))}
+        body = {"scenario_id": scenario["id"], "frameworks": FRAMEWORKS, "params": params, "use_cache": use_cache}
+        return {"method": "POST", "url": "/simulate", "json": body}
+    if kind == "scenarios":
+        return {"method": "GET", "url": "/scenarios", "params": {"view": "summary"}}
+    return {"method": "GET", "url": "/runs", "params": {"scenario_id": scenario["id"], "limit": 20, "decisions": "selected"}}
+
+
+async def run_load(client: httpx.AsyncClient, scenarios: List[Dict[str, Any]], mix: Dict[str, float], concurrency: int,
+                   duration: float, warmup: float = 0.0, use_cache: bool = False, seed: int = 0) -> Tuple[List[Sample], float]:
+    """Samples from the measured window (requests started after the warm-up) and that window's length."""
+    kinds, weights = list(mix), list(mix.values())
+    samples: List[Sample] = []
+    begin = time.perf_counter()
+    measure_from, deadline = begin + warmup, begin + warmup + duration
+
+    async def worker(i: int):
+        rng = random.Random(seed * 1000 + i)
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = (await client.request(**build_request(kind, rng, scenarios, use_cache))).status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            if start >= measure_from:
+                samples.append((kind, status, time.perf_counter() - start, start))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    # The window ends when the last in-flight request came back, not at the deadline
+    return samples, max(time.perf_counter(), deadline) - measure_from
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    def stats(rows: List[Sample]) -> Dict[str, Any]:
+        latencies = np.array([r[2] for r in rows]) * 1000
+        errors: Dict[str, int] = {}
+        for _, status, _, _ in rows:
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist() if len(rows) else (0.0, 0.0, 0.0)
+        return {
+            "requests": len(rows),
+            "throughput_rps": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "error_rate": sum(errors.values()) / len(rows) if rows else 0.0,
+            "errors": errors,
+            "latency_ms": {"p50": p50, "p95": p95, "p99": p99,
+                           "mean": float(latencies.mean()) if len(rows) else 0.0, "max": float(latencies.max()) if len(rows) else 0.0},
+        }
+
+    by_kind: Dict[str, List[Sample]] = {}
+    for row in samples:
+        by_kind.setdefault(row[0], []).append(row)
+    return {"elapsed_seconds": elapsed, "total": stats(samples), "endpoints": {k: stats(rows) for k, rows in sorted(by_kind.items())}}
+
+
+def server_info(api: str) -> Dict[str, Any]:
+    pool = httpx.get(f"{api}/db/pool", timeout=30).json()
+    executor = httpx.get(f"{api}/executor/stats", timeout=30).json()
+    return {"database": pool.get("dialect"), "pool": pool.get("class"),
+            "run_write_mode": pool.get("run_writer", {}).get("mode"),
+            "executor": {k: executor.get(k) for k in ("mode", "workers", "max_concurrent")}}
+
+
+def _redact(value: str) -> str:
+    # Credentials in database URLs stay out of reports
+    return re.sub(r"//([^:/@]+):[^@]*@", r"//\1:***@", value)
+
+
+def start_server(env: Dict[str, str], port: int, workers: int, timeout: float = 60.0) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                             "--workers", str(workers), "--log-level", "warning"], cwd=BACKEND_DIR, env={**os.environ, **env})
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError(f"uvicorn did not answer on port {port} within {timeout:g}s")
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['label']}: {report['server']['database']} / {report['server']['pool']} / executor "
+          f"{report['server']['executor']['mode']} x{report['server']['executor']['workers']}, concurrency {report['config']['concurrency']}")
+    rows = [("total", report["results"]["total"])] + list(report["results"]["endpoints"].items())
+    print(f"{'':>10} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, s in rows:
+        lat = s["latency_ms"]
+        print(f"{name:>10} {s['requests']:>9} {s['throughput_rps']:>9.1f} {lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f} {s['error_rate']:>7.1%}")
+    for name, s in report["results"]["endpoints"].items():
+        if s["errors"]:
+            print(f"{name} errors: " + ", ".join(f"{status} x{count}" for status, count in sorted(s["errors"].items())))
+
+
+def compare_reports(paths: List[str]) -> None:
+    print(f"{'label':>20} {'database':>10} {'pool':>10} {'executor':>12} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        server, total = report["server"], report["results"]["total"]
+        lat = total["latency_ms"]
+        executor = f"{server['executor']['mode']} x{server['executor']['workers']}"
+        print(f"{report['label'][:20]:>20} {server['database']:>10} {server['pool']:>10} {executor:>12} {report['config']['concurrency']:>5} "
+              f"{total['throughput_rps']:>9.1f} {lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f} {total['error_rate']:>7.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API with a mix of simulate, scenario and run requests")
+    parser.add_argument("--api", default="http://localhost:8000/api")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Request weights by kind ({', '.join(REQUEST_KINDS)})")
+    parser.add_argument("--types", default="hiring", help="Comma-separated scenario types to simulate")
+    parser.add_argument("--sizes", default="1000", help="Comma-separated scenario sizes (entities)")
+    parser.add_argument("--use-cache", action="store_true", help="Send use_cache=true with simulations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="Name of this configuration in reports (default: database/pool/executor)")
+    parser.add_argument("--out", help="Write the report JSON here")
+    parser.add_argument("--serve", action="store_true", help="Start a local uvicorn for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes for --serve")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Server setting for --serve (repeatable)")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT", help="Print saved reports side by side and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_reports(args.compare)
+        return 0
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+    types = [t for t in args.types.split(",") if t]
+    if any(t not in DATASETS for t in types):
+        parser.error(f"--types takes {', '.join(DATASETS)}")
+    env = dict(item.split("=", 1) for item in args.env)
+
+    server = start_server(env, args.port, args.server_workers) if args.serve else None
+    api = f"http://127.0.0.1:{args.port}/api" if args.serve else args.api.rstrip("/")
+    try:
+        scenarios = ensure_scenarios(api, types, [int(n) for n in args.sizes.split(",") if n])
+        info = server_info(api)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+        async def run():
+            async with httpx.AsyncClient(base_url=api, timeout=300, limits=limits) as client:
+                return await run_load(client, scenarios, mix, args.concurrency, args.duration, args.warmup, args.use_cache, args.seed)
+
+        samples, elapsed = asyncio.run(run())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(30)
+
+    report = {
+        "label": args.label or f"{info['database']}/{info['pool']}/{info['executor']['mode']}",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "client": {"python": platform.python_version(), "platform": platform.platform()},
+        "server": {**info, "env": {k: _redact(v) for k, v in env.items()}, "uvicorn_workers": args.server_workers if args.serve else None},
+        "config": {"concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup, "mix": mix,
+                   "scenarios": [{k: s[k] for k in ("type", "entities")} for s in scenarios], "use_cache": args.use_cache, "seed": args.seed},
+        "results": summarize(samples, elapsed),
+    }
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
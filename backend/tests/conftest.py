@@ -0,0 +1,15 @@
+import os
+import tempfile
+import pytest
+
+# Run the suite against a throwaway SQLite database unless TEST_DATABASE_URL points elsewhere
+_db_dir = tempfile.mkdtemp(prefix="ai_ethics_test_")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", f"sqlite+pysqlite:///{_db_dir}/test.db")
+
+@pytest.fixture(scope="session", autouse=True)
+def app_startup():
+    # Entering the client runs the startup hook: schema creation and demo seeding
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app):
+        yield
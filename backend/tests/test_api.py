@@ -1,9 +1,27 @@
 import json
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 
 client = TestClient(app)
 
+def make_scenario(name, n, **config):
+    # A stored hiring scenario of n generated candidates; returns its id and entities
+    entities = [{"id": f"c{i}", "experience": i % 5, "test_score": 40 + (7 * i) % 50, "gender": "mf"[i % 2]} for i in range(n)]
+    sid = client.post("/api/scenarios", json={"name": name, "type": "hiring", "config": {**config, "entities": entities}}).json()["id"]
+    return sid, entities
+
+def simulate(sid, frameworks=("utilitarian", "fairness", "rule_based"), **params):
+    # POST /simulate on a stored scenario; returns the recorded run
+    resp = client.post("/api/simulate", json={"scenario_id": sid, "frameworks": list(frameworks), "params": params})
+    assert resp.status_code == 200
+    return resp.json()["run"]
+
+@pytest.fixture
+def demo():
+    # The seeded hiring demo scenario, as listed by GET /scenarios?view=summary
+    return next(s for s in client.get("/api/scenarios?view=summary").json() if s["name"] == "Hiring Bias Demo")
+
 def test_health():
     resp = client.get("/api/health")
     assert resp.status_code == 200
@@ -28,4 +46,466 @@ def test_simulate():
     resp = client.post("/api/simulate", json=payload)
     assert resp.status_code == 200
     run = resp.json()
-    assert "results" in run and len(run["results"]) >= 3
\ No newline at end of file
+    assert "results" in run and len(run["results"]) >= 3
+
+def test_simulate_reuses_prepared_scenario(demo):
+    payload = {"scenario_id": demo["id"], "params": {"top_k": 1}}
+    assert client.post("/api/simulate", json=payload).status_code == 200
+    before = client.get("/api/cache/stats").json()["scenarios"]
+    assert client.post("/api/simulate", json=payload).status_code == 200
+    after = client.get("/api/cache/stats").json()["scenarios"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+def test_simulate_use_cache_records_lightweight_run(demo):
+    payload = {"scenario_id": demo["id"], "params": {"top_k": 3, "weights": {"experience": 1}}}
+    first = client.post("/api/simulate", json=payload).json()["run"]
+    replay = client.post("/api/simulate", json=payload | {"use_cache": True}).json()["run"]
+    assert replay["id"] != first["id"]
+    assert replay["source_run_id"] == first["id"]
+    assert [r["id"] for r in replay["results"]] == [r["id"] for r in first["results"]]
+    stored = client.get(f"/api/runs/{replay['id']}").json()
+    assert stored["results"][0]["decisions"] == first["results"][0]["decisions"]
+
+def test_scenario_without_content_hash_is_not_result_cached():
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models import Scenario
+    from app.services.cache import scenario_cache
+    sid, _ = make_scenario("Unhashed Check", 6)
+    with SessionLocal() as session:
+        digest = session.get(Scenario, sid).content_hash
+        session.execute(update(Scenario).where(Scenario.id == sid).values(content_hash=None))
+        session.commit()
+    scenario_cache.clear()
+    payload = {"scenario_id": sid, "params": {"top_k": 2}, "use_cache": True}
+    first = client.post("/api/simulate", json=payload).json()["run"]
+    again = client.post("/api/simulate", json=payload).json()["run"]
+    assert first["source_run_id"] is None and again["source_run_id"] is None
+    with SessionLocal() as session:
+        session.execute(update(Scenario).where(Scenario.id == sid).values(content_hash=digest))
+        session.commit()
+
+def test_scenario_entities_stored_in_column_store():
+    from app.database import SessionLocal
+    from app.models import Scenario, ScenarioColumn
+    entities = [{"id": "p1", "age": 40, "income_group": "low"}, {"id": "p2", "age": 61.5, "income_group": "high"}]
+    payload = {"name": "Column Store Check", "type": "healthcare", "config": {"protected_attribute": "income_group", "entities": entities}}
+    created = client.post("/api/scenarios", json=payload).json()
+    assert created["config"]["entities"] == entities
+    with SessionLocal() as session:
+        scen = session.get(Scenario, created["id"])
+        assert "entities" not in scen.config and scen.entity_count == 2
+        kinds = {c.name: c.kind for c in session.query(ScenarioColumn).filter_by(scenario_id=scen.id)}
+        assert kinds == {"id": "ids", "age": "numeric", "income_group": "categorical"}
+    assert client.get(f"/api/scenarios/{created['id']}").json()["config"]["entities"] == entities
+
+def test_legacy_scenario_is_migrated_at_startup_not_on_read():
+    from app.database import SessionLocal
+    from app.models import Scenario, ScenarioColumn
+    from app.services.scenarios import ScenarioService
+    entities = [{"id": "l1", "age": 30}, {"id": "l2", "age": 70}]
+    with SessionLocal() as session:
+        scen = Scenario(name="Legacy Rows", type="healthcare", description="", config={"entities": entities})
+        session.add(scen)
+        session.commit()
+        sid = scen.id
+    assert client.get(f"/api/scenarios/{sid}").json()["config"]["entities"] == entities
+    with SessionLocal() as session:
+        scen = session.get(Scenario, sid)
+        assert scen.entity_count is None and scen.content_hash is None
+        assert ScenarioService.migrate_legacy(session) == 1
+        session.commit()
+        assert "entities" not in scen.config and scen.entity_count == 2 and scen.content_hash
+        assert session.query(ScenarioColumn).filter_by(scenario_id=sid).count() == 2
+    assert client.get(f"/api/scenarios/{sid}").json()["config"]["entities"] == entities
+
+def test_scenario_summary_projection_and_entity_pages():
+    entities = [{"id": f"e{i}", "score": i, "team": "ab"[i % 2]} for i in range(5)]
+    payload = {"name": "Projection Check", "type": "hiring", "config": {"default_params": {"top_k": 2}, "entities": entities}}
+    sid = client.post("/api/scenarios", json=payload).json()["id"]
+    summary = next(s for s in client.get("/api/scenarios?view=summary").json() if s["id"] == sid)
+    assert "config" not in summary
+    assert summary["entity_count"] == 5 and summary["attributes"] == ["score", "team"]
+    projected = client.get(f"/api/scenarios/{sid}?fields=name,config.default_params").json()
+    assert projected == {"name": "Projection Check", "config": {"default_params": {"top_k": 2}}}
+    assert client.get(f"/api/scenarios/{sid}?fields=nope").status_code == 400
+    page = client.get(f"/api/scenarios/{sid}/entities?offset=3&limit=5&fields=team").json()
+    assert page["total"] == 5
+    assert page["items"] == [{"id": "e3", "team": "b"}, {"id": "e4", "team": "a"}]
+    picked = client.get(f"/api/scenarios/{sid}/entities?ids=e4,e1,missing&fields=team").json()
+    assert picked["items"] == [{"id": "e1", "team": "b"}, {"id": "e4", "team": "a"}]
+
+def test_runs_keyset_pagination_filters_and_decision_views():
+    sid, _ = make_scenario("Runs Paging Check", 4)
+    for fw in (["utilitarian"], ["fairness"], ["utilitarian", "rule_based"]):
+        simulate(sid, fw, top_k=2)
+    first = client.get(f"/api/runs?scenario_id={sid}&limit=2")
+    assert len(first.json()) == 2 and "X-Next-Cursor" in first.headers
+    rest = client.get(f"/api/runs?scenario_id={sid}&limit=2&cursor={first.headers['X-Next-Cursor']}")
+    assert "X-Next-Cursor" not in rest.headers
+    ids = [r["id"] for r in first.json() + rest.json()]
+    assert len(ids) == 3 and ids == sorted(ids, reverse=True)
+    util = client.get(f"/api/runs?scenario_id={sid}&framework=utilitarian&decisions=selected").json()
+    assert len(util) == 2
+    assert all(set(res["decisions"]) == {"selected_ids"} for run in util for res in run["results"])
+    bare = client.get(f"/api/runs?scenario_id={sid}&decisions=none").json()
+    assert all(res["decisions"] is None for run in bare for res in run["results"])
+    assert client.get("/api/runs?cursor=not-a-cursor").status_code == 400
+
+def test_engine_pool_modes():
+    from sqlalchemy.pool import NullPool, QueuePool
+    from app.config import Settings
+    from app.database import build_engine
+    url = "sqlite+pysqlite:///" + __import__("tempfile").mkdtemp() + "/pool.db"
+    pooled = build_engine(Settings(database_url=url, db_pool_size=3))
+    assert isinstance(pooled.pool, QueuePool) and pooled.pool.size() == 3
+    with pooled.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    assert isinstance(build_engine(Settings(database_url=url, db_pool_mode="null")).pool, NullPool)
+    stats = client.get("/api/db/pool").json()
+    assert stats["class"] in ("QueuePool", "NullPool", "SingletonThreadPool")
+
+def test_simulation_executor_limits(monkeypatch):
+    import threading, time
+    from app.services import executor as ex
+    release = threading.Event()
+    monkeypatch.setattr(ex, "run_prepared", lambda *a: release.wait(5) and {"results": [], "summary": {}})
+    sim = ex.SimulationExecutor("thread", workers=2, max_concurrent=1, timeout=0.2)
+    with pytest.raises(ex.SimulationTimeout):
+        sim.run(None, [], {})
+    # The timed-out simulation still occupies the only slot until it actually finishes
+    with pytest.raises(ex.SimulationBusy):
+        sim.run(None, [], {})
+    release.set()
+    while sim.stats()["active"]:
+        time.sleep(0.01)
+    assert sim.run(None, [], {}) == {"results": [], "summary": {}}
+    assert sim.stats()["rejected"] == 1 and sim.stats()["timeouts"] == 1
+    sim.shutdown()
+    # Inline simulations finish before the caller could time them out
+    assert ex.SimulationExecutor("inline", workers=1, max_concurrent=1, timeout=0.2).timeout is None
+
+def _sleep_task(prepared, frameworks, seconds):
+    # Module level so process workers can import it
+    import time
+    time.sleep(seconds)
+    return {"slept": seconds}
+
+def test_process_timeout_spares_simulations_running_beside_it():
+    import time
+    from app.ethics.runner import PreparedScenario
+    from app.services import executor as ex
+    sim = ex.SimulationExecutor("process", workers=2, max_concurrent=3, timeout=None)
+    prepared = PreparedScenario({}, None)
+    try:
+        # Start the workers before timing anything
+        assert sim.result(sim.submit(prepared, [], 0, task=_sleep_task), 60) == {"slept": 0}
+        stuck = sim.submit(prepared, [], 60, task=_sleep_task)
+        beside = sim.submit(prepared, [], 1.5, task=_sleep_task)
+        with pytest.raises(ex.SimulationTimeout):
+            sim.result(stuck, 0.3)
+        # New work goes to a fresh pool; the one beside the timed-out simulation completes normally
+        fresh = sim.submit(prepared, [], 0, task=_sleep_task)
+        assert sim.result(beside, 30) == {"slept": 1.5}
+        # ...after which the retired pool is terminated and the stuck simulation's slot comes back
+        deadline = time.monotonic() + 10
+        while not stuck.done() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert stuck.done()
+        assert sim.result(fresh, 60) == {"slept": 0}
+        while sim.stats()["active"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert sim.stats()["active"] == 0 and sim.stats()["timeouts"] == 1
+    finally:
+        sim.shutdown()
+
+def test_job_runs_in_background_and_persists_run(demo):
+    body = {"scenario_id": demo["id"], "frameworks": ["utilitarian", "fairness"], "params": {"top_k": 2}}
+    job = client.post("/api/jobs", json=body)
+    assert job.status_code == 202 and job.json()["status"] in ("queued", "running", "succeeded")
+    done = client.get(f"/api/jobs/{job.json()['id']}?wait=20").json()
+    assert done["job"]["status"] == "succeeded" and done["job"]["run_id"]
+    direct = client.post("/api/simulate", json=body).json()
+    assert [r["metrics"] for r in done["result"]["run"]["results"]] == [r["metrics"] for r in direct["run"]["results"]]
+    assert client.get(f"/api/runs/{done['job']['run_id']}").status_code == 200
+    stats = client.get("/api/jobs/stats").json()
+    assert stats["counts"]["succeeded"] >= 1 and stats["queue_depth"] >= 0
+
+def test_expired_job_lease_is_requeued():
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.models import Job
+    from app.services.jobs import JobService, job_dispatcher
+    # Keep the in-process dispatcher from picking the job up while we inspect it
+    job_dispatcher.stop()
+    try:
+        with SessionLocal() as session:
+            job = Job(scenario_id=1, frameworks=["utilitarian"], params={}, status="running", attempts=1,
+                      worker="gone:1", lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+            session.add(job)
+            session.commit()
+            assert JobService.requeue_expired(session) == 1
+            session.commit()
+            session.refresh(job)
+            assert job.status == "queued" and job.worker is None
+            # The worker that lost the lease can no longer fail the job it was handed back from
+            assert not JobService.fail(session, job.id, "gone:1", "late failure")
+            session.commit()
+            session.refresh(job)
+            assert job.status == "queued" and job.error is None
+    finally:
+        job_dispatcher.start()
+
+def test_sweep_matches_simulate_and_persists_points():
+    sid, _ = make_scenario("Sweep Check", 12, protected_attribute="gender")
+    body = {"scenario_id": sid, "grid": {"weights": {"experience": [0.2, 1.0], "test_score": [0.5]}, "top_k": [1, 3]}, "persist": [3]}
+    resp = client.post("/api/sweep", json=body)
+    assert resp.status_code == 200
+    points = resp.json()["points"]
+    assert len(points) == 4 and [p["index"] for p in points] == [0, 1, 2, 3]
+    assert points[3]["params"] == {"weights": {"experience": 1.0, "test_score": 0.5}, "top_k": 3}
+    run = client.get(f"/api/runs/{points[3]['run_id']}").json()
+    for res in run["results"]:
+        for key, value in res["metrics"].items():
+            assert points[3]["metrics"][res["framework"]][key] == pytest.approx(value)
+    assert client.post("/api/sweep", json={"scenario_id": sid}).status_code == 400
+    assert client.post("/api/sweep", json={**body, "persist": [4]}).status_code == 400
+
+def test_invalid_params_are_rejected_with_400(demo):
+    bad = [{"top_k": "x"}, {"top_k": 0}, {"top_k": True}, {"ranking_limit": "abc"}, {"ranking_limit": -1}, {"weights": {"experience": "high"}}, {"weights": [1]}]
+    for params in bad:
+        for url in ("/api/simulate", "/api/jobs"):
+            resp = client.post(url, json={"scenario_id": demo["id"], "params": params})
+            assert resp.status_code == 400 and "params." in resp.json()["detail"]
+    assert client.post("/api/sweep", json={"scenario_id": demo["id"], "grid": {"top_k": [1, "x"]}}).status_code == 400
+
+def test_ranking_is_truncated_and_streamed_from_stored_scores():
+    sid, _ = make_scenario("Ranking Stream Check", 150)
+    run = simulate(sid, ["utilitarian"], top_k=3, ranking_limit=5)
+    decisions = run["results"][0]["decisions"]
+    assert len(decisions["ranking"]) == 5 and decisions["ranking_total"] == 150
+    full = simulate(sid, ["utilitarian"], top_k=3, ranking_limit=None)
+    expected = full["results"][0]["decisions"]["ranking"]
+    lines = [json.loads(line) for line in client.get(f"/api/runs/{run['id']}/ranking").text.splitlines()]
+    assert len(lines) == 150
+    assert [{k: row[k] for k in ("id", "score", "group")} for row in lines] == expected
+    assert lines[0]["rank"] == 1 and lines[:5] == [{"rank": r + 1, **e} for r, e in enumerate(decisions["ranking"])]
+    csv_rows = client.get(f"/api/runs/{run['id']}/ranking?format=csv&limit=2").text.splitlines()
+    assert csv_rows[0] == "rank,id,score,group" and csv_rows[1].startswith(f"1,{expected[0]['id']},")
+
+def test_decisions_stored_compactly_and_expanded_on_read():
+    from app.database import SessionLocal
+    from app.models import Result
+    sid, _ = make_scenario("Compact Decisions Check", 40)
+    run = simulate(sid, ["utilitarian", "fairness"], top_k=4)
+    with SessionLocal() as db:
+        rows = {r.framework: r for r in db.query(Result).filter(Result.run_id == run["id"])}
+        assert all(r.indices is not None for r in rows.values())
+        assert rows["utilitarian"].decisions["selected_ids"] == {"$ids": [0, 4]}
+        assert "$ranking" in rows["utilitarian"].decisions["ranking"]
+    expanded = {r["framework"]: r["decisions"] for r in client.get(f"/api/runs/{run['id']}").json()["results"]}
+    assert expanded == {r["framework"]: r["decisions"] for r in run["results"]}
+    assert len(expanded["utilitarian"]["selected_ids"]) == 4 and expanded["utilitarian"]["ranking"][0]["id"] == expanded["utilitarian"]["selected_ids"][0]
+    assert sum(len(ids) for ids in expanded["fairness"]["selection_by_group"].values()) == 4
+
+def test_group_commit_batches_runs_and_matches_sync_response(demo, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.config import settings
+    from app.services.runs import run_writer
+    payload = {"scenario_id": demo["id"], "params": {"top_k": 2}, "use_cache": False}
+    sync = client.post("/api/simulate", json=payload).json()["run"]
+    monkeypatch.setattr(settings, "run_write_mode", "group_commit")
+    before = run_writer.stats()
+    with ThreadPoolExecutor(4) as pool:
+        runs = [r.json()["run"] for r in pool.map(lambda _: client.post("/api/simulate", json=payload), range(16))]
+    after = run_writer.stats()
+    assert after["written"] - before["written"] == 16
+    assert len({r["id"] for r in runs}) == 16 and all(r["id"] > sync["id"] for r in runs)
+    for run in runs[:3]:
+        stored = client.get(f"/api/runs/{run['id']}").json()
+        assert stored == run
+        assert [r["decisions"] for r in run["results"]] == [r["decisions"] for r in sync["results"]]
+
+def test_chunked_csv_ingestion_applies_profile():
+    start = client.post("/api/ingest", json={"name": "Ingested Hiring", "type": "hiring"})
+    assert start.status_code == 200 and start.json()["profile"] == "hiring"
+    upload_id = start.json()["id"]
+    first = "enrollee_id,Gender,years_experience,training_hours\na1,Male,3,40\na2,,x,10\n"
+    second = "enrollee_id,Gender,years_experience,training_hours\na3,Female,9,25\n"
+    assert client.post(f"/api/ingest/{upload_id}/chunks", content=first).json()["rows"] == 2
+    assert client.post(f"/api/ingest/{upload_id}/chunks?header=true", content=second).json()["rows"] == 3
+    done = client.post(f"/api/ingest/{upload_id}/complete").json()
+    assert done["status"] == "completed"
+    items = client.get(f"/api/scenarios/{done['scenario_id']}/entities").json()["items"]
+    assert [e["id"] for e in items] == ["a1", "a2", "a3"]
+    assert [e.get("gender") for e in items] == ["Male", None, "Female"]
+    assert items[1]["name"] == "Candidate 1" and "experience" not in items[1]
+    assert [e["experience_norm"] for e in items] == [1 / 3, 0.0, 1.0]
+    assert [e["test_score"] for e in items] == [40.0, 10.0, 25.0]
+    run = client.post("/api/simulate", json={"scenario_id": done["scenario_id"], "params": {"top_k": 1}}).json()["run"]
+    assert run["results"][0]["decisions"]["selected_ids"] == ["a3"]
+    assert client.post(f"/api/ingest/{upload_id}/complete").status_code == 409
+
+def test_ndjson_ingestion_without_profile_matches_inline_entities():
+    entities = [{"id": i, "score": 0.5 * i, "tier": "ab"[i % 2], "utility": i} for i in range(5)]
+    upload_id = client.post("/api/ingest", json={"name": "Ingested Plain", "type": "custom", "format": "ndjson"}).json()["id"]
+    body = "".join(json.dumps(e) + "\n" for e in entities)
+    # A line cut across two chunks is joined; the final line needs no newline
+    cut = body.index("\n", len(body) // 2) - 3
+    assert client.post(f"/api/ingest/{upload_id}/chunks", content=body[:cut]).json()["rows"] == 2
+    assert client.post(f"/api/ingest/{upload_id}/chunks", content=body[cut:-1]).json()["rows"] == 4
+    sid = client.post(f"/api/ingest/{upload_id}/complete").json()["scenario_id"]
+    assert client.get(f"/api/scenarios/{sid}/entities").json()["items"] == entities
+    assert client.post("/api/ingest", json={"name": "Bad Profile", "type": "custom", "profile": "nope"}).status_code == 400
+
+def test_chunk_with_bad_row_is_not_applied(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "ingest_block_bytes", 16)
+    upload_id = client.post("/api/ingest", json={"name": "Ingested Partial", "type": "custom", "format": "ndjson"}).json()["id"]
+    assert client.post(f"/api/ingest/{upload_id}/chunks", content='{"id": 1}\n{"id": 2').json()["rows"] == 1
+    # Earlier blocks of the failing chunk were already staged: they are dropped with it
+    bad = client.post(f"/api/ingest/{upload_id}/chunks", content='}\n{"id": 3}\n{"id": 4}\n{broken\n')
+    assert bad.status_code == 400
+    assert client.get(f"/api/ingest/{upload_id}").json()["rows"] == 1
+    assert client.post(f"/api/ingest/{upload_id}/chunks", content='}\n{"id": 3}\n').json()["rows"] == 3
+    sid = client.post(f"/api/ingest/{upload_id}/complete").json()["scenario_id"]
+    assert [e["id"] for e in client.get(f"/api/scenarios/{sid}/entities").json()["items"]] == [1, 2, 3]
+
+def test_metrics_endpoint_reports_stage_timings_and_request_latency():
+    def sample(text, prefix):
+        return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix))
+    sid, _ = make_scenario("Metrics Check", 12)
+    before = client.get("/api/metrics").text
+    simulate(sid, ["utilitarian", "fairness"], top_k=3)
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    assert "# TYPE simulation_stage_seconds histogram" in text
+    for stage in ("scenario_load", "normalize", "score", "summary", "persist", "serialize"):
+        assert f'simulation_stage_seconds_count{{stage="{stage}",scenario_type="hiring",framework=""}}' in text
+    for fw in ("utilitarian", "fairness"):
+        assert f'simulation_stage_seconds_count{{stage="framework",scenario_type="hiring",framework="{fw}"}}' in text
+        assert f'stage="explanation",scenario_type="hiring",framework="{fw}",le="+Inf"' in text
+    entities_total = 'simulation_entities_total{scenario_type="hiring"}'
+    assert sample(text, entities_total) - sample(before, entities_total) == 12
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/simulate",status="200"}' in text
+    client.get(f"/api/scenarios/{sid}")
+    text = client.get("/api/metrics").text
+    assert 'route="/api/scenarios/{scenario_id}",status="200"' in text and f'route="/api/scenarios/{sid}"' not in text
+    assert 'cache_hits_total{cache="scenarios"}' in text and "simulation_executor_active" in text
+
+def test_load_harness_drives_request_mix_and_reports_percentiles(demo):
+    import asyncio
+    import os
+    import sys
+    import httpx
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
+    from loadtest import parse_mix, run_load, summarize
+    scenarios = [{"id": demo["id"], "type": "hiring", "entities": 4, "params": {"top_k": 2}}]
+    mix = parse_mix("simulate=2,scenarios=1,runs=1")
+    with pytest.raises(ValueError):
+        parse_mix("simulate=1,nope=2")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api") as http:
+            return await run_load(http, scenarios, mix, concurrency=2, duration=0.5, seed=1)
+
+    samples, elapsed = asyncio.run(run())
+    report = summarize(samples, elapsed)
+    assert report["total"]["requests"] == len(samples) > 0 and report["total"]["throughput_rps"] > 0
+    assert set(report["endpoints"]) <= {"simulate", "scenarios", "runs"} and "simulate" in report["endpoints"]
+    lat = report["total"]["latency_ms"]
+    assert 0 < lat["p50"] <= lat["p95"] <= lat["p99"] <= lat["max"]
+    assert report["total"]["error_rate"] == sum(report["total"]["errors"].values()) / len(samples)
+    from app.database import engine
+    assert client.get("/api/db/pool").json()["dialect"] == engine.dialect.name
+
+def test_opt_in_profiling_stores_profile_with_run(demo, monkeypatch):
+    import marshal
+    from app.config import settings
+    payload = {"scenario_id": demo["id"], "params": {"top_k": 2}}
+    assert client.post("/api/simulate", json=payload, headers={"X-Profile": "secret"}).status_code == 403
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    plain = client.post("/api/simulate", json=payload)
+    assert plain.status_code == 200 and "x-profile-id" not in plain.headers
+    assert client.post("/api/simulate?profile=wrong", json=payload).status_code == 403
+    resp = client.post("/api/simulate", json=payload, headers={"X-Profile": "secret"})
+    assert resp.status_code == 200
+    profile_id, run_id = int(resp.headers["x-profile-id"]), resp.json()["run"]["id"]
+    assert client.get("/api/profiles").status_code == 403
+    listed = client.get("/api/profiles", params={"run_id": run_id, "profile": "secret"}).json()
+    assert [(p["id"], p["run_id"], p["endpoint"]) for p in listed] == [(profile_id, run_id, "simulate")] and listed[0]["duration_ms"] > 0
+    raw = client.get(f"/api/profiles/{profile_id}", headers={"X-Profile": "secret"})
+    assert raw.headers["content-disposition"] == f'attachment; filename="run-{run_id}-profile-{profile_id}.prof"'
+    # Request thread and the simulation (wherever the executor ran it) end up in one pstats file
+    functions = {func for _, _, func in marshal.loads(raw.content)}
+    assert {"_simulate", "_persist", "run_prepared", "utilitarian_decision"} <= functions
+    text = client.get(f"/api/profiles/{profile_id}", params={"format": "text", "limit": 5, "profile": "secret"}).text
+    assert "cumulative" in text and "function calls" in text
+    assert client.get("/api/profiles/999999", headers={"X-Profile": "secret"}).status_code == 404
+
+def test_entity_patch_updates_scenario_incrementally():
+    from app.database import SessionLocal
+    from app.models import Result, ScenarioColumn, ScenarioVersion
+    from app.services.cache import scenario_cache
+    from app.services.scenarios import PENDING_PATCHES
+    entities = [{"id": f"p{i}", "experience": (3 * i) % 11, "test_score": 40 + (13 * i) % 55, "gender": "mfx"[i % 3],
+                 "priority": ((7 * i) % 10) / 10} for i in range(60)]
+    config = {"entities": entities, "protected_attribute": "gender", "rules": [{"field": "priority_norm", "min": 0.4}]}
+    sid = client.post("/api/scenarios", json={"name": "Entity Patch Check", "type": "hiring", "config": config}).json()["id"]
+    payload = {"scenario_id": sid, "params": {"top_k": 6, "ranking_limit": 10}}
+    before = client.post("/api/simulate", json=payload).json()["run"]
+    before_ranking = client.get(f"/api/runs/{before['id']}/ranking").text
+    with SessionLocal() as session:
+        stored = {c.name: c.data for c in session.query(ScenarioColumn).filter_by(scenario_id=sid)}
+
+    # Drop both experience extremes (min/max move) and the best entity, replace one and add two
+    best = before["results"][0]["decisions"]["selected_ids"][0]
+    added = [{"id": "p5", "experience": 4, "test_score": 99, "gender": "f"},
+             {"id": "n1", "experience": 12, "test_score": 70, "gender": "m", "priority": 0.9},
+             {"id": "n2", "experience": 1, "test_score": 35, "gender": "q", "priority": 0.2}]
+    remove = ["p0", "p10", "p5", best]
+    resp = client.patch(f"/api/scenarios/{sid}/entities", json={"add": added, "remove": remove})
+    assert resp.status_code == 200
+    assert resp.json() == {"scenario_id": sid, "entity_count": 59, "added": 3, "removed": len(set(remove))}
+    expected = [e for e in entities if e["id"] not in remove] + added
+    items = client.get(f"/api/scenarios/{sid}/entities?limit=100").json()["items"]
+    assert items == expected
+    assert client.get(f"/api/scenarios/{sid}/entities?limit=2&offset=57&fields=gender").json()["items"] == \
+        [{"id": e["id"], "gender": e["gender"]} for e in expected[57:]]
+    # The patch is recorded, not written through: column rows and earlier results stay as they were
+    with SessionLocal() as session:
+        assert {c.name: c.data for c in session.query(ScenarioColumn).filter_by(scenario_id=sid)} == stored
+        assert session.query(Result).filter_by(run_id=before["id"]).filter(Result.indices.is_not(None)).count() == 3
+
+    # The next run equals one on a scenario created with the new entities from scratch
+    after = client.post("/api/simulate", json=payload).json()["run"]
+    fresh_id = client.post("/api/scenarios", json={"name": "Entity Patch Fresh", "type": "hiring", "config": config | {"entities": expected}}).json()["id"]
+    fresh = client.post("/api/simulate", json={**payload, "scenario_id": fresh_id}).json()["run"]
+    assert [r["decisions"] for r in after["results"]] == [r["decisions"] for r in fresh["results"]]
+    assert [r["metrics"] for r in after["results"]] == [r["metrics"] for r in fresh["results"]]
+    assert client.get(f"/api/runs/{after['id']}").json()["results"] == after["results"]
+
+    # Earlier runs resolve their stored positions through the patch, removed entities included
+    assert client.get(f"/api/runs/{before['id']}").json()["results"] == before["results"]
+    assert client.get(f"/api/runs/{before['id']}/ranking").text == before_ranking
+
+    # More patches, then a process without the cached version: the column store plus the recorded
+    # patches give the same entities, and the column store is rewritten once PENDING_PATCHES gather
+    for i in range(PENDING_PATCHES):
+        extra = {"id": f"x{i}", "experience": i % 5, "test_score": 50 + i, "gender": "mf"[i % 2]}
+        assert client.patch(f"/api/scenarios/{sid}/entities", json={"add": [extra], "remove": [expected[i]["id"]]}).status_code == 200
+        expected = expected[:i] + expected[i + 1:] + [extra]
+        scenario_cache.clear()
+        assert client.get(f"/api/scenarios/{sid}/entities?limit=100").json()["items"] == expected
+    with SessionLocal() as session:
+        assert session.query(ScenarioVersion).filter_by(scenario_id=sid).filter(ScenarioVersion.added.is_not(None)).count() == 1
+    assert client.get(f"/api/runs/{before['id']}").json()["results"] == before["results"]
+    assert client.get(f"/api/runs/{after['id']}").json()["results"] == after["results"]
+    assert client.get(f"/api/runs/{before['id']}/ranking").text == before_ranking
+
+    assert client.patch(f"/api/scenarios/{sid}/entities", json={"remove": ["nope"]}).status_code == 404
+    assert client.patch(f"/api/scenarios/{sid}/entities", json={"add": [{"id": "n1"}]}).status_code == 409
+    assert client.patch(f"/api/scenarios/{sid}/entities", json={"add": [{"experience": 1}]}).status_code == 400
+    assert client.patch("/api/scenarios/999999/entities", json={"remove": ["p1"]}).status_code == 404
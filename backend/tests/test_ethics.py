@@ -0,0 +1,199 @@
+import pytest
+from app.ethics.frame import EntityFrame
+from app.ethics.runner import run_simulation, prepare_scenario, run_prepared
+from app.ethics.data_generator import hiring_demo_scenario
+
+def test_frame_normalizes_declared_features():
+    frame = EntityFrame.from_entities([
+        {"id": "a", "severity": 2.0, "Gender": "F"},
+        {"id": "b", "severity": 4.0, "gender": "M"},
+        {"id": "c", "severity": 3.0},
+    ])
+    assert frame.norm("severity").tolist() == [0.0, 1.0, 0.5]
+    assert frame.numeric("severity_norm").tolist() == [0.0, 1.0, 0.5]
+    assert frame.labels("gender") == ["F", "M", "unknown"]
+    assert frame.norm("missing").tolist() == [0.0, 0.0, 0.0]
+
+def test_run_simulation_on_demo():
+    out = run_simulation(hiring_demo_scenario(), ["utilitarian", "fairness", "rule_based"], {"top_k": 2})
+    by_fw = {r["framework"]: r for r in out["results"]}
+    assert by_fw["utilitarian"]["decisions"]["selected_ids"] == ["C", "A"]
+    assert by_fw["fairness"]["decisions"]["selected_ids"] == ["C", "B"]
+    assert by_fw["fairness"]["metrics"]["parity_gap"] == 0.0
+    assert by_fw["rule_based"]["decisions"]["eligible_count"] == 4
+
+def test_top_k_indices_matches_stable_sort():
+    import numpy as np
+    from app.ethics.ranking import top_k_indices
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9, 0.5])
+    for k in range(len(scores) + 2):
+        assert top_k_indices(scores, k).tolist() == np.argsort(-scores, kind="stable")[:k].tolist()
+
+def test_utilitarian_negative_weight_falls_back_to_equal_weights():
+    scenario = {
+        "type": "self_driving",
+        "protected_attribute": "group",
+        "metrics": {"utility_features": ["risk_level"]},
+        "entities": [{"id": str(i), "risk_level": r, "group": "adult"} for i, r in enumerate([0.2, 0.8, 0.5])],
+    }
+    out = run_simulation(scenario, ["utilitarian"], {"top_k": 2, "weights": {"risk_level": -1.0}})
+    assert out["results"][0]["decisions"]["selected_ids"] == ["1", "2"]
+
+def test_scores_match_the_baseline_matrix_product_bit_for_bit():
+    import os
+    import sys
+    import numpy as np
+    from app.ethics.scoring import utility_weights
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
+    from benchmark import build_scenario
+    # Healthcare weighs two features, where the summation order decides the last bit of many scores
+    scenario = build_scenario("healthcare", 5000)
+    params = {**scenario["default_params"], "ranking_limit": None}
+    features = scenario["metrics"]["utility_features"]
+    X = np.array([[e.get(f"{feat}_norm", e.get(feat, 0.0)) for feat in features] for e in scenario["entities"]], dtype=float)
+    expected = dict(zip((e["id"] for e in scenario["entities"]), (X @ utility_weights(params.get("weights", {}), features)).tolist()))
+    out = run_simulation(scenario, ["utilitarian"], params)
+    ranking = out["results"][0]["decisions"]["ranking"]
+    assert len(ranking) == 5000
+    assert all(r["score"] == expected[r["id"]] for r in ranking)
+
+def test_fairness_proportional_quotas_follow_population():
+    entities = [{"id": f"a{i}", "utility": i, "band": "low"} for i in range(6)]
+    entities += [{"id": f"b{i}", "utility": i, "band": "high"} for i in range(2)]
+    scenario = {"protected_attribute": "band", "entities": entities}
+    out = run_simulation(scenario, ["fairness"], {"top_k": 4, "quota_mode": "proportional"})
+    decisions = out["results"][0]["decisions"]
+    assert decisions["selection_by_group"] == {"low": ["a5", "a4", "a3"], "high": ["b1"]}
+    assert out["results"][0]["metrics"]["parity_gap"] == 0.0
+
+def test_rule_plan_applies_scenario_rules_and_ranges():
+    from app.ethics.rules import compile_rules, eligibility_mask
+    frame = EntityFrame.from_entities([
+        {"id": "a", "age": 30, "group": "adult", "priority_norm": 0.7},
+        {"id": "b", "age": 8, "group": "child", "priority_norm": 0.9},
+        {"id": "c", "age": 70, "group": "elderly", "priority_norm": 0.2},
+        {"id": "d", "age": 45, "group": "adult", "priority_norm": 0.6},
+    ])
+    constraints = {"require_if": [{"field": "age", "range": [18, 65]}], "disqualify_if": [{"field": "id", "equals": "d"}]}
+    plan = compile_rules(constraints, [{"field": "group", "one_of_not": ["child"]}, {"field": "priority_norm", "min": 0.5}])
+    assert eligibility_mask(frame, plan).tolist() == [True, False, False, False]
+    assert compile_rules(constraints, [{"field": "group", "one_of_not": ["child"]}, {"field": "priority_norm", "min": 0.5}]) is plan
+
+def test_shared_scores_reach_plugin_frameworks(monkeypatch):
+    from app.ethics import runner
+    seen = {}
+    def plugin(frame, common):
+        seen["scores"] = common["scores"]
+        return {"selected_ids": []}, {}, {}
+    monkeypatch.setitem(runner.FRAMEWORK_DISPATCH, "plugin", plugin)
+    out = run_simulation(hiring_demo_scenario(), ["utilitarian", "plugin"], {"top_k": 1})
+    assert seen["scores"].tolist() == [0.7, 0.6, 0.8, 0.5]
+    assert out["results"][0]["metrics"]["avg_utility"] == 0.8
+
+def test_pareto_frontier_is_non_dominated_and_matches_simulation():
+    from app.ethics.pareto import pareto_frontier
+    # Group "f" leads on test_score and "m" on experience, which the rule requires: weights trade the objectives off
+    entities = [{"id": i, "experience": (3 * i) % 7 + 2 * (i % 2), "test_score": 50 + (7 * i) % 40 + 15 * (1 - i % 2), "gender": "mf"[i % 2]} for i in range(40)]
+    prepared = prepare_scenario({"type": "hiring", "constraints": {"require_if": [{"field": "experience", "min": 3}]}, "entities": entities})
+    out = pareto_frontier(prepared, resolution=5)
+    objs = [tuple(p["objectives"].values()) for p in out["frontier"]]
+    assert objs and all(not (all(a >= b for a, b in zip(o, p)) and o != p) for o in objs for p in objs)
+    # Each point's objectives are measured on the selection its framework makes with its params
+    from app.ethics.rules import compile_rules, eligibility_mask
+    eligible = dict(zip(prepared.frame.ids.tolist(), eligibility_mask(prepared.frame, compile_rules(prepared.meta["constraints"], [])).tolist()))
+    groups = {e["id"]: e["gender"] for e in entities}
+    sizes = {g: sum(v == g for v in groups.values()) for g in "mf"}
+    assert len({tuple(p["params"]["weights"].values()) for p in out["frontier"]}) > 1
+    for point in out["frontier"]:
+        res = run_prepared(prepared, [point["framework"]], point["params"])["results"][0]
+        selected, k = res["decisions"]["selected_ids"], point["params"]["top_k"]
+        rates = [sum(groups[i] == g for i in selected) / sizes[g] for g in "mf"]
+        assert point["objectives"]["avg_utility"] == pytest.approx(res["metrics"]["avg_utility"])
+        assert point["objectives"]["fairness"] == pytest.approx(1 - (max(rates) - min(rates)))
+        assert point["objectives"]["constraint_satisfaction_rate"] == pytest.approx(sum(eligible[i] for i in selected) / k)
+
+def test_convert_csv_profiles_match_across_block_sizes(tmp_path):
+    from app.ethics.ingest import PROFILES, convert_csv, scenario_from_columns
+    path = tmp_path / "hr.csv"
+    path.write_text("enrollee_id,experience,Experience,training_hours,Gender,sex,dept\n"
+                    "e1,>20,,30,,F,ops\n"
+                    "e2,<1,,x,M,,\n"
+                    "e3,,4,12,,,ops\n")
+    expected = [
+        {"id": "e1", "name": "Candidate e1", "experience": 21.0, "test_score": 30.0, "gender": "F", "department": "ops"},
+        {"id": "e2", "name": "Candidate e2", "experience": 0.5, "test_score": 0.0, "gender": "M"},
+        {"id": "e3", "name": "Candidate e3", "experience": 4.0, "test_score": 12.0, "gender": "unknown", "department": "ops"},
+    ]
+    for block_rows in (1, 2, 10):
+        scenario = scenario_from_columns(convert_csv(str(path), PROFILES["hiring_kaggle"], block_rows), "hiring", {})
+        assert scenario["entities"] == expected
+    norms = scenario_from_columns(convert_csv(str(path), PROFILES["hiring"], 2), "hiring", PROFILES["hiring"]["meta"])
+    assert [e["name"] for e in norms["entities"]] == ["Candidate 0", "Candidate 1", "Candidate 2"]
+    assert [e["test_score_norm"] for e in norms["entities"]] == [1.0, 0.0, 0.4]
+    assert norms["metrics"]["utility_features"] == ["experience", "test_score"]
+
+def test_benchmark_suite_flags_regressions_against_baseline():
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
+    from benchmark import build_scenario, run_suite, compare
+    scenario = build_scenario("healthcare", 50)
+    assert len(scenario["entities"]) == 50 and scenario["protected_attribute"] == "income_group"
+    assert build_scenario("healthcare", 50) == scenario
+    results = run_suite(["self_driving"], [200], repeat=1, log=lambda line: None)
+    case = results["cases"]["self_driving/200"]
+    assert set(case["frameworks_s"]) == {"utilitarian", "fairness", "rule_based"} and case["peak_memory_mb"] > 0
+    assert compare(results, results, threshold=0.1, min_seconds=0.0) == []
+    halved = {"cases": {"self_driving/200": {**case, "run_prepared_s": case["run_prepared_s"] / 2, "peak_memory_mb": case["peak_memory_mb"] / 2}}}
+    flagged = lambda **kw: [r.split(":")[0] for r in compare(results, halved, **kw)]
+    assert flagged(threshold=0.5, min_seconds=0.0) == ["self_driving/200 run_prepared_s", "self_driving/200 peak_memory_mb"]
+    assert flagged(threshold=1.5, min_seconds=0.0) == []
+    # Sub-threshold timings are noise; memory is always compared
+    assert flagged(threshold=0.5, min_seconds=10.0) == ["self_driving/200 peak_memory_mb"]
+    # Timings are judged relative to the control workload: a run on a machine twice as fast as the
+    # baseline's that only matches the baseline's timings has regressed
+    assert case["control_s"] > 0
+    slower_machine = {"cases": {"self_driving/200": {**case, "control_s": case["control_s"] * 2}}}
+    assert "self_driving/200 run_prepared_s" in [r.split(":")[0] for r in compare(results, slower_machine, threshold=0.5, min_seconds=0.0)]
+
+def test_entity_deltas_match_a_full_pass_including_removed_extremes():
+    import json
+    import random
+    import numpy as np
+    from app.ethics.incremental import EntityDelta, apply_delta
+    rng = random.Random(7)
+
+    def entity(i):
+        e = {"id": f"e{i}", "experience": rng.randint(0, 20), "test_score": rng.choice([rng.uniform(30, 100), None]),
+             "gender": rng.choice(["F", "M", "X"]), "priority": round(rng.random(), 2)}
+        if rng.random() < 0.2:
+            e["flagged"] = rng.random() < 0.5
+        return e
+
+    meta = {"type": "hiring", "protected_attribute": "gender", "metrics": {"utility_features": ["experience", "test_score"]},
+            "constraints": {"disqualify_if": [{"field": "flagged", "equals": True}]}, "rules": [{"field": "priority_norm", "min": 0.3}]}
+    frameworks = ["utilitarian", "fairness", "rule_based"]
+    params = [{"top_k": 5, "weights": {"experience": 0.7, "test_score": 0.3}}, {"top_k": 12, "quota_mode": "proportional", "ranking_limit": None}]
+    prepared = prepare_scenario(dict(meta, entities=[entity(i) for i in range(120)]))
+    prepared.content_hash = "v0"
+    for p in params:
+        run_prepared(prepared, frameworks, p)
+    next_id = 120
+    for step in range(12):
+        entities = prepared.frame.to_entities()
+        experience = prepared.frame.numeric("experience")
+        removed = set(rng.sample(range(len(entities)), rng.randint(0, 4)))
+        if step % 2 == 0:
+            # The current extremes go: min/max (and every score) must follow
+            removed |= {int(np.argmax(experience)), int(np.argmin(experience))}
+        added = [entity(next_id + j) for j in range(rng.randint(0, 5))]
+        next_id += len(added)
+        prepared = apply_delta(prepared, EntityDelta(sorted(removed), EntityFrame.from_entities(added)), f"v{step + 1}")
+        full = prepare_scenario(dict(meta, entities=[e for i, e in enumerate(entities) if i not in removed] + added))
+        assert prepared.frame.to_entities() == full.frame.to_entities()
+        for p in params:
+            incremental, reference = run_prepared(prepared, frameworks, p), run_prepared(full, frameworks, p)
+            assert np.array_equal(incremental["scores"], reference["scores"])
+            assert json.dumps(incremental["results"]) == json.dumps(reference["results"])
+    # Later versions select from the maintained orders instead of partitioning again
+    assert len(prepared.frame.score_orders) == 2 and len(prepared.lineage) == 8
@@ -8,13 +8,14 @@ import ComparisonSummary from './components/Results/ComparisonSummary'
 import KpiStrip from './components/Results/KpiStrip'
 import RecordsTable from './components/Results/RecordsTable'
 import NarrativeSummary from './components/Results/NarrativeSummary'
-import { simulate, getScenario } from './services/api'
+import { simulate, getScenario, getEntities } from './services/api'
 // @ts-ignore
 import confetti from 'canvas-confetti'
 
 function App() {
   const [scenarioId, setScenarioId] = useState<number | null>(null)
   const [scenarioDetails, setScenarioDetails] = useState<any | null>(null)
+  const [selectedEntities, setSelectedEntities] = useState<any[]>([])
   const [params, setParams] = useState<any>({ top_k: 10, weights: { experience: 0.5, test_score: 0.5 } })
   const [frameworks, setFrameworks] = useState({ utilitarian: true, fairness: true, rule_based: true })
   const [loading, setLoading] = useState(false)
@@ -26,7 +27,8 @@ function App() {
 
   useEffect(() => {
     if (!scenarioId) { setScenarioDetails(null); return }
-    getScenario(scenarioId).then(setScenarioDetails).catch(console.error)
+    // Name, type and size only; records are paged in by RecordsTable
+    getScenario(scenarioId, ['id', 'name', 'type', 'entity_count']).then(setScenarioDetails).catch(console.error)
   }, [scenarioId])
 
   const selectedFrameworks = useMemo(() => Object.entries(frameworks).filter(([_,v]) => v).map(([k,_]) => k), [frameworks])
@@ -70,12 +72,18 @@ function App() {
     return map
   }, [results])
 
+  // Only the selected entities are fetched for the selection table
+  useEffect(() => {
+    const ids = Array.from(new Set(Object.values(selectedSets).flatMap(s => Array.from(s))))
+    if (!scenarioId || scenarioDetails?.type !== 'hiring' || !ids.length) { setSelectedEntities([]); return }
+    getEntities(scenarioId, { ids }).then(page => setSelectedEntities(page.items)).catch(console.error)
+  }, [scenarioId, scenarioDetails, selectedSets])
+
   const entitiesById: Record<string, any> = useMemo(() => {
     const rec: Record<string, any> = {}
-    const entities = scenarioDetails?.config?.entities || []
-    for (const e of entities) rec[String(e.id)] = e
+    for (const e of selectedEntities) rec[String(e.id)] = e
     return rec
-  }, [scenarioDetails])
+  }, [selectedEntities])
 
   return (
     <div className="min-h-screen">
@@ -161,16 +169,16 @@ function App() {
             <div className="card-title">Metrics & Explanations</div>
             <MetricsPanel results={results} />
             <div className="mt-3">
-              <NarrativeSummary scenarioType={scenarioDetails?.config?.type} values={metricValues} comparison={comparison} />
+              <NarrativeSummary scenarioType={scenarioDetails?.type} values={metricValues} comparison={comparison} />
             </div>
           </div>
 
-          {scenarioDetails?.config?.type === 'hiring' ? (
+          {scenarioDetails?.type === 'hiring' ? (
             <SelectedTable entitiesById={entitiesById} selected={selectedSets} limit={Math.max(10, Number(params.top_k || 10))} />
           ) : null}
         </div>
 
-        <RecordsTable scenarioType={scenarioDetails?.config?.type} entities={scenarioDetails?.config?.entities || []} selectedIds={new Set(Array.from(selectedSets.utilitarian ?? new Set()))} />
+        <RecordsTable scenarioId={scenarioId} scenarioType={scenarioDetails?.type} selectedIds={new Set(Array.from(selectedSets.utilitarian ?? new Set()))} />
       </div>
     </div>
   )
@@ -1,29 +1,47 @@
 import React from 'react'
+import { getEntities } from '../../services/api'
 
 type Props = {
+  scenarioId: number | null
   scenarioType?: string
-  entities: any[]
   selectedIds: Set<string>
   limit?: number
 }
 
-export default function RecordsTable({ scenarioType, entities, selectedIds, limit = 20 }: Props) {
-  const [showAll, setShowAll] = React.useState(false)
+export default function RecordsTable({ scenarioId, scenarioType, selectedIds, limit = 20 }: Props) {
+  const [offset, setOffset] = React.useState(0)
+  const [page, setPage] = React.useState<{ total: number, items: any[] }>({ total: 0, items: [] })
   const cols = React.useMemo(() => {
     if (scenarioType === 'healthcare') return ['id','age','severity','priority','income_group']
     if (scenarioType === 'self_driving') return ['id','passenger_age','pedestrian_age','risk_level','group']
     return ['id','name','gender','department','experience','test_score']
   }, [scenarioType])
-  const rows = React.useMemo(() => (showAll ? entities : entities.slice(0, limit)), [entities, showAll, limit])
-  if (!entities?.length) return null
+
+  React.useEffect(() => { setOffset(0) }, [scenarioId])
+
+  // One page of records at a time, with only the displayed columns
+  React.useEffect(() => {
+    if (!scenarioId) { setPage({ total: 0, items: [] }); return }
+    getEntities(scenarioId, { offset, limit, fields: cols.filter(c => c !== 'id') }).then(setPage).catch(console.error)
+  }, [scenarioId, offset, limit, cols])
+
+  if (!page.items.length) return null
+  const last = Math.min(offset + page.items.length, page.total)
   return (
     <div className="card">
       <div className="card-title">Records Preview</div>
       <div className="flex items-center justify-between mb-2">
-        <div className="text-sm text-gray-600">Showing {showAll ? entities.length : Math.min(limit, entities.length)} of {entities.length} records</div>
-        <button className="px-3 py-1 rounded bg-gray-100 hover:bg-gray-200" onClick={() => setShowAll(s => !s)}>
-          {showAll ? 'Show Less' : 'Show All'}
-        </button>
+        <div className="text-sm text-gray-600">Showing {offset + 1}–{last} of {page.total} records</div>
+        <div className="flex gap-2">
+          <button className="px-3 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:opacity-50" disabled={offset === 0}
+            onClick={() => setOffset(o => Math.max(0, o - limit))}>
+            Previous
+          </button>
+          <button className="px-3 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:opacity-50" disabled={last >= page.total}
+            onClick={() => setOffset(o => o + limit)}>
+            Next
+          </button>
+        </div>
       </div>
       <div className="overflow-auto">
         <table className="min-w-full text-sm">
@@ -34,7 +52,7 @@ export default function RecordsTable({ scenarioType, entities, selectedIds, limi
             </tr>
           </thead>
           <tbody>
-            {rows.map((e, idx) => (
+            {page.items.map((e, idx) => (
               <tr key={e.id ?? idx} className="border-t">
                 {cols.map(c => <td key={c} className="py-2 pr-4">{e[c] ?? '-'}</td>)}
                 <td className="py-2 pr-4">{selectedIds.has(String(e.id)) ? '✅' : ''}</td>
@@ -45,4 +63,4 @@ export default function RecordsTable({ scenarioType, entities, selectedIds, limi
       </div>
     </div>
   )
-}
\ No newline at end of file
+}
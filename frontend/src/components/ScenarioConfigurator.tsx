@@ -1,7 +1,7 @@
 import React, { useEffect, useMemo, useState } from 'react'
-import { getScenarios } from '../services/api'
+import { getScenario, getScenarios } from '../services/api'
 
-type Scenario = { id: number, name: string, type: string, config?: any }
+type Scenario = { id: number, name: string, type: string, entity_count?: number | null }
 
 type Props = {
   selected: number | null
@@ -19,9 +19,11 @@ function titleCase(s: string) {
 
 export default function ScenarioConfigurator({ selected, onSelect, params, setParams, frameworks, setFrameworks, displayLabels }: Props) {
   const [scenarios, setScenarios] = useState<Scenario[]>([])
+  // Only the config keys this form needs, fetched for the selected scenario (never the entities)
+  const [selectedConfig, setSelectedConfig] = useState<{ id: number, config: any } | null>(null)
 
   useEffect(() => {
-    getScenarios()
+    getScenarios('summary')
       .then((list) => {
         // Exclude seeded demo
         setScenarios(list.filter((s: any) => s.name !== 'Hiring Bias Demo'))
@@ -31,11 +33,20 @@ export default function ScenarioConfigurator({ selected, onSelect, params, setPa
 
   const selectedScenario = useMemo(() => scenarios.find(s => s.id === selected) ?? null, [scenarios, selected])
 
+  useEffect(() => {
+    if (selected == null) return
+    getScenario(selected, ['config.default_params', 'config.metrics'])
+      .then((s) => setSelectedConfig({ id: selected, config: s.config ?? {} }))
+      .catch(console.error)
+  }, [selected])
+
+  const config = selectedConfig && selectedConfig.id === selectedScenario?.id ? selectedConfig.config : null
+
   // Initialize params from selected scenario's default_params when selection changes
   useEffect(() => {
-    if (!selectedScenario) return
-    const def = selectedScenario.config?.default_params ?? {}
-    const utilKeys: string[] = selectedScenario.config?.metrics?.utility_features ?? []
+    if (!selectedScenario || !config) return
+    const def = config.default_params ?? {}
+    const utilKeys: string[] = config.metrics?.utility_features ?? []
     const baseWeights: Record<string, number> = Object.fromEntries(utilKeys.map(k => [k, 0.5]))
     const desiredWeights = { ...baseWeights, ...(def.weights ?? {}) }
 
@@ -47,12 +58,12 @@ export default function ScenarioConfigurator({ selected, onSelect, params, setPa
       setParams({ ...params, top_k: def.top_k ?? 10 })
     }
   // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [selectedScenario?.id])
+  }, [selectedScenario?.id, config])
 
   // Determine which weight fields to render and their current values
   const weightEntries: [string, number][] = useMemo(() => {
-    const utilKeys: string[] = selectedScenario?.config?.metrics?.utility_features ?? []
-    const defWeights = selectedScenario?.config?.default_params?.weights ?? {}
+    const utilKeys: string[] = config?.metrics?.utility_features ?? []
+    const defWeights = config?.default_params?.weights ?? {}
 
     const allKeys = Array.from(new Set([
       ...Object.keys(defWeights || {}),
@@ -61,7 +72,7 @@ export default function ScenarioConfigurator({ selected, onSelect, params, setPa
     ]))
 
     return allKeys.map((k) => [k, Number((params?.weights?.[k] ?? defWeights?.[k] ?? (utilKeys.includes(k) ? 0.5 : 0)))]) as [string, number][]
-  }, [params?.weights, selectedScenario])
+  }, [params?.weights, config])
 
   return (
     <div className="space-y-4">
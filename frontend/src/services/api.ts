@@ -7,18 +7,32 @@ export interface SimulatePayload {
 
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000/api'
 
-export async function getScenarios() {
-  const res = await fetch(`${API_BASE}/scenarios`)
+export async function getScenarios(view: 'full' | 'summary' = 'full') {
+  const res = await fetch(`${API_BASE}/scenarios?view=${view}`)
   if (!res.ok) throw new Error('Failed to load scenarios')
   return res.json()
 }
 
-export async function getScenario(id: number) {
-  const res = await fetch(`${API_BASE}/scenarios/${id}`)
+export async function getScenario(id: number, fields?: string[]) {
+  const query = fields?.length ? `?fields=${encodeURIComponent(fields.join(','))}` : ''
+  const res = await fetch(`${API_BASE}/scenarios/${id}${query}`)
   if (!res.ok) throw new Error('Failed to load scenario')
   return res.json()
 }
 
+export async function getEntities(id: number, opts: { offset?: number, limit?: number, fields?: string[], ids?: string[] } = {}) {
+  const query = new URLSearchParams()
+  if (opts.ids) query.set('ids', opts.ids.join(','))
+  else {
+    query.set('offset', String(opts.offset ?? 0))
+    query.set('limit', String(opts.limit ?? 100))
+  }
+  if (opts.fields?.length) query.set('fields', opts.fields.join(','))
+  const res = await fetch(`${API_BASE}/scenarios/${id}/entities?${query}`)
+  if (!res.ok) throw new Error('Failed to load entities')
+  return res.json()
+}
+
 export async function simulate(payload: SimulatePayload) {
   const res = await fetch(`${API_BASE}/simulate`, {
     method: 'POST',